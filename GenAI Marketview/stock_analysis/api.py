@@ -0,0 +1,88 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.middleware.cors import CORSMiddleware
+from service import ReportService, comparison_json, news_json, report_json, section_names, to_jsonable
+from report_cache import report_cache
+from fundamentals_store import fundamentals_store
+from narration import narration_stats
+from rate_limiter import bedrock_limiter
+from config import API_HOST, API_PORT, API_WORKER_THREADS, API_CORS_ORIGINS
+
+service = ReportService()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Section fetches and narrations run in threads; several reports build at once
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=API_WORKER_THREADS))
+    yield
+
+
+app = FastAPI(title="MarketView Report API", lifespan=lifespan)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=API_CORS_ORIGINS,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+
+def normalize_ticker(ticker: str) -> str:
+    ticker = ticker.strip().upper()
+    if not ticker or "," in ticker:
+        raise HTTPException(status_code=400, detail="Expected a single ticker symbol")
+    return ticker
+
+
+@app.get("/reports/{ticker}")
+async def get_report(ticker: str):
+    """The whole report: section data and narrations (charts are left to the client)."""
+    report = await service.report(normalize_ticker(ticker))
+    if report.get("error"):
+        raise HTTPException(status_code=502, detail=f"Error fetching data for {ticker}: {report['error']}")
+    return report_json(report)
+
+
+@app.get("/reports/{ticker}/sections")
+async def list_sections(ticker: str):
+    return {"sections": section_names()}
+
+
+@app.get("/reports/{ticker}/sections/{name}")
+async def get_section(ticker: str, name: str):
+    """One section's data, from today's cached report or gathered on its own (without narration)."""
+    if name not in section_names():
+        raise HTTPException(status_code=404, detail=f"Unknown section {name}")
+    sections = await service.sections(normalize_ticker(ticker), [name])
+    return {"section": name, "data": to_jsonable(sections[name])}
+
+
+@app.get("/news/{ticker}")
+async def get_news(ticker: str):
+    return news_json(await service.news(normalize_ticker(ticker)))
+
+
+@app.get("/compare")
+async def compare(tickers: str = Query(..., description="Comma-separated tickers")):
+    comparison = await service.compare(tickers)
+    if not comparison["tickers"]:
+        raise HTTPException(status_code=404, detail=f"No price data found for {tickers}")
+    return comparison_json(comparison)
+
+
+@app.get("/stats")
+async def stats():
+    return {
+        "service": service.stats,
+        "report_cache": report_cache.stats,
+        "fundamentals_store": fundamentals_store.stats,
+        "narrations": narration_stats.summary(),
+        "bedrock_limiter": bedrock_limiter.stats
+    }
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host=API_HOST, port=API_PORT)
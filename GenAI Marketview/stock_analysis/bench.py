@@ -0,0 +1,113 @@
+"""
+Reproducible benchmark of the MarketView report pipeline over recorded upstream fixtures (see providers.py).
+
+    python bench.py AAPL MSFT --record               # record fixtures from the live services (network and AWS)
+    python bench.py AAPL MSFT --runs 3               # replay them with no network
+    python bench.py AAPL --latency 0 --json out.json # replay without upstream latency, save the results
+
+Each run builds every ticker's report in turn with build_report. Caches live in a temporary directory that
+starts empty, so run 1 measures the cold path and later runs the warm one. Per ticker and run it reports
+section data latency, per-narration latency and tokens, upstream calls by provider and method (replayed
+calls included), fixture misses, wall time and peak traced memory. Tracing memory slows the pipeline down;
+use --no-memory for timings alone.
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+# Every on-disk cache the pipeline reads, redirected so runs never see (or touch) the app's caches
+CACHE_SETTINGS = ("REPORT_CACHE_DIR", "BENCHMARK_CACHE_DIR", "FUNDAMENTALS_DIR", "PEER_DIR", "NEWS_DB_PATH")
+
+
+def isolate(args):
+    """Points the providers and caches at the benchmark's settings; must run before the app modules are imported."""
+    os.environ["MARKETVIEW_PROVIDER_MODE"] = "record" if args.record else "replay"
+    os.environ["MARKETVIEW_REPLAY_LATENCY"] = str(args.latency)
+    if args.fixtures:
+        os.environ["MARKETVIEW_FIXTURE_DIR"] = os.path.abspath(args.fixtures)
+    if args.narration_mode:
+        os.environ["NARRATION_MODE"] = args.narration_mode
+    os.environ.pop("MARKETVIEW_OFFLINE", None)
+    cache_root = tempfile.mkdtemp(prefix="marketview-bench-")
+    for name in CACHE_SETTINGS:
+        os.environ[name] = os.path.join(cache_root, name.lower())
+    return cache_root
+
+
+def measure(ticker, build_report, get_news_analysis, narration_stats, fixtures, include_news):
+    narration_stats.reset()
+    fixtures.reset_stats()
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+    started = time.perf_counter()
+    report = build_report(ticker)
+    result = {"ticker": ticker, "seconds": round(time.perf_counter() - started, 3), "error": report.get("error")}
+    if include_news:
+        news_started = time.perf_counter()
+        news = get_news_analysis(ticker)
+        result["news_seconds"] = round(time.perf_counter() - news_started, 3)
+        result["news_findings"] = len(news["findings"] or {})
+    result.update({
+        "sections": report["section_timings"],
+        "narrations": {key: {**totals, "seconds": round(totals["seconds"], 3)} for key, totals in narration_stats.sections.items()},
+        "upstream_calls": dict(sorted(fixtures.stats.items())),
+        "fixture_misses": fixtures.misses,
+        "peak_memory_mb": round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 1) if tracemalloc.is_tracing() else None
+    })
+    return result
+
+
+def print_result(result):
+    memory = f", peak {result['peak_memory_mb']} MB" if result["peak_memory_mb"] is not None else ""
+    news = f", news {result['news_seconds']}s ({result['news_findings']} findings)" if "news_seconds" in result else ""
+    print(f"{result['ticker']} run {result['run']}: {result['seconds']}s{news}{memory}, {result['fixture_misses']} fixture misses"
+          + (f", error: {result['error']}" if result["error"] else ""))
+    print("  sections:   " + ", ".join(f"{name} {timing['seconds']}s" + ("" if timing["status"] == "ok" else f" ({timing['status']})")
+                                       for name, timing in result["sections"].items()))
+    print("  narrations: " + ", ".join(f"{key} {totals['seconds']}s {totals['input_tokens']}/{totals['output_tokens']} tok"
+                                       for key, totals in result["narrations"].items()))
+    print("  upstream:   " + ", ".join(f"{name} {count}" for name, count in result["upstream_calls"].items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MarketView report generation over recorded upstream fixtures")
+    parser.add_argument("tickers", nargs="+", help="Tickers to build reports for")
+    parser.add_argument("--runs", type=int, default=2, help="Passes over the tickers; the first starts with empty caches")
+    parser.add_argument("--record", action="store_true", help="Call the live services and record fixtures instead of replaying")
+    parser.add_argument("--fixtures", type=str, default="", help="Fixture directory (defaults to MARKETVIEW_FIXTURE_DIR)")
+    parser.add_argument("--latency", type=float, default=1.0, help="Share of each recorded call's duration replay waits (0 = instant)")
+    parser.add_argument("--narration-mode", choices=["batched", "per_section"], default="", help="Overrides NARRATION_MODE")
+    parser.add_argument("--news", action="store_true", help="Also time the news analysis (Yahoo and Finnhub news, theme LLM calls)")
+    parser.add_argument("--no-memory", action="store_true", help="Skip tracemalloc")
+    parser.add_argument("--json", type=str, default="", help="Write all results to this file")
+    args = parser.parse_args()
+
+    cache_root = isolate(args)
+    # Imported only now, so config reads the benchmark's provider and cache settings
+    from report import build_report
+    from service import get_news_analysis
+    from narration import narration_stats
+    from providers import fixtures
+
+    if not args.no_memory:
+        tracemalloc.start()
+    results = []
+    try:
+        for run in range(1, args.runs + 1):
+            for ticker in (t.upper() for t in args.tickers):
+                result = {"run": run, **measure(ticker, build_report, get_news_analysis, narration_stats, fixtures, args.news)}
+                print_result(result)
+                results.append(result)
+    finally:
+        shutil.rmtree(cache_root, ignore_errors=True)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=1, default=str)
+
+
+if __name__ == "__main__":
+    main()
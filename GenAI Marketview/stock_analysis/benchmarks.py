@@ -0,0 +1,97 @@
+import glob
+import os
+import re
+import threading
+import numpy as np
+import pandas as pd
+from cache_utils import MARKET_TZ, atomic_write, trading_day
+from providers import yahoo_ticker
+from config import BENCHMARK_CACHE_DIR, OFFLINE_MODE
+
+
+class BenchmarkCache:
+    """
+    Process-wide cache of benchmark close series (^GSPC, ^VIX, sector ETFs).
+
+    Series are identical for every ticker and change once a day, so entries are keyed by symbol, period and
+    trading day. Each series is held as two compact arrays (int64 epoch nanoseconds, float64 closes) and
+    persisted to an .npz file so restarts don't re-download. Loading is single-flight: concurrent callers
+    for the same key wait for one download.
+    """
+
+    def __init__(self, cache_dir=BENCHMARK_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self._series = {}
+        self._locks = {}
+        self._guard = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "downloads": 0}
+
+    def _path(self, symbol, period, day):
+        safe_symbol = re.sub(r"[^A-Za-z0-9_-]", "_", symbol)
+        return os.path.join(self.cache_dir, f"{safe_symbol}_{period}_{day}.npz")
+
+    def _load_disk(self, path):
+        try:
+            with np.load(path) as data:
+                return data["dates"], data["close"]
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def _download(self, symbol, period):
+        history = yahoo_ticker(symbol).history(period=period)
+        if history.empty:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        index = history.index.tz_convert("UTC") if history.index.tz is not None else history.index
+        return index.as_unit("ns").asi8.astype(np.int64), history["Close"].to_numpy(dtype=np.float64)
+
+    def _save_disk(self, symbol, period, day, dates, close):
+        path = self._path(symbol, period, day)
+        atomic_write(path, lambda f: np.savez(f, dates=dates, close=close))
+        # Files from earlier trading days for this series are stale
+        for old in glob.glob(self._path(symbol, period, "*")):
+            if old != path:
+                os.remove(old)
+
+    def arrays(self, symbol, period="5y"):
+        """Returns (dates, close) arrays for the symbol's current trading-day series."""
+        day = trading_day()
+        key = (symbol, period, day)
+        cached = self._series.get(key)
+        if cached is not None:
+            self.stats["memory_hits"] += 1
+            return cached
+        with self._guard:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            cached = self._series.get(key)
+            if cached is not None:
+                self.stats["memory_hits"] += 1
+                return cached
+            cached = self._load_disk(self._path(symbol, period, day))
+            if cached is None and OFFLINE_MODE:
+                # Offline: the newest series saved on an earlier day
+                saved = sorted(glob.glob(self._path(symbol, period, "*")))
+                cached = self._load_disk(saved[-1]) if saved else (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64))
+            if cached is not None:
+                self.stats["disk_hits"] += 1
+            else:
+                cached = self._download(symbol, period)
+                self.stats["downloads"] += 1
+                if len(cached[0]):
+                    self._save_disk(symbol, period, day, *cached)
+            with self._guard:
+                for old_key in [k for k in self._series if k[:2] == (symbol, period) and k != key]:
+                    del self._series[old_key]
+                    self._locks.pop(old_key, None)
+                self._series[key] = cached
+        return cached
+
+    def history(self, symbol, period="5y", start=None):
+        """Returns the series as a DataFrame with a 'Close' column indexed like yfinance history."""
+        dates, close = self.arrays(symbol, period)
+        index = pd.DatetimeIndex(pd.to_datetime(dates, unit="ns", utc=True)).tz_convert(MARKET_TZ)
+        frame = pd.DataFrame({"Close": close}, index=index)
+        return frame[frame.index >= start] if start is not None else frame
+
+
+benchmark_cache = BenchmarkCache()
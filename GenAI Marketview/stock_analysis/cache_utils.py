@@ -0,0 +1,30 @@
+import os
+import tempfile
+from datetime import datetime, timedelta
+import pytz
+
+MARKET_TZ = pytz.timezone("America/New_York")
+
+
+def trading_day(now=None):
+    """Returns the current US market date (YYYY-MM-DD), rolling weekends back to Friday."""
+    now = now or datetime.now(MARKET_TZ)
+    day = now.date()
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day.isoformat()
+
+
+def atomic_write(path, write):
+    """Calls write(file) on a temporary file next to path and moves it into place, so readers never see partial files."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
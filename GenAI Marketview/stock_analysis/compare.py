@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+from rolling import HORIZONS, horizon_stats
+from providers import yahoo_download
+from config import COMPARE_MAX_TICKERS
+
+BENCHMARK = "^GSPC"
+HORIZON_LABELS = {"ytd": "YTD", "1_year": "1-Year", "3_year": "3-Year", "5_year": "5-Year"}
+
+
+def parse_tickers(text, limit=COMPARE_MAX_TICKERS):
+    """Distinct upper-case symbols from a comma-separated list, in input order."""
+    tickers = list(dict.fromkeys(t.strip().upper() for t in text.split(",") if t.strip()))
+    return tickers[:limit]
+
+
+def download_prices(tickers, period="5y"):
+    """
+    Closes of all tickers in one batched download, as (dates, T x N matrix) on the union of their trading
+    days. Dates are exchange-local datetime64; a ticker's rows before its first close are NaN.
+    """
+    data = yahoo_download(tickers, period=period, group_by="column", progress=False, threads=True, multi_level_index=True)
+    if data is None or data.empty:
+        return np.empty(0, dtype="datetime64[ns]"), np.empty((0, len(tickers)))
+    close = data["Close"].reindex(columns=tickers).sort_index()
+    # Holidays differ across exchanges: carry the last close forward, but not before a ticker's first one
+    close = close.ffill()
+    index = close.index.tz_localize(None) if close.index.tz is not None else close.index
+    return index.to_numpy(dtype="datetime64[ns]"), close.to_numpy(dtype=np.float64)
+
+
+def compare_tickers(tickers, benchmark=BENCHMARK, period="5y"):
+    """
+    Horizon x ticker matrices of returns, annualized volatility and excess return over the benchmark,
+    from one download and one vectorized pass. Tickers with no data are listed under "missing".
+    """
+    symbols = list(dict.fromkeys(tickers + [benchmark]))
+    dates, prices = download_prices(symbols, period)
+    if not len(dates):
+        return {"tickers": [], "missing": list(tickers), "horizons": list(HORIZONS), "series": {}}
+    available = ~np.all(np.isnan(prices), axis=0)
+    returns, volatility = horizon_stats(dates, prices)
+    benchmark_returns = returns[:, symbols.index(benchmark)]
+    columns = [i for i, symbol in enumerate(symbols) if symbol in tickers and available[i]]
+    return {
+        "tickers": [symbols[i] for i in columns],
+        "missing": [symbol for i, symbol in enumerate(symbols) if symbol in tickers and not available[i]],
+        "horizons": list(HORIZONS),
+        "returns": returns[:, columns],
+        "volatility": volatility[:, columns],
+        "excess_returns": returns[:, columns] - benchmark_returns[:, None],
+        "benchmark_returns": benchmark_returns,
+        "series": {symbols[i]: (dates[~np.isnan(prices[:, i])], prices[~np.isnan(prices[:, i]), i]) for i in columns}
+    }
+
+
+def comparison_tables(comparison):
+    """Timeframe x ticker DataFrames for display, keyed by metric name."""
+    index = pd.Index([HORIZON_LABELS[h] for h in comparison["horizons"]], name="Timeframe")
+    table = lambda values: pd.DataFrame(np.round(values, 2), index=index, columns=comparison["tickers"])
+    returns = table(comparison["returns"])
+    returns["S&P 500"] = np.round(comparison["benchmark_returns"], 2)
+    return {
+        "Return (%)": returns,
+        "Annualized Volatility (%)": table(comparison["volatility"]),
+        "Excess Return vs S&P 500 (%)": table(comparison["excess_returns"])
+    }
@@ -1,3 +1,5 @@
+import os
+
 SECTOR_ETF_MAP = {
     "Technology": "XLK",
     "Healthcare": "XLV",
@@ -12,4 +14,85 @@ SECTOR_ETF_MAP = {
     "Communication Services": "XLC"
 }
 
-MODEL_ID = "us.anthropic.claude-3-5-haiku-20241022-v1:0"
\ No newline at end of file
+MODEL_ID = "us.anthropic.claude-3-5-haiku-20241022-v1:0"
+
+# Benchmark and sector ETF series shared across reports, persisted per trading day
+BENCHMARK_CACHE_DIR = os.getenv("BENCHMARK_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "benchmarks"))
+
+# Concurrent section gathering for a report
+GATHER_MAX_WORKERS = int(os.getenv("GATHER_MAX_WORKERS", "8"))
+SECTION_TIMEOUT_SECONDS = float(os.getenv("SECTION_TIMEOUT_SECONDS", "30"))
+
+# Shared Bedrock request budget (size to the account's on-demand quota)
+BEDROCK_REQUESTS_PER_MINUTE = float(os.getenv("BEDROCK_REQUESTS_PER_MINUTE", "120"))
+BEDROCK_BURST = int(os.getenv("BEDROCK_BURST", "8"))
+BEDROCK_MAX_RETRIES = int(os.getenv("BEDROCK_MAX_RETRIES", "4"))
+BEDROCK_RETRY_BASE_DELAY = float(os.getenv("BEDROCK_RETRY_BASE_DELAY", "1.0"))
+NARRATION_MAX_WORKERS = int(os.getenv("NARRATION_MAX_WORKERS", "8"))
+
+# 'batched' sends all report sections in one structured call; 'per_section' sends one prompt per section
+NARRATION_MODE = os.getenv("NARRATION_MODE", "batched")
+NARRATION_BATCH_MAX_TOKENS = int(os.getenv("NARRATION_BATCH_MAX_TOKENS", "4096"))
+
+# Generated reports and news analyses shared across sessions and workers
+REPORT_CACHE_DIR = os.getenv("REPORT_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "reports"))
+REPORT_CACHE_MAX_BYTES = int(os.getenv("REPORT_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+REPORT_CACHE_MEMORY_BYTES = int(os.getenv("REPORT_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024)))
+REPORT_CACHE_TTL_SECONDS = int(os.getenv("REPORT_CACHE_TTL_SECONDS", str(24 * 3600)))
+
+# Wikipedia page titles for tickers whose symbol is not a page title
+COMPANY_NAMES = {
+    "AAPL": "Apple Inc.",
+    "MSFT": "Microsoft Corporation",
+    "GOOGL": "Alphabet Inc."
+}
+
+# Server-side downsampling limits for charts
+CHART_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", "1000"))
+CHART_MAX_BARS = int(os.getenv("CHART_MAX_BARS", "250"))
+
+# Persistent, deduplicated news archive
+NEWS_DB_PATH = os.getenv("NEWS_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "news.db"))
+NEWS_LOOKBACK_DAYS = int(os.getenv("NEWS_LOOKBACK_DAYS", "60"))
+
+# Persistent news themes: scheduled expiry/merge interval and the target number of themes
+THEME_MAINTENANCE_SECONDS = int(os.getenv("THEME_MAINTENANCE_SECONDS", str(6 * 3600)))
+THEME_MAX = int(os.getenv("THEME_MAX", "6"))
+
+# Local news pre-clustering: TF-IDF cosine similarity for collapsing near-duplicate headlines and for
+# grouping stories into candidate themes, and the headlines sent to the LLM per candidate
+NEWS_DUPLICATE_SIMILARITY = float(os.getenv("NEWS_DUPLICATE_SIMILARITY", "0.8"))
+NEWS_CLUSTER_SIMILARITY = float(os.getenv("NEWS_CLUSTER_SIMILARITY", "0.25"))
+NEWS_CLUSTER_SAMPLE_TITLES = int(os.getenv("NEWS_CLUSTER_SAMPLE_TITLES", "3"))
+
+# Compare mode: most tickers accepted in one comparison
+COMPARE_MAX_TICKERS = int(os.getenv("COMPARE_MAX_TICKERS", "20"))
+
+# Peer aggregates (peers.py): storage, row refresh age and the smallest industry used before falling back to the sector
+PEER_DIR = os.getenv("PEER_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "peers"))
+PEER_REFRESH_SECONDS = int(os.getenv("PEER_REFRESH_SECONDS", str(7 * 24 * 3600)))
+PEER_MIN_GROUP = int(os.getenv("PEER_MIN_GROUP", "3"))
+
+# Offline mode: serve fundamentals and benchmarks from the local stores only (seed them first)
+OFFLINE_MODE = os.getenv("MARKETVIEW_OFFLINE", "0") == "1"
+
+# Fundamentals store: statements refresh when a filing is due (re-checked daily) or at the max age; full info
+# and dividends daily; price-driven info fields and the price history from fast_info after the fast TTL
+FUNDAMENTALS_DIR = os.getenv("FUNDAMENTALS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "fundamentals"))
+FUNDAMENTALS_MAX_AGE_SECONDS = int(os.getenv("FUNDAMENTALS_MAX_AGE_SECONDS", str(30 * 24 * 3600)))
+FUNDAMENTALS_RECHECK_SECONDS = int(os.getenv("FUNDAMENTALS_RECHECK_SECONDS", str(24 * 3600)))
+FUNDAMENTALS_INFO_TTL_SECONDS = int(os.getenv("FUNDAMENTALS_INFO_TTL_SECONDS", str(24 * 3600)))
+FUNDAMENTALS_FAST_TTL_SECONDS = int(os.getenv("FUNDAMENTALS_FAST_TTL_SECONDS", str(15 * 60)))
+
+# Headless report service and HTTP API (api.py)
+REPORT_SERVICE_MAX_CONCURRENT = int(os.getenv("REPORT_SERVICE_MAX_CONCURRENT", "4"))  # Reports built at once per process
+API_HOST = os.getenv("MARKETVIEW_API_HOST", "0.0.0.0")
+API_PORT = int(os.getenv("MARKETVIEW_API_PORT", "8002"))
+API_WORKER_THREADS = int(os.getenv("MARKETVIEW_API_WORKER_THREADS", "64"))
+API_CORS_ORIGINS = os.getenv("MARKETVIEW_API_CORS_ORIGINS", "http://localhost:5173").split(",")
+
+# Upstream providers (providers.py): "live", "record" (live calls saved as fixtures) or "replay" (fixtures only,
+# no network), and the share of each recorded call's duration that replay waits
+PROVIDER_MODE = os.getenv("MARKETVIEW_PROVIDER_MODE", "live")
+FIXTURE_DIR = os.getenv("MARKETVIEW_FIXTURE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures"))
+PROVIDER_REPLAY_LATENCY = float(os.getenv("MARKETVIEW_REPLAY_LATENCY", "1.0"))
@@ -1,25 +1,28 @@
 import pandas as pd
-import yfinance as yf
-import wikipediaapi
 import numpy as np
 from datetime import datetime, timedelta
 import pytz
+from snapshot import as_snapshot
+from benchmarks import benchmark_cache
+from config import SECTOR_ETF_MAP
+from peers import peer_universe
+from providers import wikipedia_page
+from dcf import dcf_inputs, dcf_point, dcf_sensitivity
+from rolling import HORIZONS, align, at_lookbacks, atr_series, bollinger_width_series, expanding_beta, expanding_corr, horizon_stats, pct_change
 
 def get_company_info_wikipedia(company_name):
-    user_agent = "StockAnalysisBot/1.0 (Contact: example@example.com)"
-    wiki = wikipediaapi.Wikipedia(user_agent=user_agent, language='en')
-    page = wiki.page(company_name)
-    if not page.exists():
+    page = wikipedia_page(company_name)
+    if page is None:
         return None
     return {
-        "name": page.title,
-        "summary": page.summary[:500] + "..." if len(page.summary) > 500 else page.summary
+        "name": page["title"],
+        "summary": page["summary"][:500] + "..." if len(page["summary"]) > 500 else page["summary"]
     }
 
 def get_price_performance(ticker):
-    stock = yf.Ticker(ticker)
-    info = stock.info
-    history = stock.history(period="5y")
+    snapshot = as_snapshot(ticker)
+    info = snapshot.info
+    history = snapshot.history
     today = datetime.now()
     current_price = info.get("currentPrice", 0)
     market_cap = info.get("marketCap", 0)
@@ -33,65 +36,54 @@ def get_price_performance(ticker):
         "52_week_low": info.get("fiftyTwoWeekLow", 0)
     }
 
+def _horizon_returns(frame):
+    """Returns and volatilities by HORIZONS key for one history frame, 0 where there is not enough history."""
+    if frame is None or frame.empty:
+        return dict.fromkeys(HORIZONS, 0), dict.fromkeys(HORIZONS, 0)
+    index = frame.index.tz_localize(None) if frame.index.tz is not None else frame.index
+    returns, volatility = horizon_stats(index.to_numpy(dtype="datetime64[ns]"), frame["Close"].to_numpy(dtype=np.float64))
+    as_dict = lambda values: {name: round(float(value), 2) if np.isfinite(value) else 0 for name, value in zip(HORIZONS, values[:, 0])}
+    return as_dict(returns), as_dict(volatility)
+
 def get_returns_timeframes(ticker):
-    stock = yf.Ticker(ticker)
-    history = stock.history(period="5y")
-    sp500 = yf.Ticker("^GSPC").history(period="5y")
-    info = stock.info
-    sector_name = info.get("sector", "Technology")
-    sector_etf_map = {
-        "Technology": "XLK", "Healthcare": "XLV", "Financial Services": "XLF",
-        "Industrials": "XLI", "Energy": "XLE", "Utilities": "XLU",
-        "Consumer Cyclical": "XLY", "Consumer Defensive": "XLP",
-        "Basic Materials": "XLB", "Real Estate": "XLRE", "Communication Services": "XLC"
+    snapshot = as_snapshot(ticker)
+    sector_etf = SECTOR_ETF_MAP.get(snapshot.info.get("sector", "Technology"))
+    returns, volatility = _horizon_returns(snapshot.history)
+    sp500_returns, _ = _horizon_returns(benchmark_cache.history("^GSPC", "5y"))
+    sector_returns, _ = _horizon_returns(benchmark_cache.history(sector_etf, "5y") if sector_etf else None)
+    return {
+        **{f"{horizon}_return": returns[horizon] for horizon in HORIZONS},
+        **{f"sp500_{horizon}_return": sp500_returns[horizon] for horizon in HORIZONS},
+        **{f"sector_{horizon}_return": sector_returns[horizon] for horizon in HORIZONS},
+        **{f"volatility_{horizon}": volatility[horizon] for horizon in HORIZONS}
     }
-    sector_etf = sector_etf_map.get(sector_name)
-    sector_data = yf.Ticker(sector_etf).history(period="5y") if sector_etf else None
-    today = datetime.now()
-
-    def calc_return(data, period):
-        return round(((data.iloc[-1]["Close"] - data.iloc[-period]["Close"]) / data.iloc[-period]["Close"] * 100), 2) if len(data) >= period else 0
-
-    def calc_ytd_return(data):
-        ytd_data = data[data.index >= f"{today.year}-01-01"]
-        return round(((data.iloc[-1]["Close"] - ytd_data.iloc[0]["Close"]) / ytd_data.iloc[0]["Close"] * 100), 2) if len(ytd_data) > 0 else 0
-
-    def calc_volatility(data, period=None):
-        if period:
-            data = data.iloc[-period:]
-        return round(data["Close"].pct_change().std() * (252 ** 0.5) * 100, 2) if not data.empty else 0
 
+def get_chart_data(ticker):
+    """OHLCV arrays from the snapshot's 5-year history for charting (dates as exchange-local datetime64)."""
+    history = as_snapshot(ticker).history
+    index = history.index.tz_localize(None) if history.index.tz is not None else history.index
     return {
-        "ytd_return": calc_ytd_return(history),
-        "1_year_return": calc_return(history, 252),
-        "3_year_return": calc_return(history, 756),
-        "5_year_return": calc_return(history, len(history)),
-        "sp500_ytd_return": calc_ytd_return(sp500),
-        "sp500_1_year_return": calc_return(sp500, 252),
-        "sp500_3_year_return": calc_return(sp500, 756),
-        "sp500_5_year_return": calc_return(sp500, len(sp500)),
-        "sector_ytd_return": calc_ytd_return(sector_data) if sector_data is not None else 0,
-        "sector_1_year_return": calc_return(sector_data, 252) if sector_data is not None else 0,
-        "sector_3_year_return": calc_return(sector_data, 756) if sector_data is not None else 0,
-        "sector_5_year_return": calc_return(sector_data, len(sector_data)) if sector_data is not None else 0,
-        "volatility_ytd": calc_volatility(history[history.index >= f"{today.year}-01-01"]),
-        "volatility_1_year": calc_volatility(history, 252),
-        "volatility_3_year": calc_volatility(history, 756),
-        "volatility_5_year": calc_volatility(history)
+        "dates": index.to_numpy(dtype="datetime64[ns]"),
+        **{column.lower(): history[column].to_numpy(dtype=np.float64) for column in ("Open", "High", "Low", "Close", "Volume")}
     }
 
-def get_price_trend(ticker):
-    stock = yf.Ticker(ticker)
-    history = stock.history(period="5y")
-    closing_prices = {str(date): price for date, price in history["Close"].to_dict().items()}
-    return {"5_year_closing_prices": closing_prices}
+# Peer metric names (see peers.METRICS) in the row order of the dividend, valuation and balance sheet tables
+DIVIDEND_METRICS = ["dividend_yield", "dividend_rate", "payout_ratio", "dividend_growth"]
+VALUATION_METRICS = ["pe_ratio", "pb_ratio", "peg_ratio", "ev_ebitda", "fcf_yield"]
+BALANCE_METRICS = ["cash_b", "current_ratio", "equity_b", "net_income_b", "revenue_b", "roe", "total_debt_b"]
+
+def _peer_column(medians, names, suffixes=None):
+    """Peer medians for a table column: rounded numbers, or formatted strings ("-" when missing) when suffixes are given."""
+    values = [medians.get(name) for name in names]
+    if suffixes is None:
+        return [round(value, 2) if value is not None else None for value in values]
+    return [f"{value:.2f}{suffix}" if value is not None else "-" for value, suffix in zip(values, suffixes)]
 
 def get_dividend_metrics(ticker):
-    stock = yf.Ticker(ticker)
-    info = stock.info
-    dividends = stock.dividends
-    history = stock.history(period="5y")
-    earnings = stock.income_stmt
+    snapshot = as_snapshot(ticker)
+    info = snapshot.info
+    dividends = snapshot.dividends
+    history = snapshot.history
     current_price = history['Close'].iloc[-1] if not history.empty else 0
     current_dividend = info.get('dividendRate', 0)
     dividend_yield = info.get('dividendYield', 0) * 100 if info.get('dividendYield') else 0
@@ -113,60 +105,55 @@ def get_dividend_metrics(ticker):
         "Current": [f"{dividend_yield:.2f}%", f"{dividend_payout:.2f}", f"{payout_ratio:.2f}%", f"{dividend_growth:.2f}%"],
         "1-Yr Ago": [f"{dividend_yield_1yr:.2f}%", f"{dividend_1yr:.2f}", f"{payout_ratio_1yr:.2f}%", "-"],
         "5-Yr Avg": [f"{dividend_5yr_avg_yield:.2f}%", f"{dividend_5yr_avg:.2f}", "-", "-"],
-        "Industry Avg": ["1.2%", "1.50", "20.0%", "5.0%"]
+        "Industry Avg": _peer_column(peer_universe.peer_medians(info, level="sector"), DIVIDEND_METRICS, ["%", "", "%", "%"])
     }
 
 def calculate_dcf(ticker, years=5, discount_rate=0.10, growth_rate=0.05):
-    stock = yf.Ticker(ticker)
-    cash_flows = stock.cashflow
-    fcf = cash_flows.loc['Free Cash Flow'].iloc[0] if 'Free Cash Flow' in cash_flows.index else 0
-    future_cash_flows = [fcf * (1 + growth_rate) ** year for year in range(1, years + 1)]
-    present_values = [cf / (1 + discount_rate) ** year for year, cf in enumerate(future_cash_flows, 1)]
-    terminal_value = future_cash_flows[-1] * (1 + growth_rate) / (discount_rate - growth_rate)
-    pv_terminal = terminal_value / (1 + discount_rate) ** years
-    total_pv = sum(present_values) + pv_terminal
-    shares = stock.info.get('sharesOutstanding', 1)
-    return total_pv / shares if shares else 0
-
-def get_financial_strength(ticker):
-    stock = yf.Ticker(ticker)
-    info = stock.info
-    balance_sheet = stock.balance_sheet
+    inputs = dcf_inputs(ticker)
+    return dcf_point(inputs["fcf"], inputs["shares"], discount_rate, growth_rate, growth_rate, years)
+
+def get_financial_strength(ticker, dcf=None):
+    """Profitability, cash and DCF value; dcf is a precomputed dcf_sensitivity result for the same ticker."""
+    snapshot = as_snapshot(ticker)
+    info = snapshot.info
+    balance_sheet = snapshot.balance_sheet
     profit_margin = info.get("profitMargins", 0) * 100
     cash_reserves = balance_sheet.loc['Cash'].iloc[0] if 'Cash' in balance_sheet.index else info.get('totalCash', 0)
+    dcf = dcf or dcf_sensitivity(snapshot)
     return {
         "profit_margin": profit_margin,
         "cash_reserves": cash_reserves,
         "pe_ratio": info.get("forwardPE", 0),
-        "dcf_intrinsic_value": round(calculate_dcf(ticker), 2)
+        "dcf_intrinsic_value": dcf["base_value"],
+        "dcf_value_band": dcf["band"]
     }
 
 def get_valuation_ratios(ticker):
-    stock = yf.Ticker(ticker)
-    info = stock.info
+    snapshot = as_snapshot(ticker)
+    info = snapshot.info
     market_cap = info.get("marketCap", 0)
     return {
         "Metric": ["P/E Ratio", "P/B Ratio", "PEG Ratio", "EV/EBITDA", "FCF Yield"],
-        ticker: [
+        snapshot.ticker: [
             info.get("forwardPE", None),
             info.get("priceToBook", None),
             info.get("pegRatio", None),
             info.get("enterpriseToEbitda", None),
             (info.get("freeCashflow", 0) / market_cap * 100) if market_cap else None
         ],
-        "Industry Avg": [28.0, 7.0, 2.0, 18.0, 4.0],
-        "Peer Avg": [30.0, 8.0, 2.2, 20.0, 4.0]
+        "Industry Avg": _peer_column(peer_universe.peer_medians(info, level="sector"), VALUATION_METRICS),
+        "Peer Avg": _peer_column(peer_universe.peer_medians(info), VALUATION_METRICS)
     }
 
 def get_balance_sheet_metrics(ticker):
-    stock = yf.Ticker(ticker)
-    balance_sheet = stock.balance_sheet
-    financials = stock.financials
+    snapshot = as_snapshot(ticker)
+    balance_sheet = snapshot.balance_sheet
+    financials = snapshot.financials
     metrics = {
         "Metric": ["Cash ($B)", "Current Ratio", "Equity ($B)", "Net Income ($B)", "Revenue ($B)", "ROE (%)", "Total Debt ($B)"],
         "TTM": [None] * 7,
         "1-Yr Ago": [None] * 7,
-        "Industry Avg": [50, 1.5, 60, 50.0, 200.0, 120, 80]
+        "Industry Avg": _peer_column(peer_universe.peer_medians(snapshot.info, level="sector"), BALANCE_METRICS)
     }
     if not balance_sheet.empty and not financials.empty:
         latest_balance = balance_sheet.iloc[:, 0]
@@ -181,9 +168,9 @@ def get_balance_sheet_metrics(ticker):
     return metrics
 
 def get_eps_growth_trend(ticker):
-    stock = yf.Ticker(ticker)
-    quarterly_financials = stock.quarterly_financials
-    info = stock.info
+    snapshot = as_snapshot(ticker)
+    quarterly_financials = snapshot.quarterly_financials
+    info = snapshot.info
     tz = pytz.timezone('America/New_York')
     eps_quarterly = []
     if not quarterly_financials.empty:
@@ -197,117 +184,68 @@ def get_eps_growth_trend(ticker):
                 eps_quarterly.append({"date": date, "eps": eps})
     return sorted(eps_quarterly, key=lambda x: x["date"]) if eps_quarterly else []
 
+def _frame_arrays(frame):
+    """Epoch-nanosecond dates and float columns of a history frame."""
+    index = frame.index.as_unit("ns")
+    return index.asi8, {column: frame[column].to_numpy(dtype=np.float64) for column in ("Open", "High", "Low", "Close", "Volume") if column in frame}
+
 def get_volatility_indicators(ticker):
-    stock = yf.Ticker(ticker)
-    vix_ticker = "^VIX"
-    sp500_ticker = "^GSPC"
-    vix = yf.Ticker(vix_ticker)
-    sp500 = yf.Ticker(sp500_ticker)
+    snapshot = as_snapshot(ticker)
     tz = pytz.timezone('America/New_York')
 
     end_date = datetime.now(tz)
-    start_date = end_date - timedelta(days=365)
-    start_date_5y = end_date - timedelta(days=5*365)
-
-    hist_data = stock.history(start=start_date, end=end_date, interval="1d")
-    vix_data = vix.history(start=start_date, end=end_date, interval="1d")
-    aapl_5y = stock.history(start=start_date_5y, end=end_date, interval="1d")
-    sp500_5y = sp500.history(start=start_date_5y, end=end_date, interval="1d")
-
-    volatility_indicators = []
-
-    def calculate_atr(data, periods=14):
-        if data.empty:
-            return None
-        high_low = data['High'] - data['Low']
-        high_close = np.abs(data['High'] - data['Close'].shift())
-        low_close = np.abs(data['Low'] - data['Close'].shift())
-        tr = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-        atr = tr.rolling(window=periods).mean().iloc[-1]
-        return atr if pd.notna(atr) else None
-
-    atr_current = calculate_atr(hist_data)
-    atr_1m_ago = calculate_atr(hist_data[:-21])
+    start_ns = pd.Timestamp(end_date - timedelta(days=365)).value
+    start_5y_ns = pd.Timestamp(end_date - timedelta(days=5*365)).value
+
+    # Each indicator is computed once as a full series; every lookback is then a single read
+    dates, columns = _frame_arrays(snapshot.history)
+    if not len(dates):
+        return []
+    one_year = dates >= start_ns
+    five_year = dates >= start_5y_ns
+    high, low, close = columns["High"][one_year], columns["Low"][one_year], columns["Close"][one_year]
+
+    atr = at_lookbacks(atr_series(high, low, close, 14))
+    bollinger = at_lookbacks(bollinger_width_series(close, 20))
+
+    vix_dates, vix_close = benchmark_cache.arrays("^VIX", "5y")
+    vix_window = vix_dates >= start_ns
+    stock_returns, vix_returns = align(dates[one_year], pct_change(close), vix_dates[vix_window], pct_change(vix_close[vix_window]))
+    vix_correlation = at_lookbacks(expanding_corr(stock_returns, vix_returns))
+
+    sp500_dates, sp500_close = benchmark_cache.arrays("^GSPC", "5y")
+    sp500_window = sp500_dates >= start_5y_ns
+    stock_returns_5y, market_returns = align(dates[five_year], pct_change(columns["Close"][five_year]), sp500_dates[sp500_window], pct_change(sp500_close[sp500_window]))
+    beta = at_lookbacks(expanding_beta(stock_returns_5y, market_returns))
+
+    atr_current, atr_1m_ago = atr["value"], atr["1_month_ago"]
     atr_signal = "High" if atr_current and atr_current > 3.0 else "Moderate" if atr_current else None
     atr_trend = "Up" if atr_current and atr_1m_ago and atr_current > atr_1m_ago else "Down" if atr_current and atr_1m_ago else None
 
-    def calculate_bollinger_width(data, periods=20):
-        if data.empty:
-            return None
-        sma = data['Close'].rolling(window=periods).mean()
-        std = data['Close'].rolling(window=periods).std()
-        upper_band = sma + 2 * std
-        lower_band = sma - 2 * std
-        bollinger_width = ((upper_band - lower_band) / sma * 100).iloc[-1]
-        return bollinger_width if pd.notna(bollinger_width) else None
-
-    bollinger_width_current = calculate_bollinger_width(hist_data)
-    bollinger_width_1m_ago = calculate_bollinger_width(hist_data[:-21])
+    bollinger_width_current, bollinger_width_1m_ago = bollinger["value"], bollinger["1_month_ago"]
     bollinger_signal = "Expanding" if bollinger_width_current and bollinger_width_current > 12 else "Neutral" if bollinger_width_current else None
     bollinger_trend = "Up" if bollinger_width_current and bollinger_width_1m_ago and bollinger_width_current > bollinger_width_1m_ago else "Down" if bollinger_width_current and bollinger_width_1m_ago else None
 
-    def calculate_vix_correlation(stock_data, vix_data):
-        if stock_data.empty or vix_data.empty:
-            return None
-        aligned_data = pd.concat([stock_data['Close'].pct_change(), vix_data['Close'].pct_change()], axis=1).dropna()
-        correlation = aligned_data.corr().iloc[0, 1]
-        return correlation if pd.notna(correlation) else None
-
-    vix_correlation_current = calculate_vix_correlation(hist_data, vix_data)
-    vix_correlation_1m_ago = calculate_vix_correlation(hist_data[:-21], vix_data[:-21])
+    vix_correlation_current, vix_correlation_1m_ago = vix_correlation["value"], vix_correlation["1_month_ago"]
     vix_corr_signal = ("Moderate" if vix_correlation_current and 0.4 <= abs(vix_correlation_current) <= 0.7 else
                       "High" if vix_correlation_current and abs(vix_correlation_current) > 0.7 else
                       "Low" if vix_correlation_current else None)
     vix_corr_trend = "Up" if vix_correlation_current and vix_correlation_1m_ago and abs(vix_correlation_current) > abs(vix_correlation_1m_ago) else "Stable" if vix_correlation_current and vix_correlation_1m_ago else None
 
-    def calculate_beta(stock_data, market_data):
-        if stock_data.empty or market_data.empty:
-            return None
-        returns = pd.concat([stock_data['Close'].pct_change(), market_data['Close'].pct_change()], axis=1).dropna()
-        cov_matrix = returns.cov()
-        beta = cov_matrix.iloc[0, 1] / returns.iloc[:, 1].var()
-        return beta if pd.notna(beta) else None
-
-    beta_current = calculate_beta(aapl_5y, sp500_5y)
-    beta_1m_ago = calculate_beta(aapl_5y[:-21], sp500_5y[:-21])
+    beta_current, beta_1m_ago = beta["value"], beta["1_month_ago"]
     beta_signal = "High" if beta_current and beta_current > 1.0 else "Low" if beta_current else None
     beta_trend = "Up" if beta_current and beta_1m_ago and beta_current > beta_1m_ago else "Down" if beta_current and beta_1m_ago else None
 
-    volatility_indicators.extend([
-        {
-            'indicator': 'ATR (14-day)',
-            'value': atr_current,
-            'signal': atr_signal,
-            '1_month_ago': atr_1m_ago,
-            'trend': atr_trend
-        },
-        {
-            'indicator': 'Bollinger Width',
-            'value': bollinger_width_current,
-            'signal': bollinger_signal,
-            '1_month_ago': bollinger_width_1m_ago,
-            'trend': bollinger_trend
-        },
-        {
-            'indicator': 'VIX Correlation',
-            'value': vix_correlation_current,
-            'signal': vix_corr_signal,
-            '1_month_ago': vix_correlation_1m_ago,
-            'trend': vix_corr_trend
-        },
-        {
-            'indicator': '5-Year Beta',
-            'value': beta_current,
-            'signal': beta_signal,
-            '1_month_ago': beta_1m_ago,
-            'trend': beta_trend
-        }
-    ])
-
-    return volatility_indicators
+    return [
+        {'indicator': 'ATR (14-day)', **atr, 'signal': atr_signal, 'trend': atr_trend},
+        {'indicator': 'Bollinger Width', **bollinger, 'signal': bollinger_signal, 'trend': bollinger_trend},
+        {'indicator': 'VIX Correlation', **vix_correlation, 'signal': vix_corr_signal, 'trend': vix_corr_trend},
+        {'indicator': '5-Year Beta', **beta, 'signal': beta_signal, 'trend': beta_trend}
+    ]
 
 def format_volatility_data(ticker):
-    volatility_data = get_volatility_indicators(ticker)
+    snapshot = as_snapshot(ticker)
+    volatility_data = get_volatility_indicators(snapshot)
 
     if not volatility_data:
         return pd.DataFrame(), "No volatility data available for the specified ticker."
@@ -323,5 +261,5 @@ def format_volatility_data(ticker):
         df = df[['indicator', 'value', 'signal', '1_month_ago', 'trend']]
         df.columns = ['Indicator', 'Value', 'Signal', '1-Month Ago', 'Trend']
 
-    narrative = f"Volatility indicators for {ticker}, including ATR (14-day), Bollinger Width, VIX Correlation, and 5-Year Beta, based on Yahoo Finance data."
+    narrative = f"Volatility indicators for {snapshot.ticker}, including ATR (14-day), Bollinger Width, VIX Correlation, and 5-Year Beta, based on Yahoo Finance data."
     return df, narrative
\ No newline at end of file
@@ -0,0 +1,74 @@
+import numpy as np
+from snapshot import as_snapshot
+
+# Sensitivity grid; the base case (10% discount, 5% growth and terminal growth, 5 years) is the report's headline value
+DISCOUNT_RATES = np.round(np.arange(0.07, 0.1301, 0.01), 4)
+GROWTH_RATES = np.round(np.arange(0.0, 0.1001, 0.01), 4)
+TERMINAL_GROWTH_RATES = np.array([0.01, 0.02, 0.03, 0.04, 0.05])
+HORIZONS = np.array([5, 10])
+BASE_CASE = {"discount_rate": 0.10, "growth_rate": 0.05, "terminal_growth_rate": 0.05, "years": 5}
+BAND_PERCENTILES = {"p10": 10, "p25": 25, "median": 50, "p75": 75, "p90": 90}
+
+
+def dcf_inputs(ticker):
+    """Latest free cash flow and share count, read once from the snapshot."""
+    snapshot = as_snapshot(ticker)
+    cash_flows = snapshot.cashflow
+    fcf = cash_flows.loc["Free Cash Flow"].iloc[0] if "Free Cash Flow" in cash_flows.index else 0
+    return {"fcf": float(fcf) if np.isfinite(fcf) else 0.0, "shares": snapshot.info.get("sharesOutstanding", 1)}
+
+
+def dcf_surface(fcf, shares, discount_rates=DISCOUNT_RATES, growth_rates=GROWTH_RATES,
+                terminal_growth_rates=TERMINAL_GROWTH_RATES, horizons=HORIZONS):
+    """
+    Intrinsic value per share for every (discount, growth, terminal growth, horizon) combination, as a
+    D x G x T x H array. Cash flow grows at the growth rate for `horizon` years and then at the terminal
+    rate forever (Gordon growth); combinations with discount <= terminal growth are NaN.
+    """
+    if not shares:
+        return np.zeros((len(discount_rates), len(growth_rates), len(terminal_growth_rates), len(horizons)))
+    r = np.asarray(discount_rates, dtype=np.float64)[:, None, None, None]
+    g = np.asarray(growth_rates, dtype=np.float64)[None, :, None, None]
+    t = np.asarray(terminal_growth_rates, dtype=np.float64)[None, None, :, None]
+    horizons = np.asarray(horizons)
+    years = np.arange(1, horizons.max() + 1)
+    # Discounted explicit-period cash flows per year, summed up to each horizon
+    discounted = ((1 + g[..., 0]) / (1 + r[..., 0]))[..., None] ** years
+    explicit = np.cumsum(discounted, axis=-1)[..., horizons - 1]
+    final = discounted[..., horizons - 1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        terminal = np.where(r > t, final * (1 + t) / (r - t), np.nan)
+    return fcf * (explicit + terminal) / shares
+
+
+def dcf_band(surface, percentiles=BAND_PERCENTILES):
+    """Percentiles of intrinsic value across all valid scenarios."""
+    values = surface[np.isfinite(surface)]
+    if not values.size:
+        return {name: None for name in percentiles}
+    points = np.percentile(values, list(percentiles.values()))
+    return {name: round(float(point), 2) for name, point in zip(percentiles, points)}
+
+
+def dcf_point(fcf, shares, discount_rate, growth_rate, terminal_growth_rate, years):
+    return float(dcf_surface(fcf, shares, [discount_rate], [growth_rate], [terminal_growth_rate], [years])[0, 0, 0, 0])
+
+
+def dcf_sensitivity(ticker):
+    """
+    Base-case value, percentile band over the full grid and a discount x growth heatmap (base terminal
+    growth and horizon) for the report and its chart.
+    """
+    inputs = dcf_inputs(ticker)
+    surface = dcf_surface(inputs["fcf"], inputs["shares"])
+    terminal_index = int(np.argmin(np.abs(TERMINAL_GROWTH_RATES - BASE_CASE["terminal_growth_rate"])))
+    horizon_index = int(np.argmin(np.abs(HORIZONS - BASE_CASE["years"])))
+    return {
+        "base_value": round(dcf_point(inputs["fcf"], inputs["shares"], **BASE_CASE), 2),
+        "band": dcf_band(surface),
+        "discount_rates": DISCOUNT_RATES.tolist(),
+        "growth_rates": GROWTH_RATES.tolist(),
+        "heatmap": np.round(surface[:, :, terminal_index, horizon_index], 2).tolist(),
+        "heatmap_terminal_growth_rate": float(TERMINAL_GROWTH_RATES[terminal_index]),
+        "heatmap_years": int(HORIZONS[horizon_index])
+    }
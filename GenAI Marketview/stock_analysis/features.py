@@ -0,0 +1,158 @@
+import numpy as np
+from rolling import rolling_mean, rolling_std, rsi_series, pct_change
+
+
+def _day(date):
+    return str(np.datetime_as_string(date, unit="D"))
+
+
+def _pct(value):
+    return round(float(value) * 100, 2) if np.isfinite(value) else None
+
+
+def drawdown_episodes(dates, close, min_depth=0.10, limit=3):
+    """Largest peak-to-trough declines, each with its recovery date (None if not yet recovered)."""
+    running_peak = np.maximum.accumulate(close)
+    drawdown = close / running_peak - 1
+    episodes, i, n = [], 0, len(close)
+    while i < n:
+        if drawdown[i] >= 0:
+            i += 1
+            continue
+        start = i - 1
+        end = i
+        while end < n and drawdown[end] < 0:
+            end += 1
+        if end == i:
+            # A NaN close is neither a peak nor part of a decline
+            i += 1
+            continue
+        trough = start + 1 + int(np.argmin(drawdown[start + 1:end]))
+        depth = drawdown[trough]
+        if -depth >= min_depth:
+            episodes.append({
+                "peak_date": _day(dates[start]), "trough_date": _day(dates[trough]),
+                "recovery_date": _day(dates[end]) if end < n else None, "decline_pct": _pct(depth)
+            })
+        i = end
+    return sorted(episodes, key=lambda e: e["decline_pct"])[:limit]
+
+
+def swing_pivots(close, reversal=0.10):
+    """Zigzag turning points: indices where the price reversed by at least `reversal` from its extreme."""
+    n = len(close)
+    if n < 2:
+        return [0] * n
+    trend, low, high, extreme, pivots = 0, 0, 0, 0, []
+    for i in range(1, n):
+        price = close[i]
+        if trend == 0:
+            low = i if price < close[low] else low
+            high = i if price > close[high] else high
+            if price >= close[low] * (1 + reversal):
+                trend, extreme, pivots = 1, i, [low]
+            elif price <= close[high] * (1 - reversal):
+                trend, extreme, pivots = -1, i, [high]
+        elif (price - close[extreme]) * trend > 0:
+            extreme = i
+        elif (trend == 1 and price <= close[extreme] * (1 - reversal)) or (trend == -1 and price >= close[extreme] * (1 + reversal)):
+            pivots.append(extreme)
+            trend, extreme = -trend, i
+    return pivots + [extreme] if pivots else []
+
+
+def rally_episodes(dates, close, reversal=0.10, limit=3):
+    """Largest zigzag up-legs (trough to peak, ended by a reversal of at least `reversal`)."""
+    pivots = swing_pivots(close, reversal)
+    legs = [
+        {"trough_date": _day(dates[a]), "peak_date": _day(dates[b]), "gain_pct": _pct(close[b] / close[a] - 1), "ongoing": b == pivots[-1]}
+        for a, b in zip(pivots[:-1], pivots[1:]) if close[b] > close[a]
+    ]
+    return sorted(legs, key=lambda leg: -leg["gain_pct"])[:limit]
+
+
+def sma_crossovers(dates, close, fast=50, slow=200, limit=5):
+    """Most recent golden/death crosses of the fast and slow simple moving averages."""
+    fast_sma, slow_sma = rolling_mean(close, fast), rolling_mean(close, slow)
+    valid = np.isfinite(slow_sma)
+    above = np.where(valid, fast_sma > slow_sma, False)
+    crossings = np.flatnonzero(valid[1:] & valid[:-1] & (above[1:] != above[:-1])) + 1
+    return [
+        {"date": _day(dates[i]), "type": "golden cross" if above[i] else "death cross", "price": round(float(close[i]), 2)}
+        for i in crossings[-limit:]
+    ]
+
+
+def largest_moves(dates, close, limit=3):
+    returns = pct_change(close)
+    order = np.argsort(np.nan_to_num(returns, nan=0.0))
+    moves = lambda indices: [{"date": _day(dates[i]), "change_pct": _pct(returns[i])} for i in indices if np.isfinite(returns[i])]
+    return {"largest_gains": moves(order[::-1][:limit]), "largest_losses": moves(order[:limit])}
+
+
+def yearly_returns(dates, close):
+    years = dates.astype("datetime64[Y]")
+    boundaries = np.flatnonzero(years[1:] != years[:-1]) + 1
+    starts, ends = np.concatenate(([0], boundaries)), np.concatenate((boundaries, [len(close)])) - 1
+    # Each year is measured from the previous year's last close where available
+    bases = np.where(starts > 0, starts - 1, starts)
+    return {str(years[s].astype(int) + 1970): _pct(close[e] / close[b] - 1) for s, e, b in zip(starts, ends, bases)}
+
+
+def price_digest(chart_data):
+    """Compact summary of a multi-year close series for narration prompts, in place of every daily close."""
+    dates, close = chart_data["dates"], chart_data["close"]
+    # Bars without a close (e.g. a missing print) would break the episode and pivot scans below
+    valid = ~np.isnan(close)
+    dates, close = dates[valid], close[valid]
+    if len(close) < 2:
+        return {}
+    returns = pct_change(close)
+    years = (dates[-1] - dates[0]) / np.timedelta64(365, "D")
+    last_year = close[-252:]
+    sma_50, sma_200 = rolling_mean(close, 50)[-1], rolling_mean(close, 200)[-1]
+    return {
+        "period": {"start": _day(dates[0]), "end": _day(dates[-1]), "start_price": round(float(close[0]), 2), "end_price": round(float(close[-1]), 2)},
+        "total_return_pct": _pct(close[-1] / close[0] - 1),
+        "annualized_return_pct": _pct((close[-1] / close[0]) ** (1 / years) - 1) if years > 0 else None,
+        "annualized_volatility_pct": _pct(np.nanstd(returns[-252:], ddof=1) * np.sqrt(252)),
+        "yearly_returns_pct": yearly_returns(dates, close),
+        "drawdowns": drawdown_episodes(dates, close),
+        "rallies": rally_episodes(dates, close),
+        "sma_50_200_crossovers": sma_crossovers(dates, close),
+        **largest_moves(dates, close),
+        "current": {
+            "pct_from_52_week_high": _pct(close[-1] / last_year.max() - 1),
+            "pct_from_52_week_low": _pct(close[-1] / last_year.min() - 1),
+            "pct_vs_sma_50": _pct(close[-1] / sma_50 - 1),
+            "pct_vs_sma_200": _pct(close[-1] / sma_200 - 1),
+            "return_3_month_pct": _pct(close[-1] / close[-63] - 1) if len(close) > 63 else None,
+            "return_6_month_pct": _pct(close[-1] / close[-126] - 1) if len(close) > 126 else None
+        }
+    }
+
+
+def candlestick_digest(chart_data, price_levels_data, days=126):
+    """Six-month technical summary matching the candlestick chart: range, RSI, Bollinger position, volume trend."""
+    close, volume = chart_data["close"], chart_data["volume"]
+    if len(close) < 2:
+        return {"support": (price_levels_data.get("Support") or [None])[0], "resistance": (price_levels_data.get("Resistance") or [None])[0]}
+    window = slice(max(len(close) - days, 0), None)
+    dates = chart_data["dates"][window]
+    middle, band = rolling_mean(close, 20)[-1], 2 * rolling_std(close, 20)[-1]
+    rsi = rsi_series(close)
+    recent_volume, window_volume = volume[-20:].mean(), volume[window].mean()
+    return {
+        "period": {"start": _day(dates[0]), "end": _day(dates[-1])},
+        "return_pct": _pct(close[-1] / close[window][0] - 1),
+        "high": round(float(chart_data["high"][window].max()), 2),
+        "low": round(float(chart_data["low"][window].min()), 2),
+        "close": round(float(close[-1]), 2),
+        "rsi_14": round(float(rsi[-1]), 1) if np.isfinite(rsi[-1]) else None,
+        "rsi_14_one_month_ago": round(float(rsi[-22]), 1) if len(rsi) > 21 and np.isfinite(rsi[-22]) else None,
+        "bollinger_position_pct": _pct((close[-1] - (middle - band)) / (2 * band)) if band else None,
+        "volume_20_day_vs_6_month_pct": _pct(recent_volume / window_volume - 1) if window_volume else None,
+        **largest_moves(dates, close[window]),
+        "support": (price_levels_data.get("Support") or [None])[0],
+        "resistance": (price_levels_data.get("Resistance") or [None])[0]
+    }
@@ -0,0 +1,233 @@
+"""
+Persistent local store of each ticker's Yahoo Finance fundamentals.
+
+    python fundamentals_store.py AAPL MSFT          # seed or refresh the store, e.g. before running offline
+
+Statements change only when a company files, so they are refetched once a new filing is due for the
+latest stored fiscal period (and re-checked daily until it lands), or after FUNDAMENTALS_MAX_AGE_SECONDS.
+Fetched periods are merged into the stored ones. Price-driven info fields are refreshed from the cheap
+fast_info endpoint after FUNDAMENTALS_FAST_TTL_SECONDS, and the full info and dividends after
+FUNDAMENTALS_INFO_TTL_SECONDS. With OFFLINE_MODE set, only stored data is served.
+
+Layout: FUNDAMENTALS_DIR/<TICKER>/manifest.json records when each artefact was fetched; every frame is an
+.npz of index, columns and a float64 value matrix (statements: line items x fiscal period ends).
+"""
+import json
+import os
+import re
+import sys
+import threading
+import time
+import numpy as np
+import pandas as pd
+from cache_utils import atomic_write
+from providers import yahoo_ticker
+from config import (
+    FUNDAMENTALS_DIR, FUNDAMENTALS_MAX_AGE_SECONDS, FUNDAMENTALS_RECHECK_SECONDS, FUNDAMENTALS_INFO_TTL_SECONDS,
+    FUNDAMENTALS_FAST_TTL_SECONDS, OFFLINE_MODE
+)
+
+STATEMENTS = ("income_stmt", "balance_sheet", "financials", "quarterly_financials", "cashflow")
+# Days from a fiscal period end until the filing for the next period is expected (10-K / 10-Q deadlines plus a margin)
+NEXT_FILING_DAYS = {"income_stmt": 365 + 90, "balance_sheet": 365 + 90, "financials": 365 + 90, "cashflow": 365 + 90,
+                    "quarterly_financials": 91 + 45}
+# info field -> fast_info field, for values that move with the price
+FAST_INFO_FIELDS = {
+    "currentPrice": "lastPrice", "regularMarketPrice": "lastPrice", "marketCap": "marketCap",
+    "previousClose": "previousClose", "dayHigh": "dayHigh", "dayLow": "dayLow", "volume": "lastVolume",
+    "fiftyTwoWeekHigh": "yearHigh", "fiftyTwoWeekLow": "yearLow"
+}
+
+
+def _encode_index(index):
+    """(values, tz) for an npz: int64 UTC nanoseconds for datetime indexes, strings otherwise."""
+    if isinstance(index, pd.DatetimeIndex):
+        tz = str(index.tz) if index.tz is not None else ""
+        utc = index.tz_convert("UTC") if index.tz is not None else index
+        return utc.as_unit("ns").asi8, tz
+    return np.array([str(value) for value in index], dtype=str), ""
+
+
+def _decode_index(values, tz):
+    if values.dtype.kind != "i":
+        return pd.Index(values.tolist())
+    if not tz:
+        return pd.DatetimeIndex(pd.to_datetime(values, unit="ns"))
+    return pd.DatetimeIndex(pd.to_datetime(values, unit="ns", utc=True)).tz_convert(tz)
+
+
+def save_frame(path, frame):
+    index, index_tz = _encode_index(frame.index)
+    columns, columns_tz = _encode_index(frame.columns)
+    values = frame.apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64) if frame.size else np.empty(frame.shape)
+    atomic_write(path, lambda f: np.savez(f, index=index, index_tz=index_tz, columns=columns, columns_tz=columns_tz, values=values))
+
+
+def load_frame(path):
+    try:
+        with np.load(path) as data:
+            return pd.DataFrame(
+                data["values"],
+                index=_decode_index(data["index"], str(data["index_tz"])),
+                columns=_decode_index(data["columns"], str(data["columns_tz"]))
+            )
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def merge_periods(fresh, stored):
+    """Fetched statement with stored fiscal periods it no longer includes; fetched values win, newest period first."""
+    if stored is None or stored.empty:
+        return fresh
+    if fresh.empty:
+        return stored
+    merged = fresh.combine_first(stored)
+    rows = list(fresh.index) + [item for item in stored.index if item not in fresh.index]
+    return merged.reindex(index=rows, columns=sorted(merged.columns, reverse=True))
+
+
+class FundamentalsStore:
+    """Per-ticker fundamentals on disk with filing-aware refresh; see the module docstring."""
+
+    def __init__(self, root=FUNDAMENTALS_DIR, offline=OFFLINE_MODE):
+        self.root = root
+        self.offline = offline
+        self._locks = {}
+        self._guard = threading.Lock()
+        self.stats = {"hits": 0, "fetches": 0, "stale_served": 0}
+
+    def _dir(self, ticker):
+        return os.path.join(self.root, re.sub(r"[^A-Za-z0-9_.-]", "_", ticker))
+
+    def _path(self, ticker, name):
+        return os.path.join(self._dir(ticker), f"{name}.npz")
+
+    def _lock(self, ticker, name):
+        with self._guard:
+            return self._locks.setdefault((ticker, name), threading.Lock())
+
+    def manifest(self, ticker):
+        try:
+            with open(os.path.join(self._dir(ticker), "manifest.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _record(self, ticker, name, **entry):
+        with self._lock(ticker, "manifest"):
+            manifest = self.manifest(ticker)
+            manifest[name] = {**manifest.get(name, {}), **entry}
+            payload = json.dumps(manifest, indent=1).encode()
+            atomic_write(os.path.join(self._dir(ticker), "manifest.json"), lambda f: f.write(payload))
+
+    def _serve(self, ticker, name, is_fresh, fetch, load, save, empty):
+        """Stored value when fresh (or offline); otherwise fetch and store it, falling back to the stored value on failure."""
+        with self._lock(ticker, name):
+            entry = self.manifest(ticker).get(name)
+            stored = load() if entry else None
+            if stored is not None and (self.offline or is_fresh(entry, time.time())):
+                self.stats["hits"] += 1
+                return stored
+            if self.offline:
+                return empty()
+            try:
+                value = fetch(entry, stored)
+            except Exception as e:
+                if stored is None:
+                    raise
+                print(f"Serving stored {name} for {ticker}; refresh failed: {e}")
+                self.stats["stale_served"] += 1
+                return stored
+            self.stats["fetches"] += 1
+            return save(value, stored)
+
+    def statement(self, ticker, name, stock=None):
+        """A financial statement (line items x fiscal period ends, newest first)."""
+        stock = stock or yahoo_ticker(ticker)
+        path = self._path(ticker, name)
+
+        def is_fresh(entry, now):
+            if now - entry["fetched_at"] >= FUNDAMENTALS_MAX_AGE_SECONDS:
+                return False
+            latest = entry.get("latest_period")
+            filing_due = latest is None or now >= latest + NEXT_FILING_DAYS[name] * 86400
+            return not filing_due or now - entry["fetched_at"] < FUNDAMENTALS_RECHECK_SECONDS
+
+        def save(fresh, stored):
+            merged = merge_periods(fresh, stored)
+            save_frame(path, merged)
+            latest = merged.columns.max() if isinstance(merged.columns, pd.DatetimeIndex) and len(merged.columns) else None
+            self._record(ticker, name, fetched_at=time.time(), latest_period=latest.timestamp() if latest is not None else None)
+            return merged
+
+        return self._serve(ticker, name, is_fresh, lambda entry, stored: getattr(stock, name), lambda: load_frame(path), save, pd.DataFrame)
+
+    def _timed_frame(self, ticker, name, ttl, fetch):
+        """A time-indexed frame that is simply replaced once older than ttl."""
+        path = self._path(ticker, name)
+
+        def save(fresh, stored):
+            save_frame(path, fresh)
+            self._record(ticker, name, fetched_at=time.time())
+            return fresh
+
+        return self._serve(ticker, name, lambda entry, now: now - entry["fetched_at"] < ttl, lambda entry, stored: fetch(),
+                           lambda: load_frame(path), save, pd.DataFrame)
+
+    def history(self, ticker, stock=None, period="5y"):
+        stock = stock or yahoo_ticker(ticker)
+        return self._timed_frame(ticker, f"history_{period}", FUNDAMENTALS_FAST_TTL_SECONDS, lambda: stock.history(period=period))
+
+    def dividends(self, ticker, stock=None):
+        stock = stock or yahoo_ticker(ticker)
+        frame = self._timed_frame(ticker, "dividends", FUNDAMENTALS_INFO_TTL_SECONDS, lambda: stock.dividends.to_frame("Dividends"))
+        return frame["Dividends"] if "Dividends" in frame else pd.Series(dtype=np.float64, name="Dividends")
+
+    def info(self, ticker, stock=None):
+        """The info dict: fully refetched daily, with price-driven fields refreshed from fast_info in between."""
+        stock = stock or yahoo_ticker(ticker)
+        path = os.path.join(self._dir(ticker), "info.json")
+
+        def load():
+            try:
+                with open(path) as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                return None
+
+        def save_info(info, **entry):
+            payload = json.dumps(info, default=str).encode()
+            atomic_write(path, lambda f: f.write(payload))
+            self._record(ticker, "info", **entry)
+            return info
+
+        def fetch(entry, stored):
+            if stored is None or time.time() - entry["fetched_at"] >= FUNDAMENTALS_INFO_TTL_SECONDS:
+                return "full", stock.info
+            fast = stock.fast_info
+            return "fast", {**stored, **{field: float(fast.get(key)) for field, key in FAST_INFO_FIELDS.items() if fast.get(key) is not None}}
+
+        def save(fetched, stored):
+            kind, info = fetched
+            now = time.time()
+            return save_info(info, fast_at=now, **({"fetched_at": now} if kind == "full" else {}))
+
+        def is_fresh(entry, now):
+            return now - entry["fetched_at"] < FUNDAMENTALS_INFO_TTL_SECONDS and now - entry.get("fast_at", 0) < FUNDAMENTALS_FAST_TTL_SECONDS
+
+        return self._serve(ticker, "info", is_fresh, fetch, load, save, dict)
+
+
+fundamentals_store = FundamentalsStore()
+
+
+if __name__ == "__main__":
+    for symbol in sys.argv[1:]:
+        symbol = symbol.upper()
+        stock = yahoo_ticker(symbol)
+        fundamentals_store.info(symbol, stock)
+        fundamentals_store.history(symbol, stock)
+        fundamentals_store.dividends(symbol, stock)
+        for statement in STATEMENTS:
+            fundamentals_store.statement(symbol, statement, stock)
+        print(f"{symbol}: {fundamentals_store.manifest(symbol)}")
@@ -0,0 +1,86 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from config import GATHER_MAX_WORKERS, SECTION_TIMEOUT_SECONDS
+
+
+class Section:
+    """
+    One unit of report data: fn is called with the results of its dependencies (in order).
+    If fn fails, times out, or a dependency did not succeed, the section resolves to placeholder.
+    """
+
+    def __init__(self, name, fn, deps=(), placeholder=None, timeout=SECTION_TIMEOUT_SECONDS):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.placeholder = placeholder
+        self.timeout = timeout
+
+
+def gather_sections(sections, max_workers=GATHER_MAX_WORKERS, on_result=None):
+    """
+    Runs sections concurrently in a bounded thread pool, starting each one as soon as its dependencies finish.
+
+    Returns (results, timings): results maps section name to its value or placeholder, timings maps section
+    name to {"status": "ok" | "error" | "timeout" | "skipped", "seconds": float}. A section that overruns its
+    timeout is abandoned (its thread finishes in the background) so one slow upstream cannot stall the report.
+    If given, on_result(name, value) is called in the calling thread as each section resolves.
+    """
+    by_name = {section.name: section for section in sections}
+    for section in sections:
+        missing = [dep for dep in section.deps if dep not in by_name]
+        if missing:
+            raise ValueError(f"Section '{section.name}' depends on unknown sections: {missing}")
+
+    results, timings = {}, {}
+    waiting = list(sections)
+    running = {}  # future -> (section, started, deadline)
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="section")
+
+    def resolve(section, status, value, started):
+        results[section.name] = value
+        timings[section.name] = {"status": status, "seconds": round(time.perf_counter() - started, 3)}
+        if on_result:
+            on_result(section.name, value)
+
+    try:
+        while waiting or running:
+            # Skipping a section can unblock its dependents, so schedule until nothing changes
+            scheduled = True
+            while scheduled:
+                scheduled = False
+                for section in list(waiting):
+                    if not all(dep in timings for dep in section.deps):
+                        continue
+                    waiting.remove(section)
+                    scheduled = True
+                    started = time.perf_counter()
+                    if any(timings[dep]["status"] != "ok" for dep in section.deps):
+                        resolve(section, "skipped", section.placeholder, started)
+                        continue
+                    future = executor.submit(section.fn, *(results[dep] for dep in section.deps))
+                    running[future] = (section, started, started + section.timeout)
+            if not running:
+                if waiting:
+                    raise ValueError(f"Circular section dependencies: {[section.name for section in waiting]}")
+                continue
+
+            next_deadline = min(deadline for _, _, deadline in running.values())
+            done, _ = wait(running, timeout=max(next_deadline - time.perf_counter(), 0), return_when=FIRST_COMPLETED)
+            for future in done:
+                section, started, _ = running.pop(future)
+                try:
+                    resolve(section, "ok", future.result(), started)
+                except Exception as e:
+                    print(f"Section '{section.name}' failed: {e}")
+                    resolve(section, "error", section.placeholder, started)
+            now = time.perf_counter()
+            for future, (section, started, deadline) in list(running.items()):
+                if now >= deadline:
+                    running.pop(future)
+                    future.cancel()
+                    print(f"Section '{section.name}' timed out after {section.timeout}s")
+                    resolve(section, "timeout", section.placeholder, started)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return results, timings
@@ -1,42 +1,231 @@
 import boto3
 import json
-import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
+from botocore.config import Config
 from dotenv import load_dotenv
 import os
+import threading
+import time
+from config import NARRATION_MAX_WORKERS, NARRATION_MODE, NARRATION_BATCH_MAX_TOKENS
+from providers import bedrock_client
+from rate_limiter import converse_stream_with_limit, converse_with_limit, is_throttling_error
 
 # Load environment variables
 load_dotenv()
 
 # AWS Bedrock client setup
 try:
-    bedrock_runtime = boto3.client(
+    bedrock_runtime = bedrock_client(lambda: boto3.client(
         service_name="bedrock-runtime",
         region_name="us-east-1",
         aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY")
-    )
+        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+        # Retries are handled by the shared rate limiter; the pool must fit concurrent narrations
+        config=Config(retries={"max_attempts": 1}, max_pool_connections=max(NARRATION_MAX_WORKERS, 10))
+    ))
 except Exception as e:
-    st.error(f"Failed to initialize Bedrock client: {e}")
+    print(f"Failed to initialize Bedrock client: {e}")
     bedrock_runtime = None
 
 MODEL_ID = "us.anthropic.claude-3-5-haiku-20241022-v1:0"
 
+def analyst_system_prompt(ticker):
+    return f"You are a financial analyst for {ticker}. Generate concise, professional narrations in plain text with no formatting or emphasis. Do not include section headings. Follow the provided format and use the data provided."
+
+class NarrationStats:
+    """Running LLM usage and latency totals per narration mode, for comparing the batched and per-section paths."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.modes = {}
+        self.sections = {}
+
+    def reset(self):
+        with self._lock:
+            self.modes = {}
+            self.sections = {}
+
+    def record(self, mode, response=None, seconds=0.0, reports=0, fallbacks=0):
+        usage = (response or {}).get("usage", {})
+        with self._lock:
+            totals = self.modes.setdefault(mode, {"reports": 0, "calls": 0, "input_tokens": 0, "output_tokens": 0, "seconds": 0.0, "fallbacks": 0})
+            totals["calls"] += 1 if response else 0
+            totals["input_tokens"] += usage.get("inputTokens", 0)
+            totals["output_tokens"] += usage.get("outputTokens", 0)
+            totals["seconds"] += seconds
+            totals["reports"] += reports
+            totals["fallbacks"] += fallbacks
+
+    def record_section(self, key, response=None, seconds=0.0):
+        """Latency and tokens of one narration call, by report section (or "batch" for the batched call)."""
+        usage = (response or {}).get("usage", {})
+        with self._lock:
+            totals = self.sections.setdefault(key, {"calls": 0, "input_tokens": 0, "output_tokens": 0, "seconds": 0.0})
+            totals["calls"] += 1
+            totals["input_tokens"] += usage.get("inputTokens", 0)
+            totals["output_tokens"] += usage.get("outputTokens", 0)
+            totals["seconds"] += seconds
+
+    def summary(self):
+        """Per-report averages for each mode."""
+        with self._lock:
+            return {
+                mode: {name: round(value / max(totals["reports"], 1), 2) for name, value in totals.items() if name != "reports"} | {"reports": totals["reports"]}
+                for mode, totals in self.modes.items()
+            }
+
+narration_stats = NarrationStats()
+
+class NarrationUnavailable(Exception):
+    """A narration could not be generated; text is the placeholder to show in its place."""
+
+    def __init__(self, text):
+        super().__init__(text)
+        self.text = text
+
 # Narration Generation
-def generate_narration(prompt, data, ticker):
+def generate_narration(prompt, data, ticker, priority=0, mode="per_section", on_text=None, key=None):
+    """
+    One section's narration; with on_text, the response is streamed and each text delta passed to it.
+    Raises NarrationUnavailable when no narration could be generated.
+    """
     if not bedrock_runtime:
-        return f"No narration available for {ticker}."
-    messages = [{"role": "user", "content": [{"text": prompt.format(ticker=ticker, data=json.dumps(data))}]}]
+        raise NarrationUnavailable(f"No narration available for {ticker}.")
+    messages = [{"role": "user", "content": [{"text": prompt.format(ticker=ticker, data=json.dumps(data, default=str))}]}]
+    request = dict(
+        priority=priority,
+        modelId=MODEL_ID,
+        messages=messages,
+        system=[{"text": analyst_system_prompt(ticker)}],
+        inferenceConfig={"maxTokens": 500, "temperature": 0.7}
+    )
+    started = time.perf_counter()
     try:
-        response = bedrock_runtime.converse(
-            modelId=MODEL_ID,
-            messages=messages,
-            system=[{"text": f"You are a financial analyst for {ticker}. Generate concise, professional narrations in plain text with no formatting or emphasis. Do not include section headings. Follow the provided format and use the data provided."}],
-            inferenceConfig={"maxTokens": 500, "temperature": 0.7}
-        )
+        if on_text:
+            response = converse_stream_with_limit(bedrock_runtime, on_text, **request)
+        else:
+            response = converse_with_limit(bedrock_runtime, **request)
+        narration_stats.record(mode, response)
+        narration_stats.record_section(key, response, time.perf_counter() - started)
         return response["output"]["message"]["content"][0]["text"]
     except Exception as e:
-        st.warning(f"Failed to generate narration: {e}")
-        return f"No narration available for {ticker}."
+        if is_throttling_error(e):
+            raise NarrationUnavailable("Narration temporarily unavailable due to high demand. Please try again later.") from e
+        print(f"Failed to generate narration: {e}")
+        raise NarrationUnavailable(f"No narration available for {ticker}.") from e
+
+def generate_narrations(jobs, ticker, mode="per_section"):
+    """
+    Generates narrations concurrently. jobs is a list of (key, prompt, data) in page order; earlier
+    sections get higher priority at the rate limiter so the top of the report is ready first.
+    Returns ({key: text}, keys whose narration failed and hold a placeholder text).
+    """
+    with ThreadPoolExecutor(max_workers=NARRATION_MAX_WORKERS, thread_name_prefix="narration") as pool:
+        futures = {
+            key: pool.submit(generate_narration, prompt, data, ticker, priority, mode, key=key)
+            for priority, (key, prompt, data) in enumerate(jobs)
+        }
+        narrations, failed = {}, set()
+        for key, future in futures.items():
+            try:
+                narrations[key] = future.result()
+            except NarrationUnavailable as e:
+                narrations[key] = e.text
+                failed.add(key)
+        return narrations, failed
+
+def build_batch_prompt(jobs, ticker):
+    """
+    Builds one prompt covering every section. Each distinct dataset is sent once and sections refer to it by
+    name; a section whose data is a dict of already-sent datasets (e.g. recommendations) refers to each of them.
+    """
+    datasets, names_by_json, sections = {}, {}, []
+
+    def dataset_name(key, data):
+        encoded = json.dumps(data, sort_keys=True, default=str)
+        if encoded not in names_by_json:
+            names_by_json[encoded] = key
+            datasets[key] = data
+        return names_by_json[encoded]
+
+    for key, prompt, data in jobs:
+        encoded = json.dumps(data, sort_keys=True, default=str)
+        if encoded not in names_by_json and isinstance(data, dict) and data and all(
+            json.dumps(value, sort_keys=True, default=str) in names_by_json for value in data.values()
+        ):
+            refs = ", ".join(f"{field}: dataset '{dataset_name(field, value)}'" for field, value in data.items())
+            reference = f"the datasets ({refs})"
+        else:
+            reference = f"dataset '{dataset_name(key, data)}'"
+        instructions = prompt.format(ticker=ticker, data=reference).strip()
+        sections.append(f'Section "{key}":\n{instructions}')
+
+    section_keys = ", ".join(f'"{key}"' for key, _, _ in jobs)
+    return (
+        f"Write the narration for each report section on {ticker} below, following each section's instructions and example.\n\n"
+        f"Datasets (JSON):\n{json.dumps(datasets, default=str)}\n\n"
+        + "\n\n".join(sections)
+        + f"\n\nReturn only a JSON object with exactly these keys: {section_keys}. Each value is that section's narration as plain text."
+    )
+
+def parse_batch_response(text, keys):
+    """Returns {key: narration} for keys with a valid narration in the model's JSON output."""
+    start, end = text.find("{"), text.rfind("}") + 1
+    if start == -1 or end == 0:
+        return {}
+    try:
+        parsed = json.loads(text[start:end])
+    except json.JSONDecodeError:
+        return {}
+    if not isinstance(parsed, dict):
+        return {}
+    return {
+        key: parsed[key].strip() for key in keys
+        if isinstance(parsed.get(key), str) and len(parsed[key].split()) >= 5
+    }
+
+def generate_batched_narrations(jobs, ticker):
+    """
+    Generates all narrations with one structured call. Sections missing from or invalid in the response are
+    regenerated with their single-section prompt. Returns the same pair as generate_narrations.
+    """
+    started = time.perf_counter()
+    keys = [key for key, _, _ in jobs]
+    narrations, response = {}, None
+    if bedrock_runtime:
+        try:
+            response = converse_with_limit(
+                bedrock_runtime,
+                modelId=MODEL_ID,
+                messages=[{"role": "user", "content": [{"text": build_batch_prompt(jobs, ticker)}]}],
+                system=[{"text": analyst_system_prompt(ticker) + " Respond with a single JSON object only."}],
+                inferenceConfig={"maxTokens": NARRATION_BATCH_MAX_TOKENS, "temperature": 0.7}
+            )
+            narration_stats.record_section("batch", response, time.perf_counter() - started)
+            narrations = parse_batch_response(response["output"]["message"]["content"][0]["text"], keys)
+        except Exception as e:
+            print(f"Batched narration for {ticker} failed, falling back to per-section prompts: {e}")
+    fallback_jobs = [job for job in jobs if job[0] not in narrations]
+    failed = set()
+    if fallback_jobs:
+        fallback_narrations, failed = generate_narrations(fallback_jobs, ticker, mode="batched")
+        narrations.update(fallback_narrations)
+    narration_stats.record("batched", response, seconds=time.perf_counter() - started, reports=1, fallbacks=len(fallback_jobs))
+    return {key: narrations[key] for key in keys}, failed
+
+def narrate_report(jobs, ticker):
+    """
+    Generates a report's narrations using the configured NARRATION_MODE ('batched' or 'per_section').
+    Returns ({key: text}, keys whose narration failed).
+    """
+    if NARRATION_MODE == "batched":
+        narrations, failed = generate_batched_narrations(jobs, ticker)
+    else:
+        started = time.perf_counter()
+        narrations, failed = generate_narrations(jobs, ticker)
+        narration_stats.record("per_section", seconds=time.perf_counter() - started, reports=1)
+    print(f"Narration usage per report: {narration_stats.summary()}")
+    return narrations, failed
 
 # Prompts for Each Section
 prompts = {
@@ -71,7 +260,7 @@ Example:
 {ticker}'s returns outperform the S&P 500 and tech sector over 1, 3, and 5 years, emphasizing its consistent market leadership.
 """,
     "financial_strength": """
-Generate a financial strength narration for {ticker} in plain text. Highlight profit margin, cash reserves, P/E, and DCF valuation using the data: {data}. Keep it concise (50-75 words).
+Generate a financial strength narration for {ticker} in plain text. Highlight profit margin, cash reserves, P/E, and DCF valuation (base case and its percentile band across discount and growth scenarios) using the data: {data}. Keep it concise (50-75 words).
 Example:
 {ticker}'s 31% profit margin and 250 billion in cash reserves highlight its strength. A P/E ratio of 36.2 suggests a premium valuation, with DCF estimates indicating an intrinsic value of 110-130.
 """,
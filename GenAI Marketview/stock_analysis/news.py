@@ -1,24 +1,36 @@
-import yfinance as yf
-import finnhub
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import pytz
-import uuid
 import json
-import streamlit as st
+import threading
 from dotenv import load_dotenv
 import os
 from narration import bedrock_runtime, MODEL_ID
+from providers import FinnhubClient, yahoo_ticker
+from rate_limiter import converse_with_limit
+from config import NEWS_LOOKBACK_DAYS, THEME_MAINTENANCE_SECONDS, THEME_MAX
+from news_store import news_store
+from news_clustering import cluster_news
 
 # Load environment variables
 load_dotenv()
 
 # Configuration
 FINNHUB_API_KEY = os.getenv("FINNHUB_API_KEY", "")
-TWO_MONTHS_AGO = (datetime.now(pytz.UTC) - timedelta(days=60)).strftime("%Y-%m-%d")
-TODAY = datetime.now(pytz.UTC).strftime("%Y-%m-%d")
 IST = pytz.timezone("Asia/Kolkata")
-MAX_NEWS_ITEMS = 30
+MAX_NEWS_ITEMS = 100
+
+# One Finnhub client (and its pooled HTTP session) for the process
+_finnhub_client = None
+_finnhub_lock = threading.Lock()
+
+def get_finnhub_client(api_key):
+    global _finnhub_client
+    with _finnhub_lock:
+        if _finnhub_client is None:
+            _finnhub_client = FinnhubClient(api_key)
+        return _finnhub_client
 
 def clean_text(text):
     """Remove $ and markdown italics from text."""
@@ -27,9 +39,10 @@ def clean_text(text):
     text = text.replace("$", "").replace("_", "").replace("*", "")
     return text
 
-def fetch_yahoo_finance_news(ticker_symbol):
+def fetch_yahoo_finance_news(ticker_symbol, since):
+    """Yahoo Finance items published after `since` (the API has no date filter, so it is applied here)."""
     try:
-        ticker = yf.Ticker(ticker_symbol)
+        ticker = yahoo_ticker(ticker_symbol)
         news_items = ticker.news
         yahoo_news = []
         for item in news_items:
@@ -41,11 +54,10 @@ def fetch_yahoo_finance_news(ticker_symbol):
                 continue
             try:
                 publish_time = datetime.strptime(publish_time_str, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=pytz.UTC)
-                if publish_time >= datetime.now(pytz.UTC) - timedelta(days=60):
+                if publish_time > since:
                     summary = clean_text(item.get("summary") or item.get("description") or title)
                     summary = summary[:100] + "..." if len(summary) > 100 else summary
                     yahoo_news.append({
-                        "id": str(uuid.uuid4()),
                         "date": publish_time,
                         "title": title,
                         "summary": summary,
@@ -58,10 +70,11 @@ def fetch_yahoo_finance_news(ticker_symbol):
     except Exception:
         return []
 
-def fetch_finnhub_news(ticker_symbol, api_key):
+def fetch_finnhub_news(ticker_symbol, api_key, since):
+    """Finnhub items published after `since`; only the days since then are requested."""
     try:
-        finnhub_client = finnhub.Client(api_key=api_key)
-        news_items = finnhub_client.company_news(ticker_symbol, _from=TWO_MONTHS_AGO, to=TODAY)
+        finnhub_client = get_finnhub_client(api_key)
+        news_items = finnhub_client.company_news(ticker_symbol, _from=since.strftime("%Y-%m-%d"), to=datetime.now(pytz.UTC).strftime("%Y-%m-%d"))
         finnhub_news = []
         for item in news_items:
             publish_time = item.get("datetime")
@@ -72,11 +85,10 @@ def fetch_finnhub_news(ticker_symbol, api_key):
                 continue
             try:
                 publish_time = datetime.fromtimestamp(publish_time, tz=pytz.UTC)
-                if publish_time >= datetime.now(pytz.UTC) - timedelta(days=60):
+                if publish_time > since:
                     summary = clean_text(item.get("summary", "No summary available"))
                     summary = summary if summary and summary != "No summary available" else title[:100] + "..."
                     finnhub_news.append({
-                        "id": str(uuid.uuid4()),
                         "date": publish_time,
                         "title": title,
                         "summary": summary,
@@ -90,61 +102,194 @@ def fetch_finnhub_news(ticker_symbol, api_key):
         return []
 
 def fetch_news(ticker):
+    """
+    Fetches new items from Yahoo Finance and Finnhub concurrently into the news store, then returns the
+    newest MAX_NEWS_ITEMS stored items of the lookback window. From each source, only items newer than the
+    latest one stored from that source are requested, so a source that lags the other loses nothing.
+    """
     if not ticker:
         return None
-    yahoo_news = fetch_yahoo_finance_news(ticker)
-    finnhub_news = fetch_finnhub_news(ticker, FINNHUB_API_KEY)
-    all_news = yahoo_news + finnhub_news
-    all_news = sorted(all_news, key=lambda x: x["date"], reverse=True)[:MAX_NEWS_ITEMS]
-    
+    window_start = datetime.now(pytz.UTC) - timedelta(days=NEWS_LOOKBACK_DAYS)
+
+    def since(source):
+        latest = news_store.latest_timestamp(ticker, source)
+        return max(window_start, datetime.fromtimestamp(latest, tz=pytz.UTC)) if latest else window_start
+
+    yahoo_since, finnhub_since = since("Yahoo Finance"), since("Finnhub")
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="news") as pool:
+        yahoo = pool.submit(fetch_yahoo_finance_news, ticker, yahoo_since)
+        finnhub_news = pool.submit(fetch_finnhub_news, ticker, FINNHUB_API_KEY, finnhub_since) if FINNHUB_API_KEY else None
+        fetched = yahoo.result() + (finnhub_news.result() if finnhub_news else [])
+    added = news_store.add_items(ticker, fetched)
+    print(f"News for {ticker}: {len(fetched)} fetched (Yahoo since {yahoo_since:%Y-%m-%d %H:%M}, "
+          f"Finnhub since {finnhub_since:%Y-%m-%d %H:%M}), {added} new")
+
+    all_news = news_store.recent_items(ticker, window_start.timestamp(), MAX_NEWS_ITEMS)
     if not all_news:
         return None
     
     news_df = pd.DataFrame(all_news)
-    news_df['date'] = pd.to_datetime(news_df['date'], utc=True)
+    news_df['date'] = pd.to_datetime(news_df['published_at'], unit="s", utc=True)
     news_df['date_ist'] = news_df['date'].dt.tz_convert(IST).dt.strftime("%Y-%m-%d %H:%M:%S")
     news_df['date'] = news_df['date'].dt.strftime("%Y-%m-%d %H:%M:%S")
+    news_df['url'] = news_df['url'].fillna("No link")
     news_df = news_df[['id', 'date', 'date_ist', 'title', 'summary', 'source', 'url']]
     return news_df
 
-def process_news_with_llm(news_df):
-    if news_df is None or news_df.empty:
-        return None
-    news_data = news_df[["id", "title", "summary"]].to_dict(orient="records")
-    news_json = json.dumps(news_data, indent=2)
-    
+THEME_SYSTEM_PROMPT = "You are an expert financial analyst summarizing news themes. Format monetary values without currency symbols (e.g., 1.00 instead of $1.00)."
+
+def _theme_llm_json(prompt, max_tokens=2000):
+    """Runs a theme prompt and returns (parsed JSON object or None, input tokens)."""
+    response = converse_with_limit(
+        bedrock_runtime,
+        modelId=MODEL_ID,
+        messages=[{"role": "user", "content": [{"text": prompt}]}],
+        system=[{"text": THEME_SYSTEM_PROMPT}],
+        inferenceConfig={"maxTokens": max_tokens, "temperature": 0.7}
+    )
+    llm_output = response["output"]["message"]["content"][0]["text"]
+    input_tokens = response.get("usage", {}).get("inputTokens", 0)
+    start_idx = llm_output.find("{")
+    end_idx = llm_output.rfind("}") + 1
+    if start_idx == -1 or end_idx == 0:
+        return None, input_tokens
+    return json.loads(llm_output[start_idx:end_idx]), input_tokens
+
+def _cluster_payload(clusters):
+    return json.dumps([{key: cluster[key] for key in ("id", "titles", "summary")} for cluster in clusters], separators=(",", ":"))
+
+def classify_news(clusters):
+    """Groups candidate clusters into 4-6 new themes; returns ({theme name: [news ids]}, input tokens)."""
     prompt = f"""
-    You are an AI assistant analyzing news articles for a stock. Below is a JSON list of news items, each with an 'id', 'title', and 'summary'. Your task is to:
+    You are an AI assistant analyzing news articles for a stock. Related articles have already been grouped into clusters. Below is a JSON list of clusters, each with an 'id', sample 'titles', and the 'summary' of its newest article. Your task is to:
 
     1. Identify 4–6 key findings or themes from the news (e.g., AI developments, stock performance, product launches).
-    2. Group the news items by relevance to each finding, using their 'id'.
-    3. Output a JSON object where each key is a finding (descriptive name, no $ or markdown) and each value is a list of news IDs relevant to that finding.
+    2. Group the clusters by relevance to each finding, using their 'id'.
+    3. Output a JSON object where each key is a finding (descriptive name, no $ or markdown) and each value is a list of cluster IDs relevant to that finding.
 
     Ensure the output is in the format:
-    {{"finding1": ["id1", "id2"], "finding2": ["id3", "id4"], ...}}
+    {{"finding1": ["c0", "c3"], "finding2": ["c1"], ...}}
 
-    News data:
-    {news_json}
+    News clusters:
+    {_cluster_payload(clusters)}
     """
-    
-    messages = [{"role": "user", "content": [{"text": prompt}]}]
-    
+    groups, input_tokens = _theme_llm_json(prompt)
+    members = {cluster["id"]: cluster["members"] for cluster in clusters}
+    findings = {
+        name: [news_id for cluster_id in cluster_ids for news_id in members.get(cluster_id, [])]
+        for name, cluster_ids in (groups or {}).items()
+    }
+    return findings, input_tokens
+
+def assign_news_to_themes(themes, clusters):
+    """
+    Assigns candidate clusters to existing themes or new ones; returns ({news id: theme id or new theme name}, input tokens).
+    Only the theme names and the new clusters are sent, so the prompt grows with the new stories alone.
+    """
+    existing = [{"theme_id": theme_id, "name": name} for theme_id, name in themes.items()]
+    prompt = f"""
+    You maintain the key findings (themes) in the news about a stock. Existing themes:
+    {json.dumps(existing, separators=(",", ":"))}
+
+    New articles have been grouped into clusters, each with an 'id', sample 'titles', and the 'summary' of its newest article. Assign each cluster to the existing theme it fits best. If a cluster fits none of them, give a short descriptive name for a new theme instead (no $ or markdown); reuse the same new name for related clusters.
+
+    Output a JSON object mapping each cluster id to an existing theme_id (number) or a new theme name (string):
+    {{"c0": 3, "c1": "New theme name", ...}}
+
+    New news clusters:
+    {_cluster_payload(clusters)}
+    """
+    placements, input_tokens = _theme_llm_json(prompt)
+    members = {cluster["id"]: cluster["members"] for cluster in clusters}
+    assignments = {
+        news_id: placement
+        for cluster_id, placement in (placements or {}).items() for news_id in members.get(cluster_id, [])
+    }
+    return assignments, input_tokens
+
+def _theme_id(value, themes):
+    """The existing theme id the model referred to, also when it quoted the id ("3"); None otherwise."""
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    return value if isinstance(value, int) and not isinstance(value, bool) and value in themes else None
+
+def maintain_themes(ticker):
+    """Scheduled upkeep: drops items older than the news window, removes empty themes and merges overlapping ones."""
+    expired = news_store.expire_themes(ticker, (datetime.now(pytz.UTC) - timedelta(days=NEWS_LOOKBACK_DAYS)).timestamp())
+    themes = news_store.themes(ticker)
+    merged = 0
+    if len(themes) > 1:
+        sizes = news_store.theme_sizes(ticker)
+        listing = [{"theme_id": theme_id, "name": name, "items": sizes.get(theme_id, 0)} for theme_id, name in themes.items()]
+        prompt = f"""
+        These are the current news themes for a stock:
+        {json.dumps(listing, separators=(",", ":"))}
+
+        Merge themes that describe the same finding so that at most {THEME_MAX} remain. Output a JSON object listing the groups to merge, first id kept:
+        {{"merge": [[keep_id, merged_id, ...], ...]}}
+        Output {{"merge": []}} if no themes overlap.
+        """
+        plan, _ = _theme_llm_json(prompt, max_tokens=500)
+        for group in (plan or {}).get("merge", []):
+            ids = (_theme_id(value, themes) for value in group)
+            group = list(dict.fromkeys(theme_id for theme_id in ids if theme_id is not None))
+            if len(group) > 1:
+                news_store.merge_themes(ticker, group[0], group[1:])
+                merged += len(group) - 1
+    news_store.mark_maintained(ticker)
+    print(f"Theme maintenance for {ticker}: {expired} expired, {merged} merged")
+
+def process_news_with_llm(news_df, ticker):
+    """
+    Returns {finding: [news ids]} for the items in news_df using the ticker's persistent theme state.
+    Only items not classified before are sent to the LLM, as locally pre-clustered groups.
+    """
+    if news_df is None or news_df.empty:
+        return None
     try:
-        response = bedrock_runtime.converse(
-            modelId=MODEL_ID,
-            messages=messages,
-            system=[{"text": "You are an expert financial analyst summarizing news themes. Format monetary values without currency symbols (e.g., 1.00 instead of $1.00)."}],
-            inferenceConfig={"maxTokens": 2000, "temperature": 0.7}
-        )
-        llm_output = response["output"]["message"]["content"][0]["text"]
-        
-        start_idx = llm_output.find("{")
-        end_idx = llm_output.rfind("}") + 1
-        if start_idx == -1 or end_idx == 0:
-            return None
-        findings = json.loads(llm_output[start_idx:end_idx])
-        cleaned_findings = {clean_text(k): v for k, v in findings.items()}
-        return cleaned_findings
+        if news_store.maintenance_due(ticker, THEME_MAINTENANCE_SECONDS):
+            maintain_themes(ticker)
+        themes = news_store.themes(ticker)
+        assigned = news_store.theme_assignments(ticker)
+        items = news_df[["id", "title", "summary"]].to_dict(orient="records")
+        new_items = [item for item in items if item["id"] not in assigned]
+        clusters = cluster_news(new_items)
+        input_tokens = 0
+        if new_items:
+            new_ids = {item["id"] for item in new_items}
+            assignments = {}
+            if not themes:
+                groups, input_tokens = classify_news(clusters)
+                for name, news_ids in groups.items():
+                    theme_id = news_store.create_theme(ticker, clean_text(name))
+                    assignments.update({news_id: theme_id for news_id in news_ids if news_id in new_ids})
+            else:
+                placements, input_tokens = assign_news_to_themes(themes, clusters)
+                theme_ids_by_name = {name.lower(): theme_id for theme_id, name in themes.items()}
+                for news_id, placement in placements.items():
+                    if news_id not in new_ids:
+                        continue
+                    # The model sometimes quotes theme ids ("3"); those join the theme rather than naming a new one
+                    theme_id = _theme_id(placement, themes)
+                    if theme_id is not None:
+                        assignments[news_id] = theme_id
+                    elif isinstance(placement, str) and placement.strip():
+                        name = clean_text(placement.strip())
+                        if name.lower() not in theme_ids_by_name:
+                            theme_ids_by_name[name.lower()] = news_store.create_theme(ticker, name)
+                        assignments[news_id] = theme_ids_by_name[name.lower()]
+            news_store.assign(ticker, assignments)
+            # An empty result is more likely a failed reply than a verdict, so those items are retried next time
+            if assignments:
+                news_store.mark_unplaced(ticker, new_ids - assignments.keys())
+        print(f"News themes for {ticker}: {len(new_items)} new of {len(items)} items in {len(clusters)} clusters, {input_tokens} LLM input tokens")
     except Exception as e:
-        st.warning(f"Failed to process news with LLM: {e}")
-        return None
\ No newline at end of file
+        print(f"Failed to process news with LLM: {e}")
+
+    themes = news_store.themes(ticker)
+    window_ids = set(news_df["id"])
+    findings = {}
+    for news_id, theme_id in news_store.theme_assignments(ticker).items():
+        if news_id in window_ids and theme_id in themes:
+            findings.setdefault(themes[theme_id], []).append(news_id)
+    return findings or None
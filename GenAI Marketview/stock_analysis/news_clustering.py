@@ -0,0 +1,85 @@
+import re
+from collections import Counter
+import numpy as np
+from news_store import normalize_title
+from config import NEWS_DUPLICATE_SIMILARITY, NEWS_CLUSTER_SIMILARITY, NEWS_CLUSTER_SAMPLE_TITLES
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the this to was were will with
+after amid over says said new why what how stock stocks shares share inc corp co ltd
+""".split())
+
+
+def tokenize(text):
+    return [word for word in normalize_title(text).split() if len(word) > 2 and word not in STOPWORDS]
+
+
+def tfidf_matrix(documents):
+    """Rows are L2-normalized TF-IDF vectors (smoothed idf), so row dot products are cosine similarities."""
+    tokens = [tokenize(document) for document in documents]
+    vocabulary = {word: i for i, word in enumerate(sorted({word for words in tokens for word in words}))}
+    matrix = np.zeros((len(documents), len(vocabulary)))
+    for row, words in enumerate(tokens):
+        for word, count in Counter(words).items():
+            matrix[row, vocabulary[word]] = count
+    document_frequency = np.count_nonzero(matrix, axis=0)
+    matrix *= np.log((1 + len(documents)) / (1 + document_frequency)) + 1
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+def agglomerate(similarity, threshold):
+    """
+    Average-linkage agglomerative clustering on a similarity matrix, merging until no pair of clusters
+    is at least `threshold` similar. Returns lists of row indices, each in ascending order.
+    """
+    n = len(similarity)
+    similarity = similarity.astype(float)
+    np.fill_diagonal(similarity, -np.inf)
+    sizes = np.ones(n)
+    members = [[i] for i in range(n)]
+    active = np.ones(n, dtype=bool)
+    while active.sum() > 1:
+        flat = int(np.argmax(similarity))
+        i, j = divmod(flat, n)
+        if similarity[i, j] < threshold:
+            break
+        i, j = min(i, j), max(i, j)
+        # Lance-Williams update for average linkage
+        merged = (similarity[i] * sizes[i] + similarity[j] * sizes[j]) / (sizes[i] + sizes[j])
+        similarity[i], similarity[:, i] = merged, merged
+        similarity[i, i] = -np.inf
+        similarity[j], similarity[:, j] = -np.inf, -np.inf
+        sizes[i] += sizes[j]
+        members[i] = sorted(members[i] + members[j])
+        active[j] = False
+    return [members[i] for i in np.flatnonzero(active)]
+
+
+def cluster_news(items, duplicate_similarity=NEWS_DUPLICATE_SIMILARITY, cluster_similarity=NEWS_CLUSTER_SIMILARITY,
+                 sample_titles=NEWS_CLUSTER_SAMPLE_TITLES):
+    """
+    Groups news items (dicts with id, title, summary; newest first) into candidate themes.
+
+    Near-duplicate headlines are first collapsed into their newest item, then the remaining stories are
+    grouped by TF-IDF similarity of title and summary. Each cluster carries at most `sample_titles`
+    distinct headlines and one summary for the LLM, plus the ids of every member to expand its answer.
+    """
+    if not items:
+        return []
+    titles = tfidf_matrix([item["title"] for item in items])
+    duplicates = agglomerate(titles @ titles.T, duplicate_similarity)
+    representatives = [group[0] for group in duplicates]
+
+    texts = tfidf_matrix([f"{items[i]['title']} {items[i].get('summary') or ''}" for i in representatives])
+    clusters = []
+    for group in agglomerate(texts @ texts.T, cluster_similarity):
+        stories = [duplicates[g] for g in group]
+        lead = items[stories[0][0]]
+        clusters.append({
+            "titles": [items[story[0]]["title"] for story in stories[:sample_titles]],
+            "summary": re.sub(r"\s+", " ", lead.get("summary") or "")[:200],
+            "members": [items[i]["id"] for story in stories for i in story]
+        })
+    clusters.sort(key=lambda cluster: -len(cluster["members"]))
+    return [{"id": f"c{i}", **cluster} for i, cluster in enumerate(clusters)]
@@ -0,0 +1,183 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from contextlib import closing, contextmanager
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from config import NEWS_DB_PATH
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS news (
+    ticker TEXT NOT NULL,
+    id TEXT NOT NULL,
+    published_at INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    summary TEXT,
+    source TEXT,
+    url TEXT,
+    fetched_at INTEGER NOT NULL,
+    PRIMARY KEY (ticker, id)
+);
+CREATE UNIQUE INDEX IF NOT EXISTS news_ticker_url ON news (ticker, url) WHERE url IS NOT NULL;
+CREATE INDEX IF NOT EXISTS news_ticker_published ON news (ticker, published_at);
+CREATE TABLE IF NOT EXISTS themes (
+    theme_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ticker TEXT NOT NULL,
+    name TEXT NOT NULL,
+    created_at INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS theme_items (
+    ticker TEXT NOT NULL,
+    news_id TEXT NOT NULL,
+    theme_id INTEGER NOT NULL,
+    PRIMARY KEY (ticker, news_id)
+);
+CREATE TABLE IF NOT EXISTS theme_maintenance (
+    ticker TEXT PRIMARY KEY,
+    last_run INTEGER NOT NULL
+);
+"""
+
+# theme_items.theme_id of items the LLM has seen but placed in no theme (theme ids start at 1)
+UNPLACED_THEME_ID = 0
+
+TRACKING_PARAMS = re.compile(r"^(utm_|guccounter|ncid|yptr|soc_)", re.IGNORECASE)
+
+
+def normalize_title(title):
+    """Lowercase, accent-free, punctuation-free title used to recognise the same story across sources."""
+    text = unicodedata.normalize("NFKD", title or "").encode("ascii", "ignore").decode()
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text.lower()).split())
+
+
+def canonical_url(url):
+    """URL without tracking parameters, fragment or trailing slash; None for missing links."""
+    if not url or url == "No link":
+        return None
+    parts = urlsplit(url.strip())
+    query = urlencode([(k, v) for k, v in parse_qsl(parts.query) if not TRACKING_PARAMS.match(k)])
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), query, ""))
+
+
+def news_id(title):
+    """Stable content-hash id: the same headline always gets the same id, whichever source or fetch it came from."""
+    return hashlib.sha1(normalize_title(title).encode()).hexdigest()[:16]
+
+
+class NewsStore:
+    """
+    Persistent per-ticker news archive in SQLite.
+
+    Items are keyed by a hash of their normalized title and are also unique per canonical URL, so the same
+    article from Yahoo Finance and Finnhub, or from a later refresh, is stored once.
+    """
+
+    def __init__(self, path=NEWS_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """A connection whose transaction commits (or rolls back on error) and which is closed on exit."""
+        with closing(sqlite3.connect(self.path, timeout=30)) as conn, conn:
+            yield conn
+
+    def latest_timestamp(self, ticker, source):
+        """Epoch seconds of the newest stored item for the ticker from the given source, or None."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT MAX(published_at) FROM news WHERE ticker = ? AND source = ?", (ticker, source)).fetchone()
+        return row[0]
+
+    def add_items(self, ticker, items):
+        """Stores new items (dicts with date, title, summary, source, url); returns how many were new."""
+        now = int(time.time())
+        rows = [
+            (ticker, news_id(item["title"]), int(item["date"].timestamp()), item["title"], item.get("summary"),
+             item.get("source"), canonical_url(item.get("url")), now)
+            for item in items if normalize_title(item.get("title"))
+        ]
+        with self._lock, self._connect() as conn:
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO news VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            return conn.total_changes - before
+
+    def recent_items(self, ticker, since, limit):
+        """Newest items published at or after `since` (epoch seconds)."""
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(
+                "SELECT id, published_at, title, summary, source, url FROM news "
+                "WHERE ticker = ? AND published_at >= ? ORDER BY published_at DESC LIMIT ?",
+                (ticker, int(since), limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    # Theme state: each ticker's news items are assigned to persistent named themes
+
+    def themes(self, ticker):
+        """{theme_id: name} for the ticker."""
+        with self._connect() as conn:
+            return dict(conn.execute("SELECT theme_id, name FROM themes WHERE ticker = ? ORDER BY theme_id", (ticker,)).fetchall())
+
+    def theme_assignments(self, ticker):
+        """{news_id: theme_id} for every classified item of the ticker."""
+        with self._connect() as conn:
+            return dict(conn.execute("SELECT news_id, theme_id FROM theme_items WHERE ticker = ?", (ticker,)).fetchall())
+
+    def create_theme(self, ticker, name):
+        with self._lock, self._connect() as conn:
+            return conn.execute("INSERT INTO themes (ticker, name, created_at) VALUES (?, ?, ?)", (ticker, name, int(time.time()))).lastrowid
+
+    def assign(self, ticker, assignments):
+        """Records {news_id: theme_id}."""
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO theme_items (ticker, news_id, theme_id) VALUES (?, ?, ?)",
+                [(ticker, news_id, theme_id) for news_id, theme_id in assignments.items()]
+            )
+
+    def mark_unplaced(self, ticker, news_ids):
+        """Records items the LLM left out of every theme, so they are not sent again."""
+        self.assign(ticker, {news_id: UNPLACED_THEME_ID for news_id in news_ids})
+
+    def merge_themes(self, ticker, keep_id, merged_ids):
+        with self._lock, self._connect() as conn:
+            for theme_id in merged_ids:
+                conn.execute("UPDATE theme_items SET theme_id = ? WHERE ticker = ? AND theme_id = ?", (keep_id, ticker, theme_id))
+                conn.execute("DELETE FROM themes WHERE ticker = ? AND theme_id = ?", (ticker, theme_id))
+
+    def expire_themes(self, ticker, before):
+        """Unassigns items published before `before` and deletes themes left empty; returns the themes removed."""
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "DELETE FROM theme_items WHERE ticker = ? AND news_id IN "
+                "(SELECT id FROM news WHERE ticker = ? AND published_at < ?)",
+                (ticker, ticker, int(before))
+            )
+            return conn.execute(
+                "DELETE FROM themes WHERE ticker = ? AND theme_id NOT IN (SELECT theme_id FROM theme_items WHERE ticker = ?)",
+                (ticker, ticker)
+            ).rowcount
+
+    def theme_sizes(self, ticker):
+        with self._connect() as conn:
+            return dict(conn.execute("SELECT theme_id, COUNT(*) FROM theme_items WHERE ticker = ? GROUP BY theme_id", (ticker,)).fetchall())
+
+    def maintenance_due(self, ticker, interval):
+        with self._connect() as conn:
+            row = conn.execute("SELECT last_run FROM theme_maintenance WHERE ticker = ?", (ticker,)).fetchone()
+        return row is None or time.time() - row[0] >= interval
+
+    def mark_maintained(self, ticker):
+        with self._lock, self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO theme_maintenance (ticker, last_run) VALUES (?, ?)", (ticker, int(time.time())))
+
+
+news_store = NewsStore()
@@ -0,0 +1,226 @@
+"""
+Sector and industry peer aggregates for the report's "Industry Avg" and "Peer Avg" columns.
+
+    python peers.py                                   # S&P 500 constituents
+    python peers.py --universe AAPL,MSFT,NVDA --workers 4
+
+The job keeps one fundamentals row per universe ticker in PEER_DIR and refreshes rows incrementally: a
+row is fetched again when it is older than PEER_REFRESH_SECONDS or a quarterly filing is due since it was
+fetched. After each run the medians, means and quartiles of every metric are recomputed for every sector
+and industry in one vectorized pass and written to an aggregates file that reports read by key.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+import requests
+from bs4 import BeautifulSoup
+from cache_utils import atomic_write
+from providers import yahoo_ticker
+from config import PEER_DIR, PEER_REFRESH_SECONDS, PEER_MIN_GROUP
+
+SP500_URL = "https://en.wikipedia.org/wiki/List_of_S%26P_500_companies"
+QUANTILES = {"p25": 0.25, "median": 0.5, "p75": 0.75}
+# Days from a quarter end until its 10-Q is expected (filing deadline plus a margin)
+FILING_LAG_DAYS = 45
+
+
+def _ratio(numerator, denominator, scale=1.0):
+    return numerator / denominator * scale if numerator is not None and denominator else None
+
+
+# Metric name -> value from a yfinance info dict, in the units the report tables display
+METRICS = {
+    "pe_ratio": lambda info: info.get("forwardPE"),
+    "pb_ratio": lambda info: info.get("priceToBook"),
+    "peg_ratio": lambda info: info.get("pegRatio"),
+    "ev_ebitda": lambda info: info.get("enterpriseToEbitda"),
+    "fcf_yield": lambda info: _ratio(info.get("freeCashflow"), info.get("marketCap"), 100),
+    "dividend_yield": lambda info: (info.get("dividendYield") or 0) * 100,
+    "dividend_rate": lambda info: info.get("dividendRate") or 0,
+    "payout_ratio": lambda info: _ratio(info.get("dividendRate"), info.get("trailingEps"), 100),
+    "dividend_growth": lambda info: _ratio((info.get("dividendRate") or 0) - (info.get("trailingAnnualDividendRate") or 0), info.get("trailingAnnualDividendRate"), 100),
+    "cash_b": lambda info: _ratio(info.get("totalCash"), 1e9),
+    "current_ratio": lambda info: info.get("currentRatio"),
+    "equity_b": lambda info: _ratio((info.get("bookValue") or 0) * (info.get("sharesOutstanding") or 0) or None, 1e9),
+    "net_income_b": lambda info: _ratio(info.get("netIncomeToCommon"), 1e9),
+    "revenue_b": lambda info: _ratio(info.get("totalRevenue"), 1e9),
+    "roe": lambda info: _ratio(info.get("returnOnEquity"), 1, 100),
+    "total_debt_b": lambda info: _ratio(info.get("totalDebt"), 1e9)
+}
+
+
+def group_stats(groups, values, quantiles=QUANTILES):
+    """
+    Per-group statistics of every column of an N x K matrix, ignoring NaN. groups holds each row's group
+    code (0..G-1). Returns count and mean as G x K arrays and each quantile as a G x K array.
+    """
+    n_groups = int(groups.max()) + 1
+    valid = ~np.isnan(values)
+    membership = (groups[:, None] == np.arange(n_groups)[None, :]).astype(np.float64)
+    counts = membership.T @ valid
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means = (membership.T @ np.where(valid, values, 0.0)) / counts
+    starts = np.concatenate(([0], np.cumsum(np.bincount(groups, minlength=n_groups))[:-1]))
+    levels = np.array(list(quantiles.values()))[:, None]
+    stats = {"count": counts, "mean": means, **{name: np.full(counts.shape, np.nan) for name in quantiles}}
+    for k in range(values.shape[1]):
+        # Rows sorted by group, then value; NaN sorts last within its group
+        ordered = values[np.lexsort((values[:, k], groups)), k]
+        position = np.clip(starts + levels * (counts[:, k] - 1), 0, len(ordered) - 1)
+        lower, upper = np.floor(position).astype(int), np.ceil(position).astype(int)
+        fraction = position - lower
+        interpolated = ordered[lower] * (1 - fraction) + ordered[upper] * fraction
+        for row, name in enumerate(quantiles):
+            stats[name][:, k] = np.where(counts[:, k] > 0, interpolated[row], np.nan)
+    return stats
+
+
+class PeerUniverse:
+    """Stored fundamentals rows of the peer universe and the aggregates built from them."""
+
+    def __init__(self, peer_dir=PEER_DIR):
+        self.universe_path = os.path.join(peer_dir, "universe.json")
+        self.aggregates_path = os.path.join(peer_dir, "aggregates.json")
+        self._aggregates = None
+        self._aggregates_mtime = None
+        self._guard = threading.Lock()
+
+    def _read_json(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_json(self, path, value):
+        atomic_write(path, lambda f: f.write(json.dumps(value).encode()))
+
+    def rows(self):
+        return self._read_json(self.universe_path)
+
+    def is_due(self, row, now=None):
+        """True when the row is stale or a filing for a newer quarter should have landed since it was fetched."""
+        now = now or time.time()
+        if row is None or now - row["fetched_at"] >= PEER_REFRESH_SECONDS:
+            return True
+        quarter_end = row.get("most_recent_quarter")
+        next_filing = quarter_end + (91 + FILING_LAG_DAYS) * 86400 if quarter_end else None
+        return bool(next_filing and row["fetched_at"] < next_filing <= now)
+
+    def fetch_row(self, symbol):
+        info = yahoo_ticker(symbol).info
+        if not info or not info.get("sector"):
+            return None
+        metrics = {}
+        for name, extract in METRICS.items():
+            try:
+                value = extract(info)
+                metrics[name] = float(value) if value is not None else None
+            except (TypeError, ValueError, ZeroDivisionError):
+                metrics[name] = None
+        return {
+            "symbol": symbol, "sector": info["sector"], "industry": info.get("industry"),
+            "most_recent_quarter": info.get("mostRecentQuarter"), "fetched_at": time.time(), "metrics": metrics
+        }
+
+    def refresh(self, symbols, max_workers=8):
+        """Fetches the due rows for the given universe, drops symbols no longer in it and rebuilds the aggregates."""
+        universe = set(symbols)
+        rows = {symbol: row for symbol, row in self.rows().items() if symbol in universe}
+        due = [symbol for symbol in symbols if self.is_due(rows.get(symbol))]
+        print(f"Refreshing {len(due)} of {len(symbols)} peer rows")
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="peers") as pool:
+            futures = {pool.submit(self.fetch_row, symbol): symbol for symbol in due}
+            for future in as_completed(futures):
+                try:
+                    row = future.result()
+                except Exception as e:
+                    print(f"Peer fetch failed for {futures[future]}: {e}")
+                    continue
+                if row is not None:
+                    rows[row["symbol"]] = row
+        self._write_json(self.universe_path, rows)
+        aggregates = self.build_aggregates(rows)
+        self._write_json(self.aggregates_path, aggregates)
+        return aggregates
+
+    def build_aggregates(self, rows):
+        """{"sector:<name>" / "industry:<name>": {"count": n, "metrics": {metric: {count, mean, p25, median, p75}}}}."""
+        rows = list(rows.values())
+        groups = {}
+        if not rows:
+            return {"built_at": time.time(), "groups": groups}
+        names = list(METRICS)
+        values = np.array([[np.nan if row["metrics"].get(name) is None else row["metrics"][name] for name in names] for row in rows])
+        for level in ("sector", "industry"):
+            keys = [f"{level}:{row.get(level)}" for row in rows]
+            labels, codes = np.unique(keys, return_inverse=True)
+            stats = group_stats(codes, values)
+            sizes = np.bincount(codes)
+            for g, key in enumerate(labels):
+                if key.endswith(":None"):
+                    continue
+                groups[str(key)] = {
+                    "count": int(sizes[g]),
+                    "metrics": {
+                        name: {stat: (round(float(stats[stat][g, k]), 4) if np.isfinite(stats[stat][g, k]) else None) for stat in stats}
+                        for k, name in enumerate(names)
+                    }
+                }
+        return {"built_at": time.time(), "groups": groups}
+
+    def aggregates(self):
+        """The current aggregates, re-read only when the job has rewritten the file."""
+        try:
+            mtime = os.path.getmtime(self.aggregates_path)
+        except OSError:
+            return {}
+        with self._guard:
+            if mtime != self._aggregates_mtime:
+                self._aggregates = self._read_json(self.aggregates_path).get("groups", {})
+                self._aggregates_mtime = mtime
+            return self._aggregates
+
+    def peer_medians(self, info, level="industry"):
+        """
+        {metric: median} for the ticker's industry or sector, or {} when none is known. An industry with
+        fewer than PEER_MIN_GROUP members falls back to the sector.
+        """
+        aggregates = self.aggregates()
+        group = aggregates.get(f"industry:{info.get('industry')}") if level == "industry" else None
+        if group is None or group["count"] < PEER_MIN_GROUP:
+            group = aggregates.get(f"sector:{info.get('sector')}")
+        if group is None:
+            return {}
+        return {name: stats["median"] for name, stats in group["metrics"].items()}
+
+
+def sp500_symbols():
+    """S&P 500 constituents from Wikipedia, in yfinance notation."""
+    response = requests.get(SP500_URL, headers={"User-Agent": "StockAnalysisBot/1.0"}, timeout=30)
+    response.raise_for_status()
+    table = BeautifulSoup(response.text, "html.parser").find("table", {"id": "constituents"})
+    return [row.find("td").get_text(strip=True).replace(".", "-") for row in table.find_all("tr")[1:] if row.find("td")]
+
+
+peer_universe = PeerUniverse()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh the peer fundamentals universe and its sector/industry aggregates")
+    parser.add_argument("--universe", type=str, default="", help="Comma-separated tickers (defaults to the S&P 500 constituents)")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent fundamentals fetches")
+    args = parser.parse_args()
+
+    symbols = [t.strip().upper() for t in args.universe.split(",") if t.strip()] or sp500_symbols()
+    started = time.perf_counter()
+    aggregates = peer_universe.refresh(symbols, args.workers)
+    print(f"Built aggregates for {len(aggregates['groups'])} sectors and industries in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
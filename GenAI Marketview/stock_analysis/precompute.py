@@ -0,0 +1,76 @@
+"""
+Precompute MarketView reports for a watchlist so the first viewer of the day gets a cached report.
+
+    python precompute.py                                   # symbols from StockSage meta_data.json
+    python precompute.py --watchlist AAPL,MSFT,NVDA --workers 4
+
+Reports are written to the shared report cache for the current trading day. Tickers already cached are
+skipped, so an interrupted run resumes where it stopped. A report degraded by an outage (a section that
+failed or timed out, or a narration that fell back to placeholder text) is counted as "degraded" and not
+cached, so the next run builds it again. All narrations share the process-wide Bedrock
+rate limiter, so --workers only bounds data gathering concurrency.
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from report_cache import report_cache
+from report import report_complete
+from service import get_news_analysis, get_report
+
+DEFAULT_META_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "StockSage Bot", "meta_data.json")
+
+
+def load_watchlist(meta_data_path):
+    """Returns the distinct symbols listed in a StockSage meta_data.json."""
+    with open(meta_data_path) as f:
+        meta_data = json.load(f)
+    symbols = set()
+    for table in meta_data.get("tables", {}).values():
+        symbols.update(table.get("categorical_values", {}).get("symbol", []))
+    return sorted(symbols)
+
+
+def precompute_ticker(ticker, include_news=True):
+    started = time.perf_counter()
+    status = "cached"
+    if report_cache.get(ticker) is None:
+        report = get_report(ticker)
+        if report.get("error"):
+            status = "failed"
+        else:
+            status = "built" if report_complete(report) else "degraded"
+    if include_news:
+        get_news_analysis(ticker)
+    return ticker, status, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute MarketView reports into the shared report cache")
+    parser.add_argument("--watchlist", type=str, default="", help="Comma-separated tickers (defaults to the symbols in --meta-data)")
+    parser.add_argument("--meta-data", type=str, default=DEFAULT_META_DATA, help="StockSage meta_data.json to read symbols from")
+    parser.add_argument("--workers", type=int, default=4, help="Reports built in parallel")
+    parser.add_argument("--skip-news", action="store_true", help="Do not precompute the news analysis")
+    args = parser.parse_args()
+
+    watchlist = [t.strip().upper() for t in args.watchlist.split(",") if t.strip()] or load_watchlist(args.meta_data)
+    print(f"Precomputing {len(watchlist)} reports with {args.workers} workers")
+    started = time.perf_counter()
+    counts = {"built": 0, "cached": 0, "degraded": 0, "failed": 0}
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(precompute_ticker, ticker, not args.skip_news) for ticker in watchlist]
+        for future in as_completed(futures):
+            try:
+                ticker, status, seconds = future.result()
+            except Exception as e:
+                print(f"Precompute failed: {e}")
+                counts["failed"] += 1
+                continue
+            counts[status] += 1
+            print(f"{ticker}: {status} in {seconds:.1f}s")
+    print(f"Done in {time.perf_counter() - started:.1f}s: {counts}; cache stats {report_cache.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Upstream providers (Yahoo Finance, Finnhub, Wikipedia, Bedrock) with record/replay fixtures.
+
+PROVIDER_MODE selects how every upstream call is served:
+
+    live    call the service (default)
+    record  call the service and save its response under FIXTURE_DIR
+    replay  serve saved responses only; nothing touches the network (see bench.py)
+
+A fixture is a pickle of one call's response (or the error it raised) and how long it took; replay waits
+that long times PROVIDER_REPLAY_LATENCY so concurrency and caching changes stay measurable. Calls are keyed
+by provider, method and arguments; Finnhub news is keyed by symbol only, as its date window moves daily.
+Every call is counted in fixtures.stats in all modes, whether or not it reaches the network.
+"""
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+import finnhub
+import wikipediaapi
+import yfinance as yf
+from cache_utils import atomic_write
+from config import PROVIDER_MODE, FIXTURE_DIR, PROVIDER_REPLAY_LATENCY
+
+WIKIPEDIA_USER_AGENT = "StockAnalysisBot/1.0 (Contact: example@example.com)"
+
+
+class RecordedError(Exception):
+    """An upstream error replayed from a fixture."""
+
+
+class FixtureMissing(KeyError):
+    """Replay found no fixture for a call; record one with PROVIDER_MODE=record."""
+
+
+class FixtureStore:
+    """Serves upstream calls live, recording or replaying them according to the mode; see the module docstring."""
+
+    def __init__(self, mode=PROVIDER_MODE, root=FIXTURE_DIR, latency=PROVIDER_REPLAY_LATENCY):
+        if mode not in ("live", "record", "replay"):
+            raise ValueError(f"Unknown provider mode {mode!r}")
+        self.mode = mode
+        self.root = root
+        self.latency = latency
+        self._lock = threading.Lock()
+        self.stats = {}
+        self.misses = 0
+
+    def _path(self, provider, method, key):
+        digest = hashlib.sha1(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()[:16]
+        return os.path.join(self.root, provider, method, f"{digest}.pkl")
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {}
+            self.misses = 0
+
+    def call(self, provider, method, key, fetch, to_fixture=None, from_fixture=None):
+        """
+        fetch() performs the live call. to_fixture turns its result into something picklable (e.g. drains a
+        stream) and from_fixture turns a saved value back into what callers expect.
+        """
+        with self._lock:
+            name = f"{provider}.{method}"
+            self.stats[name] = self.stats.get(name, 0) + 1
+        if self.mode == "live":
+            return fetch()
+        path = self._path(provider, method, key)
+        if self.mode == "replay":
+            try:
+                with open(path, "rb") as f:
+                    fixture = pickle.load(f)
+            except OSError:
+                with self._lock:
+                    self.misses += 1
+                raise FixtureMissing(f"No {provider}.{method} fixture for {key}")
+            time.sleep(fixture["seconds"] * self.latency)
+            if "error" in fixture:
+                raise RecordedError(fixture["error"])
+            return from_fixture(fixture["value"]) if from_fixture else fixture["value"]
+
+        started = time.perf_counter()
+        try:
+            value = fetch()
+            value = to_fixture(value) if to_fixture else value
+        except Exception as e:
+            fixture = {"key": key, "error": f"{type(e).__name__}: {e}", "seconds": time.perf_counter() - started}
+            atomic_write(path, lambda f: pickle.dump(fixture, f))
+            raise
+        fixture = {"key": key, "value": value, "seconds": time.perf_counter() - started}
+        atomic_write(path, lambda f: pickle.dump(fixture, f))
+        return from_fixture(value) if from_fixture else value
+
+
+fixtures = FixtureStore()
+
+
+def _fast_info_dict(fast_info):
+    values = {}
+    for key in fast_info.keys():
+        try:
+            values[key] = fast_info[key]
+        except Exception:
+            values[key] = None
+    return values
+
+
+class YahooTicker:
+    """
+    Stand-in for yf.Ticker: attributes (info, dividends, statements, news) and history() go through the
+    fixtures. The yfinance object is only created for a call that goes upstream.
+    """
+
+    def __init__(self, symbol):
+        self.ticker = symbol
+        self._stock = None
+
+    @property
+    def stock(self):
+        if self._stock is None:
+            self._stock = yf.Ticker(self.ticker)
+        return self._stock
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return fixtures.call("yfinance", name, [self.ticker], lambda: getattr(self.stock, name))
+
+    @property
+    def fast_info(self):
+        # Recorded as a plain dict; callers only use .get()
+        return fixtures.call("yfinance", "fast_info", [self.ticker], lambda: self.stock.fast_info, to_fixture=_fast_info_dict)
+
+    def history(self, **kwargs):
+        return fixtures.call("yfinance", "history", [self.ticker, kwargs], lambda: self.stock.history(**kwargs))
+
+
+def yahoo_ticker(symbol):
+    return YahooTicker(symbol)
+
+
+def yahoo_download(tickers, **kwargs):
+    return fixtures.call("yfinance", "download", [sorted(tickers), kwargs], lambda: yf.download(tickers, **kwargs))
+
+
+def wikipedia_page(title):
+    """{"title", "summary"} of the English Wikipedia page, or None when there is no such page."""
+    def fetch():
+        page = wikipediaapi.Wikipedia(user_agent=WIKIPEDIA_USER_AGENT, language="en").page(title)
+        return {"title": page.title, "summary": page.summary} if page.exists() else None
+    return fixtures.call("wikipedia", "page", [title], fetch)
+
+
+class FinnhubClient:
+    """The finnhub.Client calls the app makes, through the fixtures."""
+
+    def __init__(self, api_key):
+        self._client = finnhub.Client(api_key=api_key) if fixtures.mode != "replay" else None
+
+    def company_news(self, symbol, _from, to):
+        return fixtures.call("finnhub", "company_news", [symbol], lambda: self._client.company_news(symbol, _from=_from, to=to))
+
+
+class BedrockClient:
+    """The bedrock-runtime converse and converse_stream calls, through the fixtures."""
+
+    def __init__(self, client):
+        self._client = client
+
+    def converse(self, **kwargs):
+        return fixtures.call("bedrock", "converse", kwargs, lambda: self._client.converse(**kwargs))
+
+    def converse_stream(self, **kwargs):
+        # A recorded stream is saved as its list of events and replayed as an iterator over them
+        return fixtures.call(
+            "bedrock", "converse_stream", kwargs, lambda: self._client.converse_stream(**kwargs),
+            to_fixture=lambda response: list(response["stream"]),
+            from_fixture=lambda events: {"stream": iter(events)}
+        )
+
+
+def bedrock_client(create):
+    """Wraps the client returned by create(); in replay mode no real client is created."""
+    return BedrockClient(create() if fixtures.mode != "replay" else None)
@@ -0,0 +1,122 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from config import BEDROCK_REQUESTS_PER_MINUTE, BEDROCK_BURST, BEDROCK_MAX_RETRIES, BEDROCK_RETRY_BASE_DELAY
+
+
+def is_throttling_error(err):
+    return "ThrottlingException" in f"{type(err).__name__} {err}"
+
+
+class RateLimiter:
+    """
+    Process-wide token bucket for Bedrock requests.
+
+    Waiters are served in priority order (lower first, then arrival), so report sections can be
+    requested in page order. The refill rate adapts AIMD-style: halved on throttling, raised by a
+    small step after each success, never above the configured quota.
+    """
+
+    def __init__(self, requests_per_minute=BEDROCK_REQUESTS_PER_MINUTE, burst=BEDROCK_BURST):
+        self.max_rate = requests_per_minute / 60.0
+        self.min_rate = self.max_rate / 16
+        self.rate = self.max_rate
+        self.capacity = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._waiters = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self.stats = {"requests": 0, "throttles": 0, "wait_seconds": 0.0}
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, priority=0):
+        """Blocks until a request slot is available for this priority."""
+        started = time.monotonic()
+        with self._cond:
+            entry = (priority, next(self._seq))
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    self._refill()
+                    at_head = self._waiters[0] == entry
+                    if at_head and self._tokens >= 1:
+                        heapq.heappop(self._waiters)
+                        self._tokens -= 1
+                        self.stats["requests"] += 1
+                        self.stats["wait_seconds"] += time.monotonic() - started
+                        self._cond.notify_all()
+                        return
+                    self._cond.wait(timeout=(1 - self._tokens) / self.rate if at_head else None)
+            except BaseException:
+                if entry in self._waiters:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                    self._cond.notify_all()
+                raise
+
+    def on_success(self):
+        with self._cond:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+    def on_throttle(self):
+        with self._cond:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+            self.stats["throttles"] += 1
+
+
+bedrock_limiter = RateLimiter()
+
+
+def converse_with_limit(client, priority=0, limiter=bedrock_limiter, max_retries=BEDROCK_MAX_RETRIES,
+                        base_delay=BEDROCK_RETRY_BASE_DELAY, **kwargs):
+    """Calls client.converse through the shared limiter, retrying throttled requests with full-jitter backoff."""
+    for attempt in range(max_retries + 1):
+        limiter.acquire(priority)
+        try:
+            response = client.converse(**kwargs)
+        except Exception as e:
+            if not is_throttling_error(e) or attempt == max_retries:
+                raise
+            limiter.on_throttle()
+            time.sleep(random.uniform(0, base_delay * 2 ** attempt))
+            continue
+        limiter.on_success()
+        return response
+
+
+def converse_stream_with_limit(client, on_text, priority=0, limiter=bedrock_limiter, max_retries=BEDROCK_MAX_RETRIES,
+                               base_delay=BEDROCK_RETRY_BASE_DELAY, **kwargs):
+    """
+    Calls client.converse_stream through the shared limiter, passing each text delta to on_text, and returns
+    a converse-shaped response with the full text and usage. A throttled request is retried only while
+    nothing has been streamed yet.
+    """
+    for attempt in range(max_retries + 1):
+        limiter.acquire(priority)
+        parts, usage = [], {}
+        try:
+            response = client.converse_stream(**kwargs)
+            for event in response["stream"]:
+                if "contentBlockDelta" in event:
+                    text = event["contentBlockDelta"]["delta"].get("text", "")
+                    if text:
+                        parts.append(text)
+                        on_text(text)
+                elif "metadata" in event:
+                    usage = event["metadata"].get("usage", {})
+        except Exception as e:
+            if parts or not is_throttling_error(e) or attempt == max_retries:
+                raise
+            limiter.on_throttle()
+            time.sleep(random.uniform(0, base_delay * 2 ** attempt))
+            continue
+        limiter.on_success()
+        return {"output": {"message": {"content": [{"text": "".join(parts)}]}}, "usage": usage}
@@ -0,0 +1,236 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from data_collection import (
+    get_company_info_wikipedia, get_price_performance, get_returns_timeframes,
+    get_chart_data, get_dividend_metrics, get_financial_strength,
+    get_valuation_ratios, get_balance_sheet_metrics, get_eps_growth_trend,
+    format_volatility_data
+)
+from narration import NarrationUnavailable, generate_narration, narrate_report, narration_stats, prompts
+from visualizations import create_price_trend_chart, create_eps_chart, create_candlestick_chart, create_dcf_heatmap
+from snapshot import TickerSnapshot
+from dcf import dcf_sensitivity
+from gatherer import Section, gather_sections
+from features import price_digest, candlestick_digest
+from config import COMPANY_NAMES, NARRATION_MAX_WORKERS
+
+def company_name_for(ticker):
+    return COMPANY_NAMES.get(ticker, ticker)
+
+def build_benchmark_data(returns_data, ticker):
+    return {
+        "Timeframe": ["1-Year", "3-Year", "5-Year"],
+        ticker: [returns_data["1_year_return"], returns_data["3_year_return"], returns_data["5_year_return"]],
+        "S&P 500": [returns_data["sp500_1_year_return"], returns_data["sp500_3_year_return"], returns_data["sp500_5_year_return"]],
+        "Tech Sector": [returns_data["sector_1_year_return"], returns_data["sector_3_year_return"], returns_data["sector_5_year_return"]]
+    }
+
+def build_price_levels_data(price_data):
+    return {
+        "Metric": ["Price", "50-day SMA", "200-day SMA", "Fibonacci (61.8%)"],
+        "Current": [price_data["current_price"], price_data["current_price"] * 0.95, price_data["current_price"] * 0.9, price_data["current_price"] * 1.05],
+        "1-Month Ago": [price_data["current_price"] * 0.98, price_data["current_price"] * 0.93, price_data["current_price"] * 0.88, price_data["current_price"] * 1.03],
+        "Support": [price_data["52_week_low"]] * 4,
+        "Resistance": [price_data["52_week_high"]] * 4
+    }
+
+def empty_chart_data():
+    return {"dates": np.array([], dtype="datetime64[ns]"), **{name: np.array([]) for name in ("open", "high", "low", "close", "volume")}}
+
+def build_charts(report, ticker):
+    """Plotly figures for a report; built with the report so cached reports render without recomputing them."""
+    charts = {
+        "price_trend": create_price_trend_chart(report["chart_data"], ticker),
+        "candlestick": create_candlestick_chart(report["chart_data"], report["price_levels_data"], ticker)
+    }
+    if report["eps_data"]:
+        charts["eps"] = create_eps_chart(report["eps_data"], ticker)
+    if report.get("dcf_data"):
+        charts["dcf"] = create_dcf_heatmap(report["dcf_data"], ticker)
+    return charts
+
+def report_sections(snapshot, ticker, company_name):
+    """The report's data sections for gather_sections, all reading from one snapshot."""
+    # Independent sections run concurrently; a section that fails or times out yields its placeholder
+    return [
+        Section("overview_data", lambda: get_company_info_wikipedia(company_name) or {"name": ticker, "summary": "No data available."},
+                placeholder={"name": ticker, "summary": "No data available."}),
+        Section("price_data", lambda: get_price_performance(snapshot), placeholder={}),
+        Section("returns_data", lambda: get_returns_timeframes(snapshot), placeholder={}),
+        Section("chart_data", lambda: get_chart_data(snapshot), placeholder=empty_chart_data()),
+        # Narrations get a compact digest of the price history rather than every daily close
+        Section("price_trend_data", price_digest, deps=["chart_data"], placeholder={}),
+        Section("dividend_data", lambda: get_dividend_metrics(snapshot), placeholder={}),
+        # One DCF grid feeds the financial strength data, its narration and the sensitivity heatmap
+        Section("dcf_data", lambda: dcf_sensitivity(snapshot), placeholder={}),
+        Section("financial_strength_data", lambda dcf: get_financial_strength(snapshot, dcf), deps=["dcf_data"], placeholder={}),
+        Section("valuation_data", lambda: get_valuation_ratios(snapshot), placeholder={}),
+        Section("balance_data", lambda: get_balance_sheet_metrics(snapshot), placeholder={}),
+        Section("eps_data", lambda: get_eps_growth_trend(snapshot), placeholder=[]),
+        Section("volatility", lambda: format_volatility_data(snapshot), placeholder=(pd.DataFrame(), "No volatility data available.")),
+        Section("benchmark_data", lambda returns: build_benchmark_data(returns, ticker), deps=["returns_data"], placeholder={}),
+        Section("price_levels_data", build_price_levels_data, deps=["price_data"], placeholder={}),
+    ]
+
+def sections_with_deps(sections, names):
+    """The named sections plus everything they depend on, for gathering part of a report."""
+    by_name = {section.name: section for section in sections}
+    selected, pending = set(), list(names)
+    while pending:
+        name = pending.pop()
+        if name not in selected:
+            selected.add(name)
+            pending.extend(by_name[name].deps)
+    return [section for section in sections if section.name in selected]
+
+# Narration key -> (sections it describes, builder of its prompt data from the gathered results), in page order
+NARRATION_SPECS = {
+    "overview": (["overview_data"], lambda r: r["overview_data"]),
+    "price_performance": (["price_data"], lambda r: r["price_data"]),
+    "returns_narrative": (["returns_data"], lambda r: r["returns_data"]),
+    "price_trend_narrative": (["price_trend_data"], lambda r: r["price_trend_data"]),
+    "dividend_narrative": (["dividend_data"], lambda r: r["dividend_data"]),
+    "benchmark_narrative": (["benchmark_data"], lambda r: r["benchmark_data"]),
+    "financial_strength": (["financial_strength_data"], lambda r: r["financial_strength_data"]),
+    "valuation_narrative": (["valuation_data"], lambda r: r["valuation_data"]),
+    "balance_narrative": (["balance_data"], lambda r: r["balance_data"]),
+    "eps_narrative": (["eps_data"], lambda r: r["eps_data"]),
+    "market_sentiment": (["price_levels_data"], lambda r: r["price_levels_data"]),
+    "volatility_narrative": (["volatility"], lambda r: r["volatility"][0].to_dict()),
+    "price_levels_narrative": (["price_levels_data"], lambda r: r["price_levels_data"]),
+    "candlestick_narrative": (["chart_data", "price_levels_data"], lambda r: candlestick_digest(r["chart_data"], r["price_levels_data"])),
+    "recommendations": (["price_data", "returns_data", "financial_strength_data", "valuation_data", "price_levels_data"], lambda r: {
+        "price": r["price_data"], "returns": r["returns_data"], "financial": r["financial_strength_data"],
+        "valuation": r["valuation_data"], "technical": r["price_levels_data"]
+    })
+}
+
+def narration_needed(key, results):
+    """Volatility gets a fixed text instead of a narration when there is no volatility data."""
+    return key != "volatility_narrative" or not results["volatility"][0].empty
+
+def assemble_report(results, timings, narrations, ticker, narration_failures=()):
+    """The report dict (with charts) from gathered section results and narrations."""
+    volatility_df, volatility_narrative_default = results["volatility"]
+    if volatility_df.empty:
+        narrations["volatility_narrative"] = volatility_narrative_default
+    report = {name: value for name, value in results.items() if name != "volatility"}
+    report.update({
+        "volatility_df": volatility_df,
+        "volatility_narrative_default": volatility_narrative_default,
+        "narrations": narrations,
+        "narration_failures": sorted(narration_failures),
+        "section_timings": timings
+    })
+    report["charts"] = build_charts(report, ticker)
+    return report
+
+def report_complete(report):
+    """
+    True when every section was gathered and every narration generated. Reports degraded by an upstream or
+    Bedrock outage (placeholder sections, fallback narration texts) are served but never cached.
+    """
+    return (
+        not report.get("error")
+        and not report.get("narration_failures")
+        and all(timing["status"] == "ok" for timing in report["section_timings"].values())
+    )
+
+def error_report(ticker, error):
+    print(f"Error building report for {ticker}: {error}")
+    return {
+        "error": str(error),
+        "overview_data": {"name": ticker, "summary": "No data available."},
+        "price_data": {},
+        "returns_data": {},
+        "price_trend_data": {},
+        "chart_data": empty_chart_data(),
+        "dividend_data": {},
+        "financial_strength_data": {},
+        "dcf_data": {},
+        "valuation_data": {},
+        "balance_data": {},
+        "eps_data": {},
+        "volatility_df": pd.DataFrame(),
+        "volatility_narrative_default": "No volatility data available.",
+        "benchmark_data": {},
+        "price_levels_data": {},
+        "narrations": {},
+        "narration_failures": [],
+        "section_timings": {},
+        "charts": {}
+    }
+
+def build_report(ticker, company_name=None):
+    """Gathers section data, narrations and charts for a ticker."""
+    company_name = company_name or company_name_for(ticker)
+    try:
+        # All sections share one snapshot so each upstream artefact is fetched once per report
+        snapshot = TickerSnapshot(ticker)
+        sections = report_sections(snapshot, ticker, company_name)
+        gather_start = time.perf_counter()
+        results, timings = gather_sections(sections)
+        print(f"Gathered {ticker} sections in {time.perf_counter() - gather_start:.2f}s: {timings}")
+        print(f"Upstream fetches for {ticker}: {snapshot.fetch_counts}")
+
+        narration_jobs = [
+            (key, prompts[key], build(results))
+            for key, (deps, build) in NARRATION_SPECS.items() if narration_needed(key, results)
+        ]
+        # Rough token count (4 characters per token) of what replaced the raw daily closes
+        print(f"Price trend prompt data for {ticker}: ~{len(json.dumps(results['price_trend_data'])) // 4} tokens "
+              f"in place of {len(results['chart_data']['close'])} daily closes")
+        narrate_start = time.perf_counter()
+        narrations, failed = narrate_report(narration_jobs, ticker)
+        print(f"Generated {len(narration_jobs)} {ticker} narrations in {time.perf_counter() - narrate_start:.2f}s")
+        return assemble_report(results, timings, narrations, ticker, failed)
+    except Exception as e:
+        return error_report(ticker, e)
+
+def stream_report(ticker, on_event, company_name=None):
+    """
+    Builds a report progressively for a UI that renders as data arrives. on_event(kind, key, value) receives
+    ("section", name, data) as each section resolves, ("narration_delta", key, text) for each streamed chunk,
+    ("narration", key, text) once a narration is complete and finally ("done", None, report).
+
+    Each narration starts as soon as the sections it describes are ready, as its own streaming call (earlier
+    sections first at the rate limiter), rather than after the whole report in one batch. Narration events
+    come from worker threads, so on_event must be thread-safe.
+    """
+    company_name = company_name or company_name_for(ticker)
+    started = time.perf_counter()
+    try:
+        snapshot = TickerSnapshot(ticker)
+        gathered, jobs, failed = {}, {}, set()
+        with ThreadPoolExecutor(max_workers=NARRATION_MAX_WORKERS, thread_name_prefix="narration") as pool:
+            def narrate(key, data, priority):
+                try:
+                    text = generate_narration(prompts[key], data, ticker, priority, mode="streaming",
+                                              on_text=lambda chunk: on_event("narration_delta", key, chunk), key=key)
+                except NarrationUnavailable as e:
+                    text = e.text
+                    failed.add(key)
+                on_event("narration", key, text)
+                return text
+
+            def on_result(name, value):
+                gathered[name] = value
+                on_event("section", name, value)
+                for priority, (key, (deps, build)) in enumerate(NARRATION_SPECS.items()):
+                    if key not in jobs and all(dep in gathered for dep in deps) and narration_needed(key, gathered):
+                        jobs[key] = pool.submit(narrate, key, build(gathered), priority)
+
+            results, timings = gather_sections(report_sections(snapshot, ticker, company_name), on_result=on_result)
+            narrations = {key: job.result() for key, job in jobs.items()}
+        narration_stats.record("streaming", seconds=time.perf_counter() - started, reports=1)
+        print(f"Streamed {ticker} report with {len(narrations)} narrations in {time.perf_counter() - started:.2f}s")
+        report = assemble_report(results, timings, narrations, ticker, failed)
+        if "volatility_narrative" not in jobs:
+            on_event("narration", "volatility_narrative", report["narrations"]["volatility_narrative"])
+    except Exception as e:
+        report = error_report(ticker, e)
+    on_event("done", None, report)
+    return report
@@ -0,0 +1,168 @@
+import glob
+import os
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from cache_utils import atomic_write, trading_day
+from config import REPORT_CACHE_DIR, REPORT_CACHE_MAX_BYTES, REPORT_CACHE_MEMORY_BYTES, REPORT_CACHE_TTL_SECONDS
+
+try:
+    import fcntl
+except ImportError:  # Windows: generation is single-flight per process only
+    fcntl = None
+
+
+class ReportCache:
+    """
+    Shared cache of generated reports and news analyses, keyed by ticker, trading day and kind.
+
+    Entries are pickled to REPORT_CACHE_DIR so every Streamlit session and worker process sees them. File
+    mtime is the creation time (TTL) and atime the last access (LRU); when the directory exceeds max_bytes
+    the least recently used files are removed. Recently used entries are also kept decoded in memory,
+    bounded by memory_bytes. get_or_create builds a missing entry once: concurrent callers in this process
+    wait on a lock, and other processes wait on a lock file.
+    """
+
+    def __init__(self, cache_dir=REPORT_CACHE_DIR, max_bytes=REPORT_CACHE_MAX_BYTES,
+                 ttl_seconds=REPORT_CACHE_TTL_SECONDS, memory_bytes=REPORT_CACHE_MEMORY_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.memory_bytes = memory_bytes
+        self._memory = OrderedDict()  # path -> (created, size, value)
+        self._memory_used = 0
+        self._locks = {}
+        self._guard = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+    def _path(self, ticker, kind, day=None):
+        safe_ticker = re.sub(r"[^A-Za-z0-9_.-]", "_", ticker)
+        return os.path.join(self.cache_dir, f"{safe_ticker}_{day or trading_day()}_{kind}.pkl")
+
+    def _remember(self, path, created, size, value):
+        with self._guard:
+            if path in self._memory:
+                self._memory_used -= self._memory.pop(path)[1]
+            if size > self.memory_bytes:
+                return
+            self._memory[path] = (created, size, value)
+            self._memory_used += size
+            while self._memory_used > self.memory_bytes:
+                self._memory_used -= self._memory.popitem(last=False)[1][1]
+
+    def _forget(self, path):
+        with self._guard:
+            if path in self._memory:
+                self._memory_used -= self._memory.pop(path)[1]
+
+    def get(self, ticker, kind="report"):
+        """Returns the cached value for today's trading day, or None."""
+        path = self._path(ticker, kind)
+        now = time.time()
+        with self._guard:
+            entry = self._memory.get(path)
+            if entry and now - entry[0] < self.ttl_seconds and os.path.exists(path):
+                self._memory.move_to_end(path)
+                self.stats["memory_hits"] += 1
+                return entry[2]
+        try:
+            created, size = os.path.getmtime(path), os.path.getsize(path)
+            if now - created >= self.ttl_seconds:
+                self._remove(path)
+                self.stats["misses"] += 1
+                return None
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+            os.utime(path, (now, created))
+        except FileNotFoundError:
+            self._forget(path)
+            self.stats["misses"] += 1
+            return None
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            print(f"Discarding unreadable cache entry {path}: {e}")
+            self._remove(path)
+            self.stats["misses"] += 1
+            return None
+        self._remember(path, created, size, value)
+        self.stats["disk_hits"] += 1
+        return value
+
+    def put(self, ticker, value, kind="report"):
+        path = self._path(ticker, kind)
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        atomic_write(path, lambda f: f.write(payload))
+        self._remember(path, os.path.getmtime(path), len(payload), value)
+        self.evict()
+
+    def _remove(self, path):
+        self._forget(path)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def evict(self):
+        """Removes expired and stale-day entries, then least recently used ones until under max_bytes."""
+        now = time.time()
+        today = trading_day()
+        entries = []
+        for path in glob.glob(os.path.join(self.cache_dir, "*.pkl")):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if now - stat.st_mtime >= self.ttl_seconds or f"_{today}_" not in os.path.basename(path):
+                self._remove(path)
+                self.stats["evictions"] += 1
+                continue
+            entries.append((stat.st_atime, stat.st_size, path))
+        for lock_path in glob.glob(os.path.join(self.cache_dir, "*.pkl.lock")):
+            if f"_{today}_" not in os.path.basename(lock_path):
+                try:
+                    os.remove(lock_path)
+                except OSError:
+                    pass
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+            self.stats["evictions"] += 1
+        return total
+
+    @contextmanager
+    def _build_lock(self, path):
+        with self._guard:
+            lock = self._locks.setdefault(path, threading.Lock())
+        with lock:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(path + ".lock", "w") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def get_or_create(self, ticker, build, kind="report", should_cache=lambda value: value is not None):
+        """Returns the cached value or builds, stores and returns it; only one caller builds a given entry."""
+        value = self.get(ticker, kind)
+        if value is not None:
+            return value
+        with self._build_lock(self._path(ticker, kind)):
+            value = self.get(ticker, kind)
+            if value is not None:
+                return value
+            value = build()
+            if should_cache(value):
+                self.put(ticker, value, kind)
+            return value
+
+
+report_cache = ReportCache()
@@ -0,0 +1,167 @@
+import numpy as np
+import pandas as pd
+
+
+# Lookback points read from each indicator series, in trading days before the latest bar
+LOOKBACKS = {"value": 0, "1_month_ago": 21, "3_months_ago": 63, "6_months_ago": 126}
+
+
+def _windowed_sum(values, window):
+    """
+    Sum over each trailing window from cumulative sums, NaN until the window is full and for any window
+    holding a NaN (as pandas rolling); NaNs count as zero in the sums so later windows recover.
+    """
+    out = np.full(len(values), np.nan)
+    if window <= 0 or len(values) < window:
+        return out
+    missing = np.isnan(values)
+    csum = np.concatenate(([0.0], np.cumsum(np.where(missing, 0.0, values))))
+    valid = np.concatenate(([0], np.cumsum(~missing)))
+    sums = csum[window:] - csum[:-window]
+    out[window - 1:] = np.where(valid[window:] - valid[:-window] == window, sums, np.nan)
+    return out
+
+
+def rolling_mean(values, window):
+    return _windowed_sum(values, window) / window
+
+
+def rolling_std(values, window):
+    """Sample standard deviation over each trailing window (ddof=1, as pandas)."""
+    if len(values) == 0:
+        return np.full(0, np.nan)
+    # Shift by the first valid value to limit cancellation in the sum-of-squares formula
+    finite = values[~np.isnan(values)]
+    shifted = values - (finite[0] if len(finite) else 0.0)
+    sums = _windowed_sum(shifted, window)
+    squares = _windowed_sum(shifted * shifted, window)
+    variance = (squares - sums * sums / window) / (window - 1)
+    return np.sqrt(np.clip(variance, 0.0, None))
+
+
+def pct_change(values):
+    out = np.full(len(values), np.nan)
+    out[1:] = values[1:] / values[:-1] - 1
+    return out
+
+
+def true_range(high, low, close):
+    previous_close = np.concatenate(([np.nan], close[:-1]))
+    return np.fmax(high - low, np.fmax(np.abs(high - previous_close), np.abs(low - previous_close)))
+
+
+def atr_series(high, low, close, window=14):
+    return rolling_mean(true_range(high, low, close), window)
+
+
+def bollinger_width_series(close, window=20):
+    """(upper - lower) / middle band in percent, i.e. 4 standard deviations over the SMA."""
+    return 4 * rolling_std(close, window) / rolling_mean(close, window) * 100
+
+
+def rsi_series(close, periods=14):
+    """Wilder's RSI (exponential smoothing with alpha = 1 / periods)."""
+    delta = np.diff(close, prepend=np.nan)
+    gain = pd.Series(np.clip(delta, 0, None)).ewm(alpha=1 / periods, adjust=False).mean().to_numpy()
+    loss = pd.Series(np.clip(-delta, 0, None)).ewm(alpha=1 / periods, adjust=False).mean().to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100 - 100 / (1 + gain / loss)
+    rsi[:periods] = np.nan
+    return rsi
+
+
+def align(dates_a, values_a, dates_b, values_b):
+    """Values of both series on their common dates, dropping pairs with a NaN."""
+    common, index_a, index_b = np.intersect1d(dates_a, dates_b, assume_unique=True, return_indices=True)
+    a, b = values_a[index_a], values_b[index_b]
+    valid = ~(np.isnan(a) | np.isnan(b))
+    return a[valid], b[valid]
+
+
+def _expanding_moments(x, y):
+    n = np.arange(1, len(x) + 1, dtype=float)
+    sx, sy = np.cumsum(x), np.cumsum(y)
+    cov = np.cumsum(x * y) - sx * sy / n
+    var_x = np.cumsum(x * x) - sx * sx / n
+    var_y = np.cumsum(y * y) - sy * sy / n
+    return n, cov, var_x, var_y
+
+
+def expanding_corr(x, y):
+    """Correlation of x and y over [0, t] for every t, from cumulative sums."""
+    n, cov, var_x, var_y = _expanding_moments(x, y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = cov / np.sqrt(var_x * var_y)
+    corr[n < 2] = np.nan
+    return corr
+
+
+def expanding_beta(returns, market_returns):
+    """cov(returns, market) / var(market) over [0, t] for every t."""
+    n, cov, _, var_market = _expanding_moments(returns, market_returns)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        beta = cov / var_market
+    beta[n < 2] = np.nan
+    return beta
+
+
+def at_lookbacks(series, lookbacks=LOOKBACKS):
+    """Reads each lookback point from a series; missing or NaN points are None."""
+    points = {}
+    for name, offset in lookbacks.items():
+        index = len(series) - 1 - offset
+        value = series[index] if index >= 0 else np.nan
+        points[name] = float(value) if np.isfinite(value) else None
+    return points
+
+
+# Return horizons in trading days; None is measured from the first close of the latest year (YTD) or of the series
+HORIZONS = {"ytd": "ytd", "1_year": 252, "3_year": 756, "5_year": None}
+
+
+def horizon_starts(dates, horizons=HORIZONS):
+    """Row index where each horizon starts (may be negative when the series is too short)."""
+    year_start = np.datetime64(dates[-1], "Y").astype(dates.dtype)
+    return np.array([
+        int(np.searchsorted(dates, year_start)) if days == "ytd" else 0 if days is None else len(dates) - days
+        for days in horizons.values()
+    ])
+
+
+def horizon_stats(dates, prices, horizons=HORIZONS):
+    """
+    Returns and annualized volatilities (percent) over every horizon for every column of a T x N price
+    matrix, as two H x N arrays. Columns may start late (NaN before listing): windows start no earlier than
+    a column's first close, and a column without enough history for a fixed-length horizon gets a NaN return
+    (its volatility covers the history it has).
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    if prices.ndim == 1:
+        prices = prices[:, None]
+    n_rows, n_cols = prices.shape
+    columns = np.arange(n_cols)
+    first_valid = np.argmax(~np.isnan(prices), axis=0)
+    nominal = horizon_starts(dates, horizons)
+    starts = np.maximum(nominal[:, None], first_valid[None, :])
+    fixed = np.array([isinstance(days, int) for days in horizons.values()])
+    short = fixed[:, None] & (nominal[:, None] < first_valid[None, :])
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = (prices[-1][None, :] / prices[starts, columns] - 1) * 100
+        daily = prices[1:] / prices[:-1] - 1
+    valid = ~np.isnan(daily)
+    daily = np.where(valid, daily, 0.0)
+    # Window sums from cumulative sums: daily returns after each start row up to the last row
+    zero = np.zeros((1, n_cols))
+    count = np.concatenate((zero, np.cumsum(valid, axis=0)))
+    total = np.concatenate((zero, np.cumsum(daily, axis=0)))
+    squares = np.concatenate((zero, np.cumsum(daily * daily, axis=0)))
+    n = count[-1][None, :] - count[starts, columns]
+    s = total[-1][None, :] - total[starts, columns]
+    ss = squares[-1][None, :] - squares[starts, columns]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variance = (ss - s * s / n) / (n - 1)
+    volatility = np.where(n > 1, np.sqrt(np.clip(variance, 0.0, None)) * np.sqrt(252) * 100, np.nan)
+
+    returns[short] = np.nan
+    return returns, volatility
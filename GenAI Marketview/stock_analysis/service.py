@@ -0,0 +1,165 @@
+"""
+Headless MarketView report service, shared by the Streamlit app, the HTTP API (api.py) and batch jobs.
+
+The blocking functions return cached results when available and build them otherwise; ReportService
+wraps them for asyncio, bounding how many reports build at once in the process. Nothing here imports
+Streamlit.
+"""
+import asyncio
+import math
+from datetime import date, datetime
+import numpy as np
+import pandas as pd
+from report import build_report, company_name_for, report_complete, report_sections, sections_with_deps, stream_report
+from report_cache import report_cache
+from news import fetch_news, process_news_with_llm
+from compare import compare_tickers, comparison_tables, parse_tickers
+from gatherer import gather_sections
+from snapshot import TickerSnapshot
+from config import REPORT_SERVICE_MAX_CONCURRENT
+
+
+def get_report(ticker):
+    """The full report for today's trading day, built once and shared through the report cache (when complete)."""
+    report = report_cache.get(ticker)
+    if report is not None:
+        return report
+    return report_cache.get_or_create(
+        ticker,
+        lambda: build_report(ticker, company_name_for(ticker)),
+        should_cache=report_complete
+    )
+
+
+def get_report_streaming(ticker, on_event):
+    """
+    get_report for progressive rendering: a cached report arrives as a single ("done", None, report) event,
+    otherwise the report is streamed section by section (see report.stream_report) and cached if complete.
+    """
+    report = report_cache.get(ticker)
+    if report is not None:
+        on_event("done", None, report)
+        return report
+    report = stream_report(ticker, on_event, company_name_for(ticker))
+    if report_complete(report):
+        report_cache.put(ticker, report)
+    return report
+
+
+def section_names():
+    return [section.name for section in report_sections(None, "", "")]
+
+
+def get_sections(ticker, names):
+    """
+    Data of the named report sections (no narrations). Read from today's cached report when there is one,
+    otherwise only those sections and their dependencies are gathered.
+    """
+    report = report_cache.get(ticker)
+    if report is not None and not report.get("error"):
+        from_report = lambda name: (report["volatility_df"], report["volatility_narrative_default"]) if name == "volatility" else report[name]
+        return {name: from_report(name) for name in names}
+    snapshot = TickerSnapshot(ticker)
+    sections = sections_with_deps(report_sections(snapshot, ticker, company_name_for(ticker)), names)
+    results, _ = gather_sections(sections)
+    return {name: results[name] for name in names}
+
+
+def get_news_analysis(ticker):
+    """{"news_df", "findings"} for the ticker; only a successful LLM analysis is cached."""
+    cached = report_cache.get(ticker, kind="news")
+    if cached is not None:
+        return cached
+    news_df = fetch_news(ticker)
+    findings = process_news_with_llm(news_df, ticker) if news_df is not None and not news_df.empty else None
+    news = {"news_df": news_df, "findings": findings}
+    if findings is not None:
+        report_cache.put(ticker, news, kind="news")
+    return news
+
+
+def get_comparison(tickers):
+    """Comparison of the given tickers, cached under the sorted ticker set."""
+    return report_cache.get_or_create(
+        ",".join(sorted(tickers)),
+        lambda: compare_tickers(tickers),
+        kind="compare",
+        should_cache=lambda comparison: bool(comparison["tickers"])
+    )
+
+
+def to_jsonable(value):
+    """Converts report values (NumPy arrays, DataFrames, timestamps, NaN) into plain JSON types."""
+    if isinstance(value, dict):
+        return {str(key): to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(item) for item in value]
+    if isinstance(value, pd.DataFrame):
+        return to_jsonable(value.to_dict(orient="records"))
+    if isinstance(value, pd.Series):
+        return to_jsonable(value.to_dict())
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind == "M":
+            return np.datetime_as_string(value, unit="s").tolist()
+        return to_jsonable(value.tolist())
+    if isinstance(value, (pd.Timestamp, datetime, date)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return to_jsonable(value.item())
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def report_json(report):
+    """A report as JSON, without the Plotly figures (clients render charts from chart_data)."""
+    return to_jsonable({key: value for key, value in report.items() if key != "charts"})
+
+
+def news_json(news):
+    news_df = news["news_df"]
+    return {"news": to_jsonable(news_df) if news_df is not None else [], "findings": news["findings"]}
+
+
+def comparison_json(comparison):
+    tables = comparison_tables(comparison) if comparison["tickers"] else {}
+    return to_jsonable({
+        "tickers": comparison["tickers"],
+        "missing": comparison["missing"],
+        "tables": {name: table.reset_index().to_dict(orient="records") for name, table in tables.items()},
+        "series": {ticker: {"dates": dates, "close": close} for ticker, (dates, close) in comparison["series"].items()}
+    })
+
+
+class ReportService:
+    """Async facade over the blocking pipeline: work runs in threads, at most max_concurrent reports build at once."""
+
+    def __init__(self, max_concurrent=REPORT_SERVICE_MAX_CONCURRENT):
+        self._builds = asyncio.Semaphore(max_concurrent)
+        self.stats = {"requests": 0, "builds": 0, "building": 0}
+
+    async def _build(self, fn, *args):
+        async with self._builds:
+            self.stats["builds"] += 1
+            self.stats["building"] += 1
+            try:
+                return await asyncio.to_thread(fn, *args)
+            finally:
+                self.stats["building"] -= 1
+
+    async def report(self, ticker):
+        self.stats["requests"] += 1
+        cached = await asyncio.to_thread(report_cache.get, ticker)
+        return cached if cached is not None else await self._build(get_report, ticker)
+
+    async def sections(self, ticker, names):
+        self.stats["requests"] += 1
+        return await self._build(get_sections, ticker, names)
+
+    async def news(self, ticker):
+        self.stats["requests"] += 1
+        return await self._build(get_news_analysis, ticker)
+
+    async def compare(self, text):
+        self.stats["requests"] += 1
+        return await self._build(get_comparison, parse_tickers(text))
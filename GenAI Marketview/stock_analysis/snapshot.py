@@ -0,0 +1,71 @@
+import threading
+from providers import yahoo_ticker
+from fundamentals_store import fundamentals_store
+
+
+class TickerSnapshot:
+    """
+    Fetch-once view of a ticker's upstream Yahoo Finance data.
+
+    Each artefact (info, 5-year history, dividends, statements) is read lazily on first access from the
+    fundamentals store, which only goes upstream when its copy is due for a refresh, and memoized, so all
+    report sections built from one snapshot share a single read per artefact.
+    Access is thread-safe: concurrent readers of the same artefact wait for one fetch.
+    """
+
+    def __init__(self, ticker):
+        self.ticker = ticker
+        self.stock = yahoo_ticker(ticker)
+        self.fetch_counts = {}
+        self._values = {}
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def _load(self, name, loader):
+        if name in self._values:
+            return self._values[name]
+        with self._guard:
+            lock = self._locks.setdefault(name, threading.Lock())
+        with lock:
+            if name not in self._values:
+                self._values[name] = loader()
+                self.fetch_counts[name] = self.fetch_counts.get(name, 0) + 1
+        return self._values[name]
+
+    @property
+    def info(self):
+        return self._load("info", lambda: fundamentals_store.info(self.ticker, self.stock))
+
+    @property
+    def history(self):
+        """Daily OHLCV history for the last 5 years."""
+        return self._load("history", lambda: fundamentals_store.history(self.ticker, self.stock, period="5y"))
+
+    @property
+    def dividends(self):
+        return self._load("dividends", lambda: fundamentals_store.dividends(self.ticker, self.stock))
+
+    @property
+    def income_stmt(self):
+        return self._load("income_stmt", lambda: fundamentals_store.statement(self.ticker, "income_stmt", self.stock))
+
+    @property
+    def balance_sheet(self):
+        return self._load("balance_sheet", lambda: fundamentals_store.statement(self.ticker, "balance_sheet", self.stock))
+
+    @property
+    def financials(self):
+        return self._load("financials", lambda: fundamentals_store.statement(self.ticker, "financials", self.stock))
+
+    @property
+    def quarterly_financials(self):
+        return self._load("quarterly_financials", lambda: fundamentals_store.statement(self.ticker, "quarterly_financials", self.stock))
+
+    @property
+    def cashflow(self):
+        return self._load("cashflow", lambda: fundamentals_store.statement(self.ticker, "cashflow", self.stock))
+
+
+def as_snapshot(ticker):
+    """Accepts a ticker symbol or a TickerSnapshot and returns a TickerSnapshot."""
+    return ticker if isinstance(ticker, TickerSnapshot) else TickerSnapshot(ticker)
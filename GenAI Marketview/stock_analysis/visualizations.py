@@ -2,12 +2,63 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
-from datetime import datetime
+from plotly.subplots import make_subplots
+from config import CHART_MAX_POINTS, CHART_MAX_BARS
+from rolling import rolling_mean, rolling_std, rsi_series
 
-def create_price_trend_chart(price_trend_data, ticker):
-    price_df = pd.DataFrame(list(price_trend_data["5_year_closing_prices"].items()), columns=["Date", "Price"])
-    price_df["Date"] = pd.to_datetime(price_df["Date"], utc=True)
-    fig = px.line(price_df, x="Date", y="Price", title=f"{ticker} 5-Year Price Trend")
+def lttb_indices(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: indices of threshold points that preserve the line's visual shape."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    indices = np.empty(threshold, dtype=int)
+    indices[0], indices[-1] = 0, n - 1
+    selected = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+        areas = np.abs((x[selected] - avg_x) * (y[start:end] - y[selected]) - (x[selected] - x[start:end]) * (avg_y - y[selected]))
+        selected = start + int(np.argmax(areas)) if len(areas) else start
+        indices[i + 1] = selected
+    return indices
+
+def ohlc_buckets(chart_data, max_bars=CHART_MAX_BARS):
+    """Aggregates OHLCV bars into at most max_bars buckets (first open, max high, min low, last close, summed volume)."""
+    n = len(chart_data["dates"])
+    if n <= max_bars:
+        return chart_data
+    starts = np.unique(np.linspace(0, n, max_bars + 1).astype(int)[:-1])
+    ends = np.append(starts[1:], n) - 1
+    return {
+        "dates": chart_data["dates"][starts],
+        "open": chart_data["open"][starts],
+        "high": np.maximum.reduceat(chart_data["high"], starts),
+        "low": np.minimum.reduceat(chart_data["low"], starts),
+        "close": chart_data["close"][ends],
+        "volume": np.add.reduceat(chart_data["volume"], starts)
+    }
+
+def _line_points(dates, values, max_points):
+    indices = lttb_indices(dates.astype("int64").astype(float), values, max_points)
+    return dates[indices], values[indices]
+
+def create_price_trend_chart(chart_data, ticker, max_points=CHART_MAX_POINTS):
+    dates, close = _line_points(chart_data["dates"], chart_data["close"], max_points)
+    fig = go.Figure(go.Scattergl(x=dates, y=close, mode="lines", name="Close"))
+    fig.update_layout(title=f"{ticker} 5-Year Price Trend", xaxis_title="Date", yaxis_title="Price")
+    return fig
+
+def create_multi_ticker_chart(series, title="Relative Performance", max_points=CHART_MAX_POINTS):
+    """Overlays several tickers' closes rebased to 100; series maps ticker to (dates, close) arrays."""
+    fig = go.Figure()
+    for ticker, (dates, close) in series.items():
+        if not len(close):
+            continue
+        dates, close = _line_points(dates, close / close[0] * 100, max_points)
+        fig.add_trace(go.Scattergl(x=dates, y=close, mode="lines", name=ticker))
+    fig.update_layout(title=title, yaxis_title="Rebased to 100")
     return fig
 
 def create_benchmark_chart(benchmark_data, ticker):
@@ -18,37 +69,54 @@ def create_benchmark_chart(benchmark_data, ticker):
     fig.update_layout(title=f"{ticker} Returns vs Benchmarks", barmode="group")
     return fig
 
+def create_dcf_heatmap(dcf_data, ticker):
+    """Intrinsic value per share over discount rate x growth rate, from the report's DCF sensitivity grid."""
+    fig = go.Figure(go.Heatmap(
+        z=dcf_data["heatmap"],
+        x=[f"{rate:.0%}" for rate in dcf_data["growth_rates"]],
+        y=[f"{rate:.0%}" for rate in dcf_data["discount_rates"]],
+        colorscale="RdYlGn",
+        colorbar=dict(title="Value/Share"),
+        hovertemplate="Discount %{y}, growth %{x}: %{z:.2f}<extra></extra>"
+    ))
+    fig.update_layout(
+        title=f"{ticker} DCF Sensitivity ({dcf_data['heatmap_years']}-year horizon, {dcf_data['heatmap_terminal_growth_rate']:.0%} terminal growth)",
+        xaxis_title="Growth Rate", yaxis_title="Discount Rate"
+    )
+    return fig
+
 def create_eps_chart(eps_data, ticker):
     eps_df = pd.DataFrame(eps_data)
     eps_df["eps"] = eps_df["eps"].apply(lambda x: f"{x:.2f}" if pd.notna(x) else None)
     fig = px.bar(eps_df, x="date", y="eps", title=f"{ticker} Quarterly EPS (5 Years)")
     return fig
 
-def create_candlestick_chart(price_data, price_levels_data, ticker):
-    dates_6m = pd.date_range(start="2024-12-06", end="2025-06-05", freq="D")
-    close = np.cumsum(np.random.normal(0.1, 0.5, len(dates_6m))) + 100
-    close = close * (price_data.get("current_price", 100) / close[-1])
-    open_p = close + np.random.normal(0, 0.2, len(dates_6m))
-    high = np.maximum(open_p, close) + np.random.uniform(0, 0.5, len(dates_6m))
-    low = np.minimum(open_p, close) - np.random.uniform(0, 0.5, len(dates_6m))
-    volume = np.random.randint(1000000, 5000000, len(dates_6m))
-    rsi = np.random.uniform(60, 80, len(dates_6m))
-    candle_df = pd.DataFrame({
-        "Date": dates_6m,
-        "Open": open_p,
-        "High": high,
-        "Low": low,
-        "Close": close,
-        "Volume": volume,
-        "RSI": rsi
-    })
-    support = price_levels_data["Support"][0] if price_levels_data.get("Support") else 100
-    resistance = price_levels_data["Resistance"][0] if price_levels_data.get("Resistance") else 150
-    fig = go.Figure(data=[
-        go.Candlestick(x=candle_df["Date"], open=candle_df["Open"], high=candle_df["High"],
-                       low=candle_df["Low"], close=candle_df["Close"], name="Price"),
-        go.Scatter(x=candle_df["Date"], y=[resistance]*len(dates_6m), mode="lines", name="Resistance", line=dict(dash="dash")),
-        go.Scatter(x=candle_df["Date"], y=[support]*len(dates_6m), mode="lines", name="Support", line=dict(dash="dash"))
-    ])
-    fig.update_layout(title=f"{ticker} 6-Month Candlestick Chart with Support/Resistance")
-    return fig
\ No newline at end of file
+def create_candlestick_chart(chart_data, price_levels_data, ticker, days=126, max_bars=CHART_MAX_BARS):
+    """Candlesticks with Bollinger Bands, volume and RSI for the last `days` bars, built from fetched OHLCV arrays."""
+    # Indicators need the bars before the window, so they are computed on the full series first
+    close = chart_data["close"]
+    middle = rolling_mean(close, 20)
+    band = 2 * rolling_std(close, 20)
+    rsi = rsi_series(close)
+    window = slice(max(len(close) - days, 0), None)
+    bars = ohlc_buckets({name: values[window] for name, values in chart_data.items()}, max_bars)
+    dates = chart_data["dates"][window]
+
+    fig = make_subplots(rows=3, cols=1, shared_xaxes=True, vertical_spacing=0.03, row_heights=[0.6, 0.2, 0.2])
+    fig.add_trace(go.Candlestick(x=bars["dates"], open=bars["open"], high=bars["high"], low=bars["low"], close=bars["close"], name="Price"), row=1, col=1)
+    fig.add_trace(go.Scattergl(x=dates, y=middle[window] + band[window], mode="lines", name="Upper Band", line=dict(width=1)), row=1, col=1)
+    fig.add_trace(go.Scattergl(x=dates, y=middle[window], mode="lines", name="20-day SMA", line=dict(width=1)), row=1, col=1)
+    fig.add_trace(go.Scattergl(x=dates, y=middle[window] - band[window], mode="lines", name="Lower Band", line=dict(width=1)), row=1, col=1)
+    if price_levels_data.get("Resistance"):
+        fig.add_hline(y=price_levels_data["Resistance"][0], line_dash="dash", annotation_text="Resistance", row=1, col=1)
+    if price_levels_data.get("Support"):
+        fig.add_hline(y=price_levels_data["Support"][0], line_dash="dash", annotation_text="Support", row=1, col=1)
+    fig.add_trace(go.Bar(x=bars["dates"], y=bars["volume"], name="Volume"), row=2, col=1)
+    fig.add_trace(go.Scattergl(x=dates, y=rsi[window], mode="lines", name="RSI (14)"), row=3, col=1)
+    fig.add_hline(y=70, line_dash="dot", row=3, col=1)
+    fig.add_hline(y=30, line_dash="dot", row=3, col=1)
+    fig.update_layout(title=f"{ticker} 6-Month Candlestick Chart with Support/Resistance", xaxis_rangeslider_visible=False)
+    fig.update_yaxes(title_text="Price", row=1, col=1)
+    fig.update_yaxes(title_text="Volume", row=2, col=1)
+    fig.update_yaxes(title_text="RSI", range=[0, 100], row=3, col=1)
+    return fig
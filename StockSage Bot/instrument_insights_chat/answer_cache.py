@@ -0,0 +1,223 @@
+import re
+import time
+import hashlib
+import random
+import threading
+import json
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional
+from config import (
+    ANSWER_CACHE_TTL_SECONDS, ANSWER_CACHE_SIMILARITY, ANSWER_CACHE_MAX_ENTRIES, WATERMARK_CHECK_SECONDS
+)
+
+NUM_PERM = 64  # MinHash signature length
+BANDS = 16  # LSH bands; NUM_PERM / BANDS rows per band
+SHINGLE_SIZE = 4  # Character shingles over the normalized question
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(1234)  # Fixed seed so signatures are stable across processes
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(NUM_PERM)]
+
+STOPWORDS = {
+    "a", "an", "the", "what", "whats", "is", "are", "was", "were", "can", "could", "you", "please", "me",
+    "tell", "give", "show", "of", "for", "about", "on", "in", "to", "and", "do", "does", "i", "would", "like",
+}
+with open(Path(__file__).resolve().parent.parent / "mcp_server" / "meta_data.json", "r") as f:
+    _SYMBOLS = {s for table in json.load(f)["tables"].values() for s in table.get("categorical_values", {}).get("symbol", [])}
+# Symbols that are also everyday words count as tickers only when written in capitals
+_WORD_SYMBOLS = {"A", "O", "T", "F", "V", "DE", "MA", "MS", "GE", "CAT", "LOW", "NOW", "HD", "CI", "EW", "TM"}
+# Common company names (lowercase words; a standalone "&" is not a word) of the symbols in meta_data.json, resolved to the symbol
+COMPANY_NAMES = {
+    "american airlines": "AAL", "apple": "AAPL", "abbvie": "ABBV", "adobe": "ADBE", "amgen": "AMGN", "amazon": "AMZN",
+    "american express": "AXP", "amex": "AXP", "boeing": "BA", "bank of america": "BAC", "best buy": "BBY",
+    "becton dickinson": "BDX", "biogen": "BIIB", "blackrock": "BLK", "bristol myers": "BMY", "bristol-myers": "BMY",
+    "caterpillar": "CAT", "crown castle": "CCI", "cigna": "CI", "comcast": "CMCSA", "conocophillips": "COP",
+    "costco": "COST", "salesforce": "CRM", "cisco": "CSCO", "chevron": "CVX", "delta": "DAL", "deere": "DE",
+    "john deere": "DE", "dollar general": "DG", "disney": "DIS", "eog": "EOG", "edwards lifesciences": "EW",
+    "ford": "F", "fedex": "FDX", "general electric": "GE", "gilead": "GILD", "general motors": "GM",
+    "alphabet": "GOOGL", "google": "GOOGL", "goldman sachs": "GS", "goldman": "GS", "halliburton": "HAL",
+    "home depot": "HD", "honda": "HMC", "honeywell": "HON", "intel": "INTC", "intuitive surgical": "ISRG",
+    "johnson johnson": "JNJ", "johnson and johnson": "JNJ", "jpmorgan": "JPM", "jp morgan": "JPM",
+    "kinder morgan": "KMI", "coca-cola": "KO", "coca cola": "KO", "coke": "KO", "lucid": "LCID",
+    "eli lilly": "LLY", "lilly": "LLY", "lockheed martin": "LMT", "lockheed": "LMT", "lowe's": "LOW", "lowes": "LOW",
+    "lululemon": "LULU", "mastercard": "MA", "mcdonald's": "MCD", "mcdonalds": "MCD", "medtronic": "MDT",
+    "meta": "META", "facebook": "META", "3m": "MMM", "merck": "MRK", "morgan stanley": "MS", "microsoft": "MSFT",
+    "netflix": "NFLX", "nio": "NIO", "nike": "NKE", "servicenow": "NOW", "nvidia": "NVDA", "realty income": "O",
+    "oracle": "ORCL", "occidental": "OXY", "pepsico": "PEP", "pepsi": "PEP", "pfizer": "PFE",
+    "procter gamble": "PG", "procter and gamble": "PG", "prologis": "PLD", "public storage": "PSA",
+    "phillips 66": "PSX", "qualcomm": "QCOM", "regeneron": "REGN", "rivian": "RIVN", "ross stores": "ROST",
+    "raytheon": "RTX", "rtx": "RTX", "starbucks": "SBUX", "schwab": "SCHW", "schlumberger": "SLB",
+    "simon property": "SPG", "s&p global": "SPGI", "stryker": "SYK", "at&t": "T", "target": "TGT", "tjx": "TJX",
+    "toyota": "TM", "tesla": "TSLA", "texas instruments": "TXN", "united airlines": "UAL",
+    "unitedhealth": "UNH", "ups": "UPS", "visa": "V", "valero": "VLO", "vertex": "VRTX", "verizon": "VZ",
+}
+# Names that are also everyday words count only when capitalised ('target price' is not Target)
+_WORD_NAMES = {"target", "delta", "visa", "meta", "vertex", "lucid", "coke"}
+_MAX_NAME_WORDS = max(len(name.split()) for name in COMPANY_NAMES)
+
+
+def normalize_question(question: str) -> str:
+    """Lowercases, strips punctuation and drops filler words."""
+    words = re.sub(r"[^a-z0-9\-\s]", " ", question.lower()).split()
+    return " ".join(w for w in words if w not in STOPWORDS)
+
+
+def extract_entities(question: str) -> frozenset:
+    """
+    Tickers, company names, dates and numbers that must match exactly between two cached questions.
+    Tickers and company names are matched in any case (and anywhere, including the first word) against
+    the symbols in meta_data.json; company names resolve to their symbol, so 'Apple' and 'aapl' agree.
+    """
+    entities = set(re.findall(r"\b\d{4}-\d{2}-\d{2}\b", question))
+    entities.update(re.findall(r"\b\d+(?:\.\d+)?\b", re.sub(r"\b\d{4}-\d{2}-\d{2}\b", " ", question)))
+    tokens = re.findall(r"[A-Za-z0-9][A-Za-z0-9&'\-]*", question)
+    for token in tokens:
+        symbol = token.upper()
+        if symbol in _SYMBOLS and (token.isupper() or symbol not in _WORD_SYMBOLS):
+            entities.add(symbol)
+    words = [token.lower() for token in tokens]
+    for size in range(1, _MAX_NAME_WORDS + 1):
+        for i in range(len(words) - size + 1):
+            name = " ".join(words[i:i + size])
+            if name in COMPANY_NAMES and (name not in _WORD_NAMES or tokens[i][0].isupper()):
+                entities.add(COMPANY_NAMES[name])
+    return frozenset(entities)
+
+
+def minhash_signature(text: str) -> tuple:
+    padded = f" {text} "
+    shingles = {padded[i:i + SHINGLE_SIZE] for i in range(max(len(padded) - SHINGLE_SIZE + 1, 1))}
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "big") for s in shingles]
+    return tuple(min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def estimate_similarity(sig_a: tuple, sig_b: tuple) -> float:
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+class AnswerCache:
+    """
+    Process-wide cache of final answers keyed by a normalized question fingerprint.
+
+    Near-duplicate questions are found with MinHash over character shingles and LSH banding, then
+    confirmed by an exact match on the extracted entities so 'AAPL vs MSFT' never answers 'AAPL vs GOOGL'.
+    Entries expire after a TTL or when the MCP data watermark advances.
+    """
+
+    def __init__(self, ttl: float = ANSWER_CACHE_TTL_SECONDS, threshold: float = ANSWER_CACHE_SIMILARITY,
+                 max_entries: int = ANSWER_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self.watermark = None
+        self.watermark_checked_at = 0.0
+        self.lookups = 0
+        self.hits = 0
+        self.latency_saved = 0.0
+
+    def _band_keys(self, signature: tuple) -> List[tuple]:
+        rows = NUM_PERM // BANDS
+        return [(band, signature[band * rows:(band + 1) * rows]) for band in range(BANDS)]
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        for key in self._band_keys(entry["signature"]):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def watermark_is_fresh(self) -> bool:
+        return self.watermark is not None and time.time() - self.watermark_checked_at < WATERMARK_CHECK_SECONDS
+
+    def set_watermark(self, watermark: str):
+        """Records the current data watermark; entries computed against an older one are dropped."""
+        with self._lock:
+            if watermark != self.watermark:
+                for entry_id in [i for i, e in self._entries.items() if e["watermark"] != watermark]:
+                    self._remove(entry_id)
+            self.watermark = watermark
+            self.watermark_checked_at = time.time()
+
+    def get(self, question: str) -> Optional[List[dict]]:
+        """Returns the cached assistant messages for a near-duplicate question, or None."""
+        normalized = normalize_question(question)
+        signature = minhash_signature(normalized)
+        entities = extract_entities(question)
+        now = time.time()
+        with self._lock:
+            self.lookups += 1
+            candidates = set()
+            for key in self._band_keys(signature):
+                candidates.update(self._buckets.get(key, ()))
+            best, best_score = None, self.threshold
+            for entry_id in candidates:
+                entry = self._entries[entry_id]
+                if now - entry["created_at"] > self.ttl:
+                    self._remove(entry_id)
+                    continue
+                if entry["entities"] != entities or entry["watermark"] != self.watermark:
+                    continue
+                # Without entities to compare, a differing word may be an unrecognised company; only exact wording hits
+                if (not entities or not entry["entities"]) and set(entry["normalized"].split()) != set(normalized.split()):
+                    continue
+                score = 1.0 if entry["normalized"] == normalized else estimate_similarity(signature, entry["signature"])
+                if score >= best_score:
+                    best, best_score = entry_id, score
+            if best is None:
+                self._log("miss", question)
+                return None
+            entry = self._entries[best]
+            self._entries.move_to_end(best)
+            entry["hits"] += 1
+            self.hits += 1
+            self.latency_saved += entry["latency"]
+            self._log(f"hit (similarity {best_score:.2f})", question)
+            return entry["messages"]
+
+    def put(self, question: str, messages: List[dict], latency: float):
+        normalized = normalize_question(question)
+        signature = minhash_signature(normalized)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = {
+                "question": question,
+                "normalized": normalized,
+                "signature": signature,
+                "entities": extract_entities(question),
+                "messages": messages,
+                "latency": latency,
+                "watermark": self.watermark,
+                "created_at": time.time(),
+                "hits": 0,
+            }
+            for key in self._band_keys(signature):
+                self._buckets.setdefault(key, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.lookups, 3) if self.lookups else 0.0,
+            "latency_saved_seconds": round(self.latency_saved, 2),
+        }
+
+    def _log(self, outcome: str, question: str):
+        stats = self.stats()
+        print(f"Answer cache {outcome} for {question!r}: hit rate {stats['hit_rate']:.1%} "
+              f"({stats['hits']}/{stats['lookups']}), {stats['latency_saved_seconds']}s saved")
+
+
+# Process-wide cache shared by all chat sessions
+answer_cache = AnswerCache()
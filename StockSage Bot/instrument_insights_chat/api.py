@@ -0,0 +1,188 @@
+import asyncio
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import List, Optional
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from starlette.background import BackgroundTask
+from session import run_session
+from context_window import ConversationContext
+from answer_cache import answer_cache
+from config import API_HOST, API_PORT, API_WORKER_THREADS, API_CORS_ORIGINS, SESSION_IDLE_SECONDS
+
+
+class ChatState:
+    """Server-side state of one chat: its history, context window and tool error status."""
+
+    def __init__(self):
+        self.messages = []
+        self.context = ConversationContext()
+        self.tool_error = False
+        self.failed_tool = None
+        self.lock = asyncio.Lock()  # One turn at a time per chat
+        self.last_active = time.time()
+        self.connections = 0  # Open WebSockets; a connected chat is never expired
+
+
+class ChatRequest(BaseModel):
+    text: str = ""
+    retry_tool: Optional[str] = None
+
+
+class NewSession(BaseModel):
+    messages: List[dict] = []  # History to resume from, e.g. after the server restarted
+
+
+chats = {}
+
+
+def expire_idle_chats():
+    now = time.time()
+    for chat_id in [cid for cid, chat in chats.items() if now - chat.last_active > SESSION_IDLE_SECONDS and not chat.lock.locked() and not chat.connections]:
+        del chats[chat_id]
+
+
+def get_chat(chat_id: str) -> ChatState:
+    chat = chats.get(chat_id)
+    if chat is None:
+        raise HTTPException(status_code=404, detail=f"Chat session {chat_id} not found")
+    chat.last_active = time.time()
+    return chat
+
+
+async def run_turn(chat: ChatState, request: ChatRequest):
+    """Runs one chat turn, yielding events with each streamed message."""
+    if request.text:
+        chat.messages.append({"role": "user", "content": [{"text": request.text}]})
+    async for message, updated_messages, tool_error, failed_tool in run_session(
+        request.text, chat.messages, retry_tool=request.retry_tool, context=chat.context
+    ):
+        chat.messages = updated_messages
+        chat.tool_error = tool_error
+        chat.failed_tool = failed_tool
+        # The caller already has its own user message
+        if message.get("role") == "user" and request.text:
+            continue
+        yield {"message": message, "tool_error": tool_error, "failed_tool": failed_tool}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Bedrock calls run in threads; the default executor is too small for hundreds of chats
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=API_WORKER_THREADS))
+    yield
+
+
+app = FastAPI(title="StockSage Chat API", lifespan=lifespan)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=API_CORS_ORIGINS,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+
+@app.post("/sessions")
+async def create_session(request: Optional[NewSession] = None):
+    expire_idle_chats()
+    chat_id = uuid.uuid4().hex
+    chats[chat_id] = ChatState()
+    if request is not None:
+        chats[chat_id].messages = list(request.messages)
+    return {"session_id": chat_id}
+
+
+@app.get("/sessions/{chat_id}")
+async def get_session(chat_id: str):
+    chat = get_chat(chat_id)
+    return {"messages": chat.messages, "tool_error": chat.tool_error, "failed_tool": chat.failed_tool}
+
+
+@app.delete("/sessions/{chat_id}")
+async def delete_session(chat_id: str):
+    get_chat(chat_id)
+    del chats[chat_id]
+    return {"deleted": chat_id}
+
+
+@app.post("/sessions/{chat_id}/messages")
+async def post_message(chat_id: str, request: ChatRequest):
+    """Runs a chat turn and streams each message back as a server-sent event."""
+    chat = get_chat(chat_id)
+    if chat.lock.locked():
+        raise HTTPException(status_code=409, detail="A response is already being generated for this session")
+    # Taken before responding (an uncontended acquire does not yield), so a second POST gets the 409 above
+    await chat.lock.acquire()
+    released = False
+
+    def release():
+        nonlocal released
+        if not released:
+            released = True
+            chat.last_active = time.time()
+            chat.lock.release()
+
+    async def event_stream():
+        try:
+            async for event in run_turn(chat, request):
+                yield f"event: message\ndata: {json.dumps(event, default=str)}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+        finally:
+            release()
+
+    # The background task frees the chat if the client disconnects before the stream starts
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"},
+                             background=BackgroundTask(release))
+
+
+@app.websocket("/sessions/{chat_id}/ws")
+async def chat_websocket(websocket: WebSocket, chat_id: str):
+    """Bidirectional chat: each received {"text", "retry_tool"} runs a turn streamed back as JSON events."""
+    await websocket.accept()
+    chat = chats.get(chat_id)
+    if chat is None:
+        await websocket.close(code=4404, reason=f"Chat session {chat_id} not found")
+        return
+    chat.connections += 1
+    chat.last_active = time.time()
+    try:
+        while True:
+            try:
+                frame = await websocket.receive_text()
+                chat.last_active = time.time()
+                request = ChatRequest.model_validate_json(frame)
+            except (ValueError, ValidationError) as e:
+                await websocket.send_json({"type": "error", "error": f"Invalid message: {e}"})
+                continue
+            async with chat.lock:
+                chat.last_active = time.time()
+                try:
+                    async for event in run_turn(chat, request):
+                        await websocket.send_json({"type": "message", **json.loads(json.dumps(event, default=str))})
+                    await websocket.send_json({"type": "done"})
+                except WebSocketDisconnect:
+                    raise
+                except Exception as e:
+                    await websocket.send_json({"type": "error", "error": str(e)})
+    except WebSocketDisconnect:
+        print(f"WebSocket closed for session {chat_id}")
+    finally:
+        chat.connections -= 1
+        chat.last_active = time.time()
+
+
+@app.get("/stats")
+async def stats():
+    return {"active_sessions": len(chats), "answer_cache": answer_cache.stats()}
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host=API_HOST, port=API_PORT)
@@ -0,0 +1,66 @@
+import json
+import aiohttp
+from typing import AsyncGenerator, List, Tuple
+
+
+def replay_history(messages: List[dict]) -> List[dict]:
+    """
+    The user and assistant text turns of a displayed chat, in a form the server can resume from. Display-only
+    chunks (e.g. {"toolResult": <str>}) are not valid model content and are dropped, and consecutive turns of
+    the same role are merged so roles alternate, as Bedrock requires.
+    """
+    history = []
+    for message in messages:
+        texts = [{"text": part["text"]} for part in message.get("content", []) if part.get("text")]
+        if not texts or message.get("role") not in ("user", "assistant"):
+            continue
+        if history and history[-1]["role"] == message["role"]:
+            history[-1]["content"].extend(texts)
+        elif history or message["role"] == "user":
+            history.append({"role": message["role"], "content": texts})
+    return history
+
+
+class RemoteChat:
+    """Thin client for the chat API; run_session mirrors session.run_session so the UI can use either."""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+        self.session_id = None
+
+    async def _ensure_session(self, http: aiohttp.ClientSession, history: List[dict]):
+        if self.session_id is None:
+            async with http.post(f"{self.base_url}/sessions", json={"messages": history}) as resp:
+                resp.raise_for_status()
+                self.session_id = (await resp.json())["session_id"]
+
+    async def run_session(self, user_input: str, messages: List[dict], retry_tool: str = None) -> AsyncGenerator[Tuple[dict, List[dict], bool, str], None]:
+        """Sends a turn to the chat API and yields streamed messages as they arrive."""
+        timeout = aiohttp.ClientTimeout(total=None, sock_read=300)
+        async with aiohttp.ClientSession(timeout=timeout) as http:
+            # The caller has already appended this turn's user message, which the server adds itself
+            history = replay_history(messages[:-1] if user_input else messages)
+            await self._ensure_session(http, history)
+            payload = {"text": user_input, "retry_tool": retry_tool}
+            resp = await http.post(f"{self.base_url}/sessions/{self.session_id}/messages", json=payload)
+            if resp.status == 404:
+                # The server restarted or dropped the idle session: recreate it with this chat's history and resend
+                resp.release()
+                self.session_id = None
+                await self._ensure_session(http, history)
+                resp = await http.post(f"{self.base_url}/sessions/{self.session_id}/messages", json=payload)
+            async with resp:
+                resp.raise_for_status()
+                event = None
+                async for raw_line in resp.content:
+                    line = raw_line.decode().rstrip("\n")
+                    if line.startswith("event: "):
+                        event = line[len("event: "):]
+                    elif line.startswith("data: "):
+                        data = json.loads(line[len("data: "):])
+                        if event == "message":
+                            message = data["message"]
+                            messages.append(message)
+                            yield message, messages, data["tool_error"], data["failed_tool"]
+                        elif event == "error":
+                            raise RuntimeError(f"Chat API error: {data['error']}")
@@ -1,7 +1,10 @@
 import streamlit as st
 import json
+from functools import partial
 from session import run_session
+from context_window import ConversationContext
 from utils import safe_async_run
+from config import STOCKSAGE_API_URL
 
 # Streamlit page configuration
 st.set_page_config(page_title="StockSage", layout="wide")
@@ -17,6 +20,17 @@ if "user_message_displayed" not in st.session_state:
     st.session_state.user_message_displayed = False
 if "chat_started" not in st.session_state:
     st.session_state.chat_started = False
+if "context" not in st.session_state:
+    st.session_state.context = ConversationContext()
+
+# Run chats in-process, or through the chat API when one is configured
+if STOCKSAGE_API_URL:
+    from api_client import RemoteChat
+    if "remote_chat" not in st.session_state:
+        st.session_state.remote_chat = RemoteChat(STOCKSAGE_API_URL)
+    run_chat = st.session_state.remote_chat.run_session
+else:
+    run_chat = partial(run_session, context=st.session_state.context)
 
 # CSS styles (unchanged)
 st.markdown("""
@@ -189,7 +203,7 @@ if st.session_state.tool_error and st.session_state.failed_tool:
         if st.button(f"Retry {st.session_state.failed_tool}"):
             st.session_state.user_message_displayed = False
             async def stream_retry():
-                async for message, updated_messages, tool_error, failed_tool in run_session(
+                async for message, updated_messages, tool_error, failed_tool in run_chat(
                     "", st.session_state.messages, retry_tool=st.session_state.failed_tool
                 ):
                     if message.get("role") == "user" and st.session_state.user_message_displayed:
@@ -215,7 +229,7 @@ if user_input:
     st.session_state.user_message_displayed = True
 
     async def stream_response():
-        async for message, updated_messages, tool_error, failed_tool in run_session(
+        async for message, updated_messages, tool_error, failed_tool in run_chat(
             user_input, st.session_state.messages
         ):
             if message.get("role") == "user" and st.session_state.user_message_displayed:
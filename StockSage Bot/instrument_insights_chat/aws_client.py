@@ -1,5 +1,6 @@
 import boto3
-from config import AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY
+from botocore.config import Config
+from config import AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, API_WORKER_THREADS
 
 # Initializing AWS Bedrock client
 bedrock = boto3.client(
@@ -7,4 +8,6 @@ bedrock = boto3.client(
     region_name="us-east-1",
     aws_access_key_id=AWS_ACCESS_KEY_ID,
     aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-)
\ No newline at end of file
+    # One pooled connection per worker thread so concurrent chats don't queue on the client
+    config=Config(max_pool_connections=API_WORKER_THREADS),
+)
@@ -0,0 +1,213 @@
+import json
+import uuid
+import threading
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+from config import TOOL_RESULT_TOKEN_BUDGET, TOOL_RESULT_PREVIEW_ROWS, TOOL_RESULT_STORE_SIZE
+from utils import estimate_tokens
+
+PAGE_TOOL_NAME = "page_tool_result"
+
+# Local tool that lets the model page through results that were summarized
+PAGE_TOOL_SPEC = {
+    "toolSpec": {
+        "name": PAGE_TOOL_NAME,
+        "description": (
+            "Page through the full payload of a large tool result that was summarized. "
+            "Use the result_id from the summary. For tables, offset and limit are row positions; "
+            "for text results they are chunk positions."
+        ),
+        "inputSchema": {
+            "json": {
+                "type": "object",
+                "properties": {
+                    "result_id": {"type": "string", "description": "The result_id given in the summarized tool result."},
+                    "offset": {"type": "integer", "description": "Index of the first row or chunk to return.", "default": 0},
+                    "limit": {"type": "integer", "description": "Maximum number of rows or chunks to return.", "default": 50},
+                },
+                "required": ["result_id"],
+            }
+        },
+    }
+}
+
+
+class ResultStore:
+    """Thread-safe LRU store holding full tool payloads so the model can page through them."""
+
+    def __init__(self, max_entries: int = TOOL_RESULT_STORE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, kind: str, items: List[Any]) -> str:
+        result_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._entries[result_id] = (kind, items)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result_id
+
+    def get(self, result_id: str) -> Optional[Tuple[str, List[Any]]]:
+        with self._lock:
+            entry = self._entries.get(result_id)
+            if entry is not None:
+                self._entries.move_to_end(result_id)
+            return entry
+
+
+# Process-wide store shared by all chat sessions
+result_store = ResultStore()
+
+
+def extract_payload(tool_response) -> str:
+    """Extracts the text payload from an MCP CallToolResult, dropping the result metadata."""
+    content = getattr(tool_response, "content", None)
+    if content is None:
+        return str(tool_response)
+    return "\n".join(part.text for part in content if getattr(part, "text", None) is not None)
+
+
+def _column_type(values: List[Any]) -> str:
+    non_null = [v for v in values if v is not None]
+    if not non_null:
+        return "null"
+    if all(isinstance(v, bool) for v in non_null):
+        return "boolean"
+    if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in non_null):
+        return "number"
+    if all(isinstance(v, str) for v in non_null):
+        return "string"
+    return "mixed"
+
+
+def _column_stats(values: List[Any], col_type: str) -> dict:
+    non_null = [v for v in values if v is not None]
+    stats = {"type": col_type, "nulls": len(values) - len(non_null)}
+    if col_type == "number" and non_null:
+        stats.update({
+            "min": min(non_null),
+            "max": max(non_null),
+            "mean": round(sum(non_null) / len(non_null), 4),
+        })
+    elif col_type == "string" and non_null:
+        distinct = set(non_null)
+        stats["distinct"] = len(distinct)
+        if len(distinct) <= 10:
+            stats["values"] = sorted(distinct)
+        else:
+            # ISO dates and other sortable strings still give a useful range
+            stats["min"] = min(non_null)
+            stats["max"] = max(non_null)
+    return stats
+
+
+def summarize_records(records: List[dict], result_id: str, preview_rows: int = TOOL_RESULT_PREVIEW_ROWS) -> dict:
+    """Summarizes a list of row dicts into schema, row count, head/tail rows and per-column stats."""
+    columns = []
+    for row in records:
+        for col in row:
+            if col not in columns:
+                columns.append(col)
+    schema = {}
+    for col in columns:
+        values = [row.get(col) for row in records]
+        schema[col] = _column_stats(values, _column_type(values))
+    return {
+        "summarized": True,
+        "result_id": result_id,
+        "row_count": len(records),
+        "columns": schema,
+        "head": records[:preview_rows],
+        "tail": records[-preview_rows:] if 0 < preview_rows < len(records) else [],
+        "note": f"Result too large to return in full. Call {PAGE_TOOL_NAME} with this result_id to read rows.",
+    }
+
+
+def summarize_values(values: List[Any], result_id: str, preview_rows: int = TOOL_RESULT_PREVIEW_ROWS) -> dict:
+    """Summarizes a list of scalars into count, head/tail values and their stats."""
+    return {
+        "summarized": True,
+        "result_id": result_id,
+        "row_count": len(values),
+        "columns": {"value": _column_stats(values, _column_type(values))},
+        "head": values[:preview_rows],
+        "tail": values[-preview_rows:] if 0 < preview_rows < len(values) else [],
+        "note": f"Result too large to return in full. Call {PAGE_TOOL_NAME} with this result_id to read rows.",
+    }
+
+
+def _chunk_text(text: str, chunk_chars: int) -> List[str]:
+    return [text[i:i + chunk_chars] for i in range(0, len(text), chunk_chars)] or [""]
+
+
+def compact_tool_result(tool_response, token_budget: int = TOOL_RESULT_TOKEN_BUDGET) -> str:
+    """Returns the tool payload as text, summarizing it into the token budget when it is too large."""
+    text = extract_payload(tool_response)
+    if estimate_tokens(text) <= token_budget:
+        return text
+
+    try:
+        payload = json.loads(text)
+    except (json.JSONDecodeError, TypeError):
+        payload = None
+
+    if isinstance(payload, list) and payload:
+        result_id = result_store.put("rows", payload)
+        summarize = summarize_records if all(isinstance(row, dict) for row in payload) else summarize_values
+        preview_rows = TOOL_RESULT_PREVIEW_ROWS
+        summary = summarize(payload, result_id, preview_rows)
+        # Shrink the head/tail preview until the summary itself fits the budget
+        while estimate_tokens(json.dumps(summary, default=str)) > token_budget and preview_rows > 0:
+            preview_rows -= 1
+            summary = summarize(payload, result_id, preview_rows)
+        return json.dumps(summary, default=str)
+
+    # Plain text or nested JSON: keep the first chunk and page the rest
+    chunk_chars = token_budget * 2
+    chunks = _chunk_text(text, chunk_chars)
+    result_id = result_store.put("chunks", chunks)
+    return json.dumps({
+        "summarized": True,
+        "result_id": result_id,
+        "chunk_count": len(chunks),
+        "first_chunk": chunks[0],
+        "note": f"Result too large to return in full. Call {PAGE_TOOL_NAME} with this result_id to read further chunks.",
+    })
+
+
+def page_result(tool_input: dict, token_budget: int = TOOL_RESULT_TOKEN_BUDGET) -> str:
+    """
+    Returns a page of a stored tool payload, trimmed to fit the token budget. tool_input is the model's
+    page_tool_result input; unknown or missing fields come back as an Error: string for the model to fix.
+    """
+    tool_input = tool_input or {}
+    properties = PAGE_TOOL_SPEC["toolSpec"]["inputSchema"]["json"]["properties"]
+    unknown = sorted(set(tool_input) - set(properties))
+    if unknown:
+        return f"Error: Unknown argument(s) {', '.join(unknown)}. {PAGE_TOOL_NAME} takes {', '.join(properties)}."
+    result_id = tool_input.get("result_id")
+    if not result_id:
+        return f"Error: {PAGE_TOOL_NAME} requires result_id from the summarized tool result."
+    try:
+        offset = max(int(tool_input.get("offset") or 0), 0)
+        limit = max(int(tool_input.get("limit", 50) or 1), 1)
+    except (TypeError, ValueError):
+        return "Error: offset and limit must be integers."
+    entry = result_store.get(result_id)
+    if entry is None:
+        return f"Error: Result {result_id} not found or expired. Re-run the original data retrieval."
+    kind, items = entry
+    page = items[offset:offset + limit]
+    while True:
+        response = json.dumps({
+            "result_id": result_id,
+            "offset": offset,
+            "returned": len(page),
+            "total": len(items),
+            "next_offset": offset + len(page) if offset + len(page) < len(items) else None,
+            kind: page,
+        }, default=str)
+        if estimate_tokens(response) <= token_budget or len(page) <= 1:
+            return response
+        page = page[:max(len(page) // 2, 1)]
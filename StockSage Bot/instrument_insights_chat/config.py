@@ -8,4 +8,34 @@ load_dotenv(dotenv_path)
 
 # AWS configuration
 AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
-AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
\ No newline at end of file
+AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
+
+# Tool result compaction
+TOOL_RESULT_TOKEN_BUDGET = int(os.getenv("TOOL_RESULT_TOKEN_BUDGET", "2000"))  # Max tokens per tool result sent to the LLM
+TOOL_RESULT_PREVIEW_ROWS = int(os.getenv("TOOL_RESULT_PREVIEW_ROWS", "5"))  # Rows kept at head and tail of a summarized table
+TOOL_RESULT_STORE_SIZE = int(os.getenv("TOOL_RESULT_STORE_SIZE", "200"))  # Full payloads kept for paging
+
+# Conversation context window
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "12000"))  # Max tokens of chat history sent per request
+CONTEXT_SUMMARY_TOKENS = int(os.getenv("CONTEXT_SUMMARY_TOKENS", "400"))  # Max tokens of the rolling summary
+SUMMARY_MODEL_ID = os.getenv("SUMMARY_MODEL_ID", "us.anthropic.claude-3-5-haiku-20241022-v1:0")
+
+# Answer cache
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", "21600"))  # Cached answers expire after 6 hours
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.8"))  # Min estimated Jaccard similarity for a hit
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "500"))
+WATERMARK_CHECK_SECONDS = int(os.getenv("WATERMARK_CHECK_SECONDS", "300"))  # How often the MCP data watermark is re-read
+
+# Chat API service
+API_HOST = os.getenv("STOCKSAGE_API_HOST", "0.0.0.0")
+API_PORT = int(os.getenv("STOCKSAGE_API_PORT", "8001"))
+API_WORKER_THREADS = int(os.getenv("STOCKSAGE_API_WORKER_THREADS", "256"))  # Threads for blocking Bedrock calls
+API_CORS_ORIGINS = os.getenv("STOCKSAGE_API_CORS_ORIGINS", "http://localhost:5173").split(",")
+SESSION_IDLE_SECONDS = int(os.getenv("STOCKSAGE_SESSION_IDLE_SECONDS", "3600"))  # Idle chats are dropped after this
+STOCKSAGE_API_URL = os.getenv("STOCKSAGE_API_URL", "")  # When set, the Streamlit app talks to the chat API instead
+
+# LLM backend
+LLM_BACKEND = os.getenv("LLM_BACKEND", "bedrock")  # 'bedrock' or 'scripted' (offline stand-in for testing)
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))  # Retries for throttled LLM requests
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "1.0"))  # Seconds, doubled on each retry
@@ -0,0 +1,151 @@
+import json
+from typing import Callable, List, Optional, Tuple
+from aws_client import bedrock
+from config import CONTEXT_TOKEN_BUDGET, CONTEXT_SUMMARY_TOKENS, SUMMARY_MODEL_ID
+from utils import estimate_tokens
+
+
+def _is_tool_part(part: dict) -> bool:
+    return "toolUse" in part or "toolResult" in part
+
+
+def _normalize_content(content) -> List[dict]:
+    return [{"text": content}] if isinstance(content, str) else content
+
+
+def _is_user_query(msg: dict) -> bool:
+    content = _normalize_content(msg.get("content", []))
+    return msg.get("role") == "user" and any("text" in c for c in content) and not any(_is_tool_part(c) for c in content)
+
+
+def _turn_text(turn: List[dict]) -> str:
+    lines = []
+    for msg in turn:
+        for part in _normalize_content(msg["content"]):
+            if "text" in part:
+                lines.append(f"{msg['role']}: {part['text']}")
+    return "\n".join(lines)
+
+
+def extractive_summary(summary: str, turns_text: str, max_tokens: int = CONTEXT_SUMMARY_TOKENS) -> str:
+    """Cheap local fallback: appends the evicted turns to the summary and keeps the most recent part."""
+    combined = f"{summary}\n{turns_text}".strip() if summary else turns_text
+    max_chars = max_tokens * 4
+    return combined if len(combined) <= max_chars else "..." + combined[-max_chars:]
+
+
+def llm_summary(summary: str, turns_text: str, max_tokens: int = CONTEXT_SUMMARY_TOKENS) -> str:
+    """Folds newly evicted turns into the running summary with a small Bedrock call."""
+    prompt = (
+        "Update the running summary of a stock research conversation with the new turns below. "
+        "Keep tickers, dates, figures and conclusions the user may refer back to. "
+        f"Reply with the updated summary only, at most {max_tokens * 3 // 4} words.\n\n"
+        f"Current summary:\n{summary or '(empty)'}\n\nNew turns:\n{turns_text}"
+    )
+    try:
+        response = bedrock.converse(
+            modelId=SUMMARY_MODEL_ID,
+            messages=[{"role": "user", "content": [{"text": prompt}]}],
+            inferenceConfig={"maxTokens": max_tokens, "temperature": 0.0},
+        )
+        return response["output"]["message"]["content"][0]["text"].strip()
+    except Exception as e:
+        print(f"Summary generation failed, using extractive summary: {e}")
+        return extractive_summary(summary, turns_text, max_tokens)
+
+
+class ConversationContext:
+    """
+    Token-budgeted view of a chat history for the Bedrock API.
+
+    Token counts are computed once per message and cached, so each call only scans messages appended
+    since the previous one. Whole turns (a user query and everything after it) are evicted oldest first
+    when the history exceeds the budget and folded into a rolling summary, which keeps toolUse/toolResult
+    pairs together. Tool messages of completed turns are dropped, as only the final answers matter later.
+    """
+
+    def __init__(self, token_budget: int = CONTEXT_TOKEN_BUDGET, summary_tokens: int = CONTEXT_SUMMARY_TOKENS,
+                 summarizer: Optional[Callable[[str, str, int], str]] = None):
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.summarizer = summarizer or llm_summary
+        self.summary = ""
+        self._full_tokens = []  # Tokens per message, including tool parts
+        self._text_tokens = []  # Tokens per message with tool parts stripped
+        self._turn_starts = []  # Indexes of messages that open a turn
+        self._summarized_upto = 0  # Messages before this index are folded into the summary
+        self._history_id = None
+
+    def _count_new(self, messages: List[dict]):
+        if self._history_id != id(messages) or len(messages) < len(self._full_tokens):
+            # A different or truncated history: start over
+            self.reset()
+            self._history_id = id(messages)
+        for i in range(len(self._full_tokens), len(messages)):
+            msg = messages[i]
+            if _is_user_query(msg):
+                self._turn_starts.append(i)
+            content = _normalize_content(msg["content"])
+            self._full_tokens.append(estimate_tokens(json.dumps(content, default=str)))
+            text_parts = [c for c in content if not _is_tool_part(c)]
+            self._text_tokens.append(estimate_tokens(json.dumps(text_parts, default=str)) if text_parts else 0)
+
+    def reset(self):
+        self.summary = ""
+        self._full_tokens = []
+        self._text_tokens = []
+        self._turn_starts = []
+        self._summarized_upto = 0
+
+    def _turn_bounds(self, messages: List[dict]) -> List[Tuple[int, int]]:
+        starts = [i for i in self._turn_starts if i >= self._summarized_upto]
+        return [(start, end) for start, end in zip(starts, starts[1:] + [len(messages)])]
+
+    def build(self, messages: List[dict]) -> List[dict]:
+        """Returns the messages to send, evicting and summarizing old turns to stay within the budget."""
+        self._count_new(messages)
+        turns = self._turn_bounds(messages)
+        if not turns:
+            return []
+
+        def turn_tokens(start, end, is_current):
+            counts = self._full_tokens if is_current else self._text_tokens
+            return sum(counts[start:end])
+
+        sizes = [turn_tokens(s, e, i == len(turns) - 1) for i, (s, e) in enumerate(turns)]
+        budget = self.token_budget - self.summary_tokens
+        first_kept = 0
+        total = sum(sizes)
+        # Always keep the current turn, even if it alone is over budget
+        while total > budget and first_kept < len(turns) - 1:
+            total -= sizes[first_kept]
+            first_kept += 1
+
+        if first_kept:
+            evicted_end = turns[first_kept][0]
+            evicted = messages[self._summarized_upto:evicted_end]
+            self.summary = self.summarizer(self.summary, _turn_text(evicted), self.summary_tokens)
+            self._summarized_upto = evicted_end
+            turns = turns[first_kept:]
+
+        window = []
+        for i, (start, end) in enumerate(turns):
+            is_current = i == len(turns) - 1
+            for msg in messages[start:end]:
+                content = _normalize_content(msg["content"])
+                if not is_current:
+                    content = [c for c in content if not _is_tool_part(c)]
+                    if not content:
+                        continue
+                if window and window[-1]["role"] == msg["role"]:
+                    # Dropping tool messages can leave two messages from the same role in a row
+                    window[-1] = {"role": msg["role"], "content": window[-1]["content"] + content}
+                else:
+                    window.append({"role": msg["role"], "content": content})
+        return window
+
+    def system_blocks(self) -> List[dict]:
+        """System prompt blocks carrying the rolling summary, if any."""
+        if not self.summary:
+            return []
+        return [{"text": "Summary of the earlier conversation:\n" + self.summary}]
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import random
+import re
+from typing import List, Optional
+from config import LLM_BACKEND, LLM_MAX_RETRIES, LLM_RETRY_BASE_DELAY
+from utils import estimate_tokens
+
+
+class ThrottlingException(Exception):
+    """Raised by the scripted backend to mimic Bedrock throttling."""
+
+
+def is_throttling_error(err: Exception) -> bool:
+    return "ThrottlingException" in f"{type(err).__name__} {err}"
+
+
+class BedrockBackend:
+    """Calls the Bedrock converse API from a worker thread."""
+
+    def __init__(self, client=None):
+        if client is None:
+            from aws_client import bedrock
+            client = bedrock
+        self.client = client
+
+    async def converse(self, attempt: int = 0, **kwargs) -> dict:
+        return await asyncio.to_thread(self.client.converse, **kwargs)
+
+
+# Default script: look up the symbols, then answer
+DEFAULT_SCRIPT = [
+    {
+        "pattern": r".*",
+        "steps": [
+            {"text": "Let me look that up.", "tool": "list_stock_symbols", "input": {}},
+            {"text": "Based on the retrieved data, here is a summary for your question: {question}"},
+        ],
+    }
+]
+
+
+class ScriptedBackend:
+    """
+    Deterministic stand-in for Bedrock.
+
+    Each script entry matches the latest user question with a regex and lists the steps of the turn.
+    A step with a 'tool' emits a toolUse block (stopReason 'tool_use'); the step index is the number of
+    tool results received since the question. A step with only 'text' ends the turn. Latency, jitter
+    and a throttling rate can be configured; randomness is seeded per caller, request and retry attempt so
+    runs are repeatable and concurrent callers asking the same question are throttled independently.
+    """
+
+    def __init__(self, script: Optional[List[dict]] = None, latency: float = 0.0, jitter: float = 0.0,
+                 throttle_rate: float = 0.0, seed: int = 0):
+        self.script = [(re.compile(entry["pattern"], re.IGNORECASE), entry["steps"]) for entry in (script or DEFAULT_SCRIPT)]
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.seed = seed
+
+    def _turn_state(self, messages: List[dict]):
+        question, tool_results = "", 0
+        for msg in reversed(messages):
+            parts = msg.get("content", [])
+            if msg.get("role") != "user":
+                continue
+            if any("toolResult" in p for p in parts):
+                tool_results += 1
+                continue
+            question = " ".join(p["text"] for p in parts if "text" in p)
+            break
+        return question, tool_results
+
+    async def converse(self, messages: List[dict], system: Optional[List[dict]] = None, toolConfig: Optional[dict] = None,
+                       attempt: int = 0, caller: str = "", **kwargs) -> dict:
+        question, step_index = self._turn_state(messages)
+        rng = random.Random(f"{self.seed}:{caller}:{len(messages)}:{question}:{attempt}")
+        await asyncio.sleep(self.latency + rng.uniform(0, self.jitter))
+        if rng.random() < self.throttle_rate:
+            raise ThrottlingException("ThrottlingException: Too many requests, please wait before trying again.")
+
+        steps = next((steps for pattern, steps in self.script if pattern.search(question)), DEFAULT_SCRIPT[0]["steps"])
+        step = steps[min(step_index, len(steps) - 1)]
+        content = []
+        if step.get("text"):
+            content.append({"text": step["text"].format(question=question)})
+        stop_reason = "end_turn"
+        if step.get("tool") and step_index < len(steps) - 1:
+            content.append({"toolUse": {"toolUseId": f"tooluse_{rng.getrandbits(48):012x}", "name": step["tool"], "input": step.get("input", {})}})
+            stop_reason = "tool_use"
+
+        input_tokens = estimate_tokens(json.dumps(messages)) + estimate_tokens(json.dumps(system or [])) + estimate_tokens(json.dumps(toolConfig or {}))
+        return {
+            "output": {"message": {"role": "assistant", "content": content}},
+            "stopReason": stop_reason,
+            "usage": {"inputTokens": input_tokens, "outputTokens": estimate_tokens(json.dumps(content))},
+        }
+
+
+async def converse_with_retry(backend, max_retries: int = LLM_MAX_RETRIES, base_delay: float = LLM_RETRY_BASE_DELAY, **kwargs) -> dict:
+    """
+    Calls the backend, retrying throttled requests with exponential backoff and full jitter. The attempt
+    number is passed to the backend (the scripted backend draws its throttling from it).
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return await backend.converse(attempt=attempt, **kwargs)
+        except Exception as err:
+            if not is_throttling_error(err) or attempt == max_retries:
+                raise
+            delay = random.uniform(0, base_delay * 2 ** attempt)
+            print(f"LLM request throttled, retrying in {delay:.2f}s (attempt {attempt + 1}/{max_retries})")
+            await asyncio.sleep(delay)
+
+
+def get_backend():
+    """Returns the LLM backend selected by the LLM_BACKEND setting."""
+    if LLM_BACKEND == "scripted":
+        return ScriptedBackend()
+    return BedrockBackend()
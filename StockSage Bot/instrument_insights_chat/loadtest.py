@@ -0,0 +1,210 @@
+"""
+Offline load harness for run_session.
+
+Runs N concurrent simulated users against the scripted LLM backend and an in-process MCP server backed by
+a seeded SQLite database, then reports turn latency percentiles, tool fan-out and token counts. The shared
+answer cache is off unless --answer-cache is given, since simulated users repeat the same questions; with
+it on, turns answered from the cache are reported separately.
+
+    python loadtest.py --users 50 --turns 3 --latency 0.8 --jitter 0.4 --throttle-rate 0.05
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from llm import ScriptedBackend, is_throttling_error
+from context_window import ConversationContext, extractive_summary
+
+MCP_SERVER_DIR = Path(__file__).resolve().parent.parent / "mcp_server"
+# Flat module names used by the MCP server that clash with (or must not leak into) the chat app
+SERVER_MODULES = ("config", "db", "resources", "tools", "main", "seed_db")
+
+QUESTIONS = [
+    "What stock symbols are available?",
+    "What are the recent price trends for AAPL from 2025-01-01 to 2025-06-01?",
+    "What is the impact of dividend actions on AAPL's stock price in 2024?",
+    "Can you compare the closing prices of AAPL and MSFT from 2024-12-01 to 2024-12-31?",
+    "How healthy were META's financials in 2024?",
+]
+
+# Tool calls the scripted backend makes for each kind of question
+SCRIPT = [
+    {"pattern": r"compare", "steps": [
+        {"text": "Comparing the closing prices.", "tool": "compare_stock_metrics",
+         "input": {"dataset": "prices", "symbols": "AAPL,MSFT", "column": "close", "start_date": "2024-12-01", "end_date": "2024-12-31"}},
+        {"text": "AAPL and MSFT closing prices compared over the period."},
+    ]},
+    {"pattern": r"dividend", "steps": [
+        {"text": "Checking dividend actions.", "tool": "corporate_action_impact", "input": {"symbol": "AAPL", "action_type": "dividend"}},
+        {"text": "Dividend actions had a modest impact on the price."},
+    ]},
+    {"pattern": r"financials", "steps": [
+        {"text": "Evaluating financial health.", "tool": "financial_health", "input": {"symbol": "META", "year": "2024"}},
+        {"tool": "get_stock_summary", "input": {"dataset": "financials", "symbol": "META"}},
+        {"text": "META's financial health is summarized above."},
+    ]},
+    {"pattern": r"price trends", "steps": [
+        {"text": "Fetching prices.", "tool": "execute_sql_query",
+         "input": {"query": "SELECT date, close FROM prices WHERE symbol = 'AAPL' AND date BETWEEN '2025-01-01' AND '2025-06-01'"}},
+        {"text": "AAPL's price trend over the period is summarized above."},
+    ]},
+    {"pattern": r".*", "steps": [
+        {"text": "Listing symbols.", "tool": "list_stock_symbols", "input": {}},
+        {"text": "These are the available symbols."},
+    ]},
+]
+
+
+class MeteredBackend:
+    """Wraps a backend to count LLM calls, throttles and token usage for one simulated user."""
+
+    def __init__(self, backend, caller: str = ""):
+        self.backend = backend
+        self.caller = caller
+        self.calls = 0
+        self.throttles = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    async def converse(self, **kwargs):
+        self.calls += 1
+        try:
+            response = await self.backend.converse(caller=self.caller, **kwargs)
+        except Exception as err:
+            if is_throttling_error(err):
+                self.throttles += 1
+            raise
+        usage = response.get("usage", {})
+        self.input_tokens += usage.get("inputTokens", 0)
+        self.output_tokens += usage.get("outputTokens", 0)
+        return response
+
+
+def load_mcp_server(db_url: str):
+    """Imports the MCP server in-process against the given database, isolating its flat module names."""
+    from mcp.server.fastmcp import FastMCP  # noqa: F401 - fail early if the MCP SDK is missing
+    os.environ["STOCKSAGE_DB_URL"] = db_url
+    shadowed = {name: sys.modules.pop(name) for name in SERVER_MODULES if name in sys.modules}
+    cwd = os.getcwd()
+    sys.path.insert(0, str(MCP_SERVER_DIR))
+    # resources.py writes meta_data.json to the working directory on import
+    os.chdir(tempfile.mkdtemp(prefix="stocksage_mcp_"))
+    try:
+        seed_db = importlib.import_module("seed_db")
+        seed_db.seed_database(db_url)
+        server = importlib.import_module("main").mcp
+    finally:
+        os.chdir(cwd)
+        sys.path.remove(str(MCP_SERVER_DIR))
+        for name in SERVER_MODULES:
+            sys.modules.pop(name, None)
+        sys.modules.update(shadowed)
+    return server
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+async def simulate_user(user_id: int, turns: int, backend, connect, results: list):
+    from session import run_session
+    messages = []
+    context = ConversationContext(summarizer=extractive_summary)
+    metered = MeteredBackend(backend, caller=f"user-{user_id}")
+    for turn in range(turns):
+        question = QUESTIONS[(user_id + turn) % len(QUESTIONS)]
+        messages.append({"role": "user", "content": [{"text": question}]})
+        calls_before, in_before, out_before = metered.calls, metered.input_tokens, metered.output_tokens
+        tool_calls, error = 0, None
+        started = time.perf_counter()
+        try:
+            async for message, messages, tool_error, failed_tool in run_session(
+                question, messages, context=context, llm=metered, connect=connect
+            ):
+                if any("toolResult" in part for part in message.get("content", [])):
+                    tool_calls += 1
+        except Exception as err:
+            error = f"{type(err).__name__}: {err}"
+        results.append({
+            "user": user_id,
+            "turn": turn,
+            "latency": time.perf_counter() - started,
+            "tool_calls": tool_calls,
+            "llm_calls": metered.calls - calls_before,
+            "input_tokens": metered.input_tokens - in_before,
+            "output_tokens": metered.output_tokens - out_before,
+            "error": error,
+            "cached": error is None and metered.calls == calls_before,
+        })
+    return metered.throttles
+
+
+def report(results: list, throttles: int, wall_time: float) -> dict:
+    cached = [r["latency"] for r in results if r["cached"]]
+    ok = [r for r in results if not r["error"] and not r["cached"]]
+    latencies = [r["latency"] for r in ok]
+    fan_out = [r["tool_calls"] for r in ok]
+    return {
+        "turns": len(results),
+        "errors": sum(1 for r in results if r["error"]),
+        "wall_time_seconds": round(wall_time, 2),
+        "turns_per_second": round((len(ok) + len(cached)) / wall_time, 2) if wall_time else 0.0,
+        # Latency, fan-out and token figures below cover uncached turns only
+        "cached_turns": {"count": len(cached), "latency_p50": round(percentile(cached, 50), 3)},
+        "latency_seconds": {f"p{p}": round(percentile(latencies, p), 3) for p in (50, 90, 95, 99)} | {"max": round(max(latencies, default=0.0), 3)},
+        "tool_calls": {"total": sum(fan_out), "mean_per_turn": round(sum(fan_out) / len(fan_out), 2) if fan_out else 0.0, "max_per_turn": max(fan_out, default=0)},
+        "llm_calls": sum(r["llm_calls"] for r in ok),
+        "throttled_requests": throttles,
+        "tokens": {
+            "input": sum(r["input_tokens"] for r in ok),
+            "output": sum(r["output_tokens"] for r in ok),
+            "input_mean_per_turn": round(sum(r["input_tokens"] for r in ok) / len(ok), 1) if ok else 0.0,
+        },
+        "sample_errors": sorted({r["error"] for r in results if r["error"]})[:5],
+    }
+
+
+async def main(args):
+    from mcp.shared.memory import create_connected_server_and_client_session
+    import session
+    session.ANSWER_CACHE_ENABLED = args.answer_cache
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix="stocksage_db_"), "stocks.db")
+    server = load_mcp_server(f"sqlite:///{db_path}")
+
+    def connect():
+        return create_connected_server_and_client_session(server._mcp_server)
+
+    backend = ScriptedBackend(script=SCRIPT, latency=args.latency, jitter=args.jitter, throttle_rate=args.throttle_rate, seed=args.seed)
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=max(args.users, 8)))
+    results = []
+    started = time.perf_counter()
+    throttles = await asyncio.gather(*(simulate_user(u, args.turns, backend, connect, results) for u in range(args.users)))
+    summary = report(results, sum(throttles), time.perf_counter() - started)
+    print(json.dumps(summary, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"summary": summary, "turns": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline concurrent load test for StockSage chat sessions")
+    parser.add_argument("--users", type=int, default=20, help="Number of concurrent simulated users")
+    parser.add_argument("--turns", type=int, default=3, help="Questions asked by each user")
+    parser.add_argument("--latency", type=float, default=0.5, help="Base scripted LLM latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Extra random LLM latency in seconds")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of LLM calls that are throttled")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the scripted backend")
+    parser.add_argument("--db", type=str, default="", help="SQLite file to seed (defaults to a temporary file)")
+    parser.add_argument("--answer-cache", action="store_true", help="Keep the shared answer cache on (cached turns are reported apart)")
+    parser.add_argument("--output", type=str, default="", help="Write the summary and per-turn results to this JSON file")
+    asyncio.run(main(parser.parse_args()))
@@ -1,123 +1,220 @@
 import asyncio
+import time
+from contextlib import asynccontextmanager
 from mcp import ClientSession
 from mcp.client import streamable_http
-from aws_client import bedrock
-from utils import convert_tool_format, validate_messages
+from utils import convert_tool_format
+from llm import converse_with_retry, get_backend
+from context_window import ConversationContext
+from compaction import PAGE_TOOL_NAME, PAGE_TOOL_SPEC, compact_tool_result, page_result
+from answer_cache import answer_cache, extract_entities
+from config import ANSWER_CACHE_ENABLED
 import json
 from datetime import timedelta
-from typing import List, Tuple, AsyncGenerator
+from pathlib import Path
+from typing import List, Optional, Tuple, AsyncGenerator
 
 # Load metadata once
-with open("../mcp_server/meta_data.json", "r") as f:
+with open(Path(__file__).resolve().parent.parent / "mcp_server" / "meta_data.json", "r") as f:
     metadata_context = json.load(f)
 
-async def run_session(user_input: str, messages: List[dict], retry_tool: str = None) -> AsyncGenerator[Tuple[dict, List[dict], bool, str], None]:
-    """Manages the session with a running MCP server and Bedrock API, yielding message chunks for streaming."""
+@asynccontextmanager
+async def mcp_session():
+    """Opens an initialized MCP client session to the running server."""
+    print("Attempting to connect to MCP server at http://localhost:8000/mcp...")
+    async with streamable_http.streamablehttp_client(
+        url="http://localhost:8000/mcp",
+        timeout=timedelta(seconds=30),
+        sse_read_timeout=timedelta(seconds=300),
+        terminate_on_close=True
+    ) as (read_stream, write_stream, get_session_id):
+        print("Connected to MCP server, initializing session...")
+        async with ClientSession(read_stream, write_stream) as session:
+            await session.initialize()
+            yield session
+
+async def refresh_watermark(session: ClientSession) -> Optional[str]:
+    """Reads the MCP data watermark and passes it to the answer cache."""
     try:
-        print("Attempting to connect to MCP server at http://localhost:8000/mcp...")
-        async with streamable_http.streamablehttp_client(
-            url="http://localhost:8000/mcp",
-            timeout=timedelta(seconds=30),
-            sse_read_timeout=timedelta(seconds=300),
-            terminate_on_close=True
-        ) as (read_stream, write_stream, get_session_id):
-            print("Connected to MCP server, initializing session...")
-            async with ClientSession(read_stream, write_stream) as session:
-                await session.initialize()
-                tools_result = await session.list_tools()
-
-                tools_list = [
-                    {
-                        "name": tool.name,
-                        "description": tool.description,
-                        "inputSchema": tool.inputSchema,
-                    }
-                    for tool in tools_result.tools
-                ]
-                system = [
-                    {
-                        "text": (
-                            "You are a helpful AI assistant with access to various tools to assist with user queries.\n\n"
-                            "When responding:\n"
-                            "- Provide only the information that directly answers the user's question — avoid extra or unrelated content.\n"
-                            "- Do NOT mention the names of internal tools (e.g., 'query_stock_data'). Instead, refer to them using neutral terms like 'data retrieval processes.'\n"
-                            "- Format responses flexibly: use bullet points, paragraphs, or a combination. Vary the style across the conversation to keep it dynamic and suited to the query.\n\n"
-                            "Provide professional response in plain text with no formatting or emphasis, do not bold or italic any specific part of response"
-                            "The list of available stocks in our database is provided in the metadata.\n\n"
-                            "Available tools: " + json.dumps(tools_list) + "\n\n"
-                            "Metadata context:\n" + json.dumps(metadata_context)
-                        )
-                    }
-                ]
-
-                if retry_tool:
-                    messages.append({"role": "user", "content": [{"text": f"Retry the {retry_tool} tool."}]})
-
-                tool_error = False
-                failed_tool = None
-
-                # Yield initial user input as a message
-                if user_input:
-                    yield {"role": "user", "content": [{"text": user_input}]}, messages, tool_error, failed_tool
-
-                while True:
-                    response = bedrock.converse(
-                        modelId="us.anthropic.claude-3-5-haiku-20241022-v1:0", #"us.anthropic.claude-3-5-haiku-20241022-v1:0",
-                        messages=validate_messages(messages),
-                        system=system,
-                        inferenceConfig={"maxTokens": 1000, "topP": 0.1, "temperature": 0.3},
-                        toolConfig=convert_tool_format(tools_result.tools),
+        result = await session.read_resource("stock://watermark")
+        watermark = "".join(getattr(part, "text", "") for part in result.contents)
+        if watermark.startswith("Error"):
+            print(f"Could not read data watermark: {watermark}")
+            return None
+        answer_cache.set_watermark(watermark)
+        return watermark
+    except Exception as e:
+        print(f"Could not read data watermark: {e}")
+        return None
+
+def is_cacheable(user_input: str, messages: List[dict], retry_tool: str = None) -> bool:
+    """Answers are cached for standalone questions: the first of a chat or one naming its own tickers/companies."""
+    if not ANSWER_CACHE_ENABLED or not user_input or retry_tool:
+        return False
+    prior_queries = sum(
+        1 for msg in messages[:-1]
+        if msg.get("role") == "user" and any("text" in c for c in msg.get("content", []))
+        and not any("toolResult" in c for c in msg.get("content", []))
+    )
+    return prior_queries == 0 or bool(extract_entities(user_input))
+
+async def replay_cached_answer(user_input: str, messages: List[dict], cached: List[dict]):
+    """Streams a cached answer back as if it had just been generated."""
+    yield {"role": "user", "content": [{"text": user_input}]}, messages, False, None
+    messages.append({"role": "assistant", "content": [part for msg in cached for part in msg["content"]]})
+    for msg in cached:
+        yield msg, messages, False, None
+
+async def run_session(user_input: str, messages: List[dict], retry_tool: str = None, context: ConversationContext = None,
+                      llm=None, connect=None) -> AsyncGenerator[Tuple[dict, List[dict], bool, str], None]:
+    """
+    Manages the session with a running MCP server and Bedrock API, yielding message chunks for streaming.
+
+    llm and connect default to Bedrock and the MCP server over HTTP; tests and the load harness pass a
+    scripted backend and an in-process MCP session instead.
+    """
+    if context is None:
+        context = ConversationContext()
+    llm = llm or get_backend()
+    connect = connect or mcp_session
+    cacheable = is_cacheable(user_input, messages, retry_tool)
+    if cacheable and answer_cache.watermark_is_fresh():
+        cached = answer_cache.get(user_input)
+        if cached:
+            async for item in replay_cached_answer(user_input, messages, cached):
+                yield item
+            return
+    started = time.perf_counter()
+    try:
+        async with connect() as session:
+            if cacheable and not answer_cache.watermark_is_fresh():
+                if await refresh_watermark(session) is None:
+                    cacheable = False
+                else:
+                    cached = answer_cache.get(user_input)
+                    if cached:
+                        async for item in replay_cached_answer(user_input, messages, cached):
+                            yield item
+                        return
+            tools_result = await session.list_tools()
+
+            tools_list = [
+                {
+                    "name": tool.name,
+                    "description": tool.description,
+                    "inputSchema": tool.inputSchema,
+                }
+                for tool in tools_result.tools
+            ]
+            tool_config = convert_tool_format(tools_result.tools)
+            tool_config["tools"].append(PAGE_TOOL_SPEC)
+            system = [
+                {
+                    "text": (
+                        "You are a helpful AI assistant with access to various tools to assist with user queries.\n\n"
+                        "When responding:\n"
+                        "- Provide only the information that directly answers the user's question — avoid extra or unrelated content.\n"
+                        "- Do NOT mention the names of internal tools (e.g., 'query_stock_data'). Instead, refer to them using neutral terms like 'data retrieval processes.'\n"
+                        "- Format responses flexibly: use bullet points, paragraphs, or a combination. Vary the style across the conversation to keep it dynamic and suited to the query.\n\n"
+                        "Provide professional response in plain text with no formatting or emphasis, do not bold or italic any specific part of response"
+                        "The list of available stocks in our database is provided in the metadata.\n\n"
+                        "Available tools: " + json.dumps(tools_list) + "\n\n"
+                        "Metadata context:\n" + json.dumps(metadata_context)
                     )
+                }
+            ]
 
-                    output_message = response["output"]["message"]
-                    # Clean trailing colon from the last text segment
-                    if (
-                        "content" in output_message 
-                        and isinstance(output_message["content"], list) 
-                        and "text" in output_message["content"][0]
-                    ):
-                        output_message["content"][0]["text"] = output_message["content"][0]["text"].rstrip(":")
-
-                    messages.append(output_message)
-                    stop_reason = response["stopReason"]
-
-                    for content in output_message["content"]:
-                        if "text" in content:
-                            if "error" in content["text"].lower() and "stock symbols" in content["text"].lower():
-                                tool_error = True
-                                failed_tool = "list_stock_symbols"
-                            # Yield each text chunk as a separate message
-                            yield {"role": "assistant", "content": [{"text": content["text"]}]}, messages, tool_error, failed_tool
-
-                    if stop_reason == "tool_use":
-                        for tool_req in output_message["content"]:
-                            if "toolUse" in tool_req:
-                                tool = tool_req["toolUse"]
-                                try:
+            if retry_tool:
+                messages.append({"role": "user", "content": [{"text": f"Retry the {retry_tool} tool."}]})
+
+            tool_error = False
+            failed_tool = None
+            answer_parts = []
+
+            # Yield initial user input as a message
+            if user_input:
+                yield {"role": "user", "content": [{"text": user_input}]}, messages, tool_error, failed_tool
+
+            while True:
+                # Blocking calls run in worker threads so one process can serve many concurrent chats
+                window = await asyncio.to_thread(context.build, messages)
+                response = await converse_with_retry(
+                    llm,
+                    modelId="us.anthropic.claude-3-5-haiku-20241022-v1:0", #"us.anthropic.claude-3-5-haiku-20241022-v1:0",
+                    messages=window,
+                    system=system + context.system_blocks(),
+                    inferenceConfig={"maxTokens": 1000, "topP": 0.1, "temperature": 0.3},
+                    toolConfig=tool_config,
+                )
+
+                output_message = response["output"]["message"]
+                # Clean trailing colon from the last text segment
+                if (
+                    "content" in output_message 
+                    and isinstance(output_message["content"], list) 
+                    and "text" in output_message["content"][0]
+                ):
+                    output_message["content"][0]["text"] = output_message["content"][0]["text"].rstrip(":")
+
+                messages.append(output_message)
+                stop_reason = response["stopReason"]
+
+                for content in output_message["content"]:
+                    if "text" in content:
+                        if "error" in content["text"].lower() and "stock symbols" in content["text"].lower():
+                            tool_error = True
+                            failed_tool = "list_stock_symbols"
+                        answer_parts.append(content["text"])
+                        # Yield each text chunk as a separate message
+                        yield {"role": "assistant", "content": [{"text": content["text"]}]}, messages, tool_error, failed_tool
+
+                if stop_reason == "tool_use":
+                    for tool_req in output_message["content"]:
+                        if "toolUse" in tool_req:
+                            tool = tool_req["toolUse"]
+                            try:
+                                if tool["name"] == PAGE_TOOL_NAME:
+                                    # Paging is served locally from the result store
+                                    result_text = page_result(tool["input"])
+                                    is_error = result_text.startswith("Error")
+                                else:
                                     tool_response = await session.call_tool(tool["name"], tool["input"])
-                                    tool_result = {
-                                        "toolUseId": tool["toolUseId"],
-                                        "content": [{"text": str(tool_response)}],
-                                    }
-                                    # Yield tool response as a separate message
-                                    yield {"role": "assistant", "content": [{"toolResult": str(tool_response)}]}, messages, tool_error, failed_tool
-                                except Exception as err:
-                                    print(f"Tool call failed: {err}")
+                                    # Compact large payloads so they fit the per-result token budget
+                                    result_text = compact_tool_result(tool_response)
+                                    is_error = bool(getattr(tool_response, "isError", False))
+                                tool_result = {
+                                    "toolUseId": tool["toolUseId"],
+                                    "content": [{"text": result_text}],
+                                }
+                                if is_error:
+                                    tool_result["status"] = "error"
+                                # Yield tool response as a separate message
+                                yield {"role": "assistant", "content": [{"toolResult": result_text}]}, messages, tool_error, failed_tool
+                            except Exception as err:
+                                print(f"Tool call failed: {err}")
+                                # A local paging failure has nothing upstream to retry
+                                if tool["name"] != PAGE_TOOL_NAME:
                                     tool_error = True
                                     failed_tool = tool["name"]
-                                    tool_result = {
-                                        "toolUseId": tool["toolUseId"],
-                                        "content": [{"text": f"Error: {str(err)}"}],
-                                        "status": "error"
-                                    }
-                                    # Yield tool error as a separate message
-                                    yield {"role": "assistant", "content": [{"toolResult": f"Error: {str(err)}"}]}, messages, tool_error, failed_tool
-                                messages.append({
-                                    "role": "user",
-                                    "content": [{"toolResult": tool_result}]
-                                })
-                    else:
-                        break
+                                tool_result = {
+                                    "toolUseId": tool["toolUseId"],
+                                    "content": [{"text": f"Error: {str(err)}"}],
+                                    "status": "error"
+                                }
+                                # Yield tool error as a separate message
+                                yield {"role": "assistant", "content": [{"toolResult": f"Error: {str(err)}"}]}, messages, tool_error, failed_tool
+                            messages.append({
+                                "role": "user",
+                                "content": [{"toolResult": tool_result}]
+                            })
+                else:
+                    if cacheable and not tool_error and answer_parts:
+                        answer_cache.put(
+                            user_input,
+                            [{"role": "assistant", "content": [{"text": text}]} for text in answer_parts],
+                            time.perf_counter() - started
+                        )
+                    break
 
     except BaseExceptionGroup as eg:
         print("ExceptionGroup caught with sub-exceptions:")
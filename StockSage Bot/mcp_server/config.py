@@ -11,8 +11,9 @@ RDS_HOST = os.getenv("RDS_HOST")
 RDS_USER = os.getenv("RDS_USER")
 RDS_PASSWORD = os.getenv("RDS_PASSWORD")
 RDS_DB = os.getenv("RDS_DB")
-ENGINE_URL = f"mysql+pymysql://{RDS_USER}:{RDS_PASSWORD}@{RDS_HOST}/{RDS_DB}"
-print(f"Connecting to RDS at {RDS_HOST}...")
+# STOCKSAGE_DB_URL overrides the RDS connection, e.g. sqlite:///stocks.db for a local seeded database
+ENGINE_URL = os.getenv("STOCKSAGE_DB_URL") or f"mysql+pymysql://{RDS_USER}:{RDS_PASSWORD}@{RDS_HOST}/{RDS_DB}"
+print(f"Connecting to {'local database' if os.getenv('STOCKSAGE_DB_URL') else f'RDS at {RDS_HOST}'}...")
 # Define available datasets
 DATASETS = {
     "prices": "prices",
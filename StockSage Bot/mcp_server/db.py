@@ -1,12 +1,43 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from config import ENGINE_URL
 
-# Create SQLAlchemy engine
-engine = create_engine(
-    ENGINE_URL,
-    pool_size=5,  # Number of connections to keep open
-    max_overflow=10,  
-    pool_timeout=30,  # Wait time for a connection
-    pool_recycle=3600  # Recycle connections after 1 hour to avoid stale states
-)
+if ENGINE_URL.startswith("sqlite"):
+    # Local SQLite database (seeded for offline testing); the pool is managed by SQLAlchemy
+    engine = create_engine(ENGINE_URL, connect_args={"check_same_thread": False})
+else:
+    # Create SQLAlchemy engine
+    engine = create_engine(
+        ENGINE_URL,
+        pool_size=5,  # Number of connections to keep open
+        max_overflow=10,  
+        pool_timeout=30,  # Wait time for a connection
+        pool_recycle=3600  # Recycle connections after 1 hour to avoid stale states
+    )
 
+def _translate_mysql_query(statement, parameters):
+    """Rewrites MySQL-style '%s' placeholders to SQLite '?', expanding tuple parameters used with IN."""
+    if not parameters or isinstance(parameters, dict):
+        return statement, parameters
+    pieces = statement.split("%s")
+    if len(pieces) - 1 != len(parameters):
+        return statement, parameters
+    sql, flat = pieces[0], []
+    for value, piece in zip(parameters, pieces[1:]):
+        if isinstance(value, (tuple, list)):
+            sql += "(" + ", ".join("?" for _ in value) + ")"
+            flat.extend(value)
+        else:
+            sql += "?"
+            flat.append(value)
+        sql += piece
+    return sql, tuple(flat)
+
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine, "connect")
+    def _register_sqlite_functions(dbapi_connection, connection_record):
+        # MySQL functions used by the tools
+        dbapi_connection.create_function("YEAR", 1, lambda value: str(value)[:4] if value else None)
+
+    @event.listens_for(engine, "before_cursor_execute", retval=True)
+    def _translate_placeholders(conn, cursor, statement, parameters, context, executemany):
+        return _translate_mysql_query(statement, parameters)
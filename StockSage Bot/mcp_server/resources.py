@@ -55,7 +55,44 @@ CACHED_METADATA = fetch_metadata()
 with open('meta_data.json', 'w') as f:
     json.dump(CACHED_METADATA, f, indent=2)
 
+# Date column tracked per dataset when computing the data watermark
+WATERMARK_COLUMNS = {
+    "prices": "date",
+    "indicators": "date",
+    "financials": "date",
+    "corporate_actions": "action_date"
+}
+
+def fetch_watermark():
+    """Returns the latest loaded date per dataset."""
+    watermark = {}
+    with engine.connect() as connection:
+        with connection.begin():
+            for dataset, table in DATASETS.items():
+                column = WATERMARK_COLUMNS.get(dataset, "date")
+                df = pd.read_sql(f"SELECT MAX({column}) AS latest, COUNT(*) AS row_count FROM {table}", connection)
+                watermark[dataset] = {
+                    "latest": str(df["latest"].iloc[0]),
+                    "row_count": int(df["row_count"].iloc[0])
+                }
+    return watermark
+
 def register_resources(mcp: FastMCP):
+    # Resource: Data watermark used by clients to invalidate cached answers
+    @mcp.resource("stock://watermark")
+    def get_data_watermark() -> str:
+        """
+        Retrieve the latest loaded date and row count for every dataset.
+
+        Returns:
+            str: JSON string mapping each dataset to its latest date and row count, or an error message.
+        """
+        print("Accessing resource stock://watermark")
+        try:
+            return json.dumps(fetch_watermark())
+        except Exception as e:
+            return f"Error reading data watermark: {str(e)}"
+
     # Resource: Expose table contents for a given stock symbol
     @mcp.resource("stock://{dataset}/{symbol}")
     def get_stock_data(dataset: str, symbol: str) -> str:
@@ -0,0 +1,121 @@
+import argparse
+import json
+import random
+import pandas as pd
+from sqlalchemy import create_engine
+
+# Symbols in the production database (see meta_data.json)
+SYMBOLS = ["AAPL", "AMZN", "GOOGL", "JPM", "META", "MSFT", "NVDA", "TSLA", "V", "WMT"]
+
+def _prices(symbol, dates, rng):
+    close = rng.uniform(50, 500)
+    rows = []
+    for date in dates:
+        open_price = close * (1 + rng.gauss(0, 0.005))
+        close = max(close * (1 + rng.gauss(0.0004, 0.018)), 1.0)
+        high = max(open_price, close) * (1 + abs(rng.gauss(0, 0.006)))
+        low = min(open_price, close) * (1 - abs(rng.gauss(0, 0.006)))
+        rows.append({
+            "symbol": symbol, "date": date.strftime("%Y-%m-%d"),
+            "open": round(open_price, 2), "high": round(high, 2), "low": round(low, 2), "close": round(close, 2),
+            "volume": int(rng.uniform(5e6, 8e7))
+        })
+    return pd.DataFrame(rows)
+
+def _indicators(prices):
+    close = prices["close"]
+    ema_12 = close.ewm(span=12, adjust=False).mean()
+    ema_26 = close.ewm(span=26, adjust=False).mean()
+    delta = close.diff()
+    gain = delta.clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+    loss = (-delta.clip(upper=0)).ewm(alpha=1 / 14, adjust=False).mean()
+    sma_20 = close.rolling(20).mean()
+    std_20 = close.rolling(20).std()
+    low_14 = prices["low"].rolling(14).min()
+    high_14 = prices["high"].rolling(14).max()
+    stochastic_k = (close - low_14) / (high_14 - low_14) * 100
+    typical = (prices["high"] + prices["low"] + close) / 3
+    mean_dev = typical.rolling(20).apply(lambda x: (abs(x - x.mean())).mean(), raw=True)
+    return pd.DataFrame({
+        "symbol": prices["symbol"], "date": prices["date"],
+        "sma_20": sma_20, "sma_50": close.rolling(50).mean(), "sma_200": close.rolling(200).mean(),
+        "ema_12": ema_12, "ema_26": ema_26,
+        "rsi_14": 100 - 100 / (1 + gain / loss),
+        "macd": ema_12 - ema_26,
+        "macd_signal": (ema_12 - ema_26).ewm(span=9, adjust=False).mean(),
+        "macd_hist": (ema_12 - ema_26) - (ema_12 - ema_26).ewm(span=9, adjust=False).mean(),
+        "bb_upper": sma_20 + 2 * std_20, "bb_middle": sma_20, "bb_lower": sma_20 - 2 * std_20,
+        "adx_14": (stochastic_k.rolling(14).std() * 0.8).clip(upper=60),
+        "cci_20": (typical - typical.rolling(20).mean()) / (0.015 * mean_dev),
+        "stochastic_k": stochastic_k, "stochastic_d": stochastic_k.rolling(3).mean(),
+        "williams_r": stochastic_k - 100
+    }).round(4)
+
+def _financials(symbol, quarter_ends, rng):
+    revenue = rng.uniform(2e10, 1.2e11)
+    rows = []
+    for date in quarter_ends:
+        revenue *= 1 + rng.gauss(0.02, 0.04)
+        net_income = revenue * rng.uniform(0.1, 0.3)
+        total_assets = revenue * rng.uniform(3, 5)
+        total_liabilities = total_assets * rng.uniform(0.4, 0.8)
+        equity = total_assets - total_liabilities
+        current_assets = total_assets * rng.uniform(0.2, 0.4)
+        current_liabilities = total_liabilities * rng.uniform(0.3, 0.5)
+        rows.append({
+            "symbol": symbol, "date": date.strftime("%Y-%m-%d"),
+            "total_assets": total_assets, "total_liabilities": total_liabilities, "total_equity": equity,
+            "cash_and_equivalents": current_assets * rng.uniform(0.2, 0.5),
+            "current_assets": current_assets, "current_liabilities": current_liabilities,
+            "long_term_debt": total_liabilities * rng.uniform(0.3, 0.6),
+            "net_income": net_income, "revenue": revenue,
+            "gross_profit": revenue * rng.uniform(0.35, 0.6), "operating_income": net_income * 1.25,
+            "ebitda": net_income * 1.5, "eps": net_income / rng.uniform(2e9, 1.6e10),
+            "free_cash_flow": net_income * rng.uniform(0.8, 1.2),
+            "current_ratio": current_assets / current_liabilities,
+            "debt_to_equity": total_liabilities / equity,
+            "roa": net_income / total_assets, "roe": net_income / equity
+        })
+    return pd.DataFrame(rows)
+
+def _corporate_actions(symbol, quarter_ends, prices, rng):
+    trading_days = set(prices["date"])
+    rows = []
+    for date in quarter_ends:
+        # Pay dividends on the first trading day after the quarter ends so the price join finds a row
+        for offset in range(1, 8):
+            action_date = (date + pd.Timedelta(days=offset)).strftime("%Y-%m-%d")
+            if action_date in trading_days:
+                rows.append({
+                    "symbol": symbol, "action_type": "dividend", "action_date": action_date,
+                    "details": json.dumps({"amount": round(rng.uniform(0.1, 1.5), 2), "currency": "USD"})
+                })
+                break
+    split_date = prices["date"].iloc[len(prices) // 2]
+    rows.append({"symbol": symbol, "action_type": "stock_split", "action_date": split_date, "details": json.dumps({"ratio": "4:1"})})
+    return pd.DataFrame(rows)
+
+def seed_database(db_url, seed=0, start="2023-01-01", end="2025-06-30"):
+    """Creates the prices, indicators, financials and corporate_actions tables filled with deterministic synthetic data."""
+    rng = random.Random(seed)
+    dates = pd.bdate_range(start, end)
+    quarter_ends = pd.date_range(start, end, freq="QE")
+    tables = {"prices": [], "indicators": [], "financials": [], "corporate_actions": []}
+    for symbol in SYMBOLS:
+        prices = _prices(symbol, dates, rng)
+        tables["prices"].append(prices)
+        tables["indicators"].append(_indicators(prices))
+        tables["financials"].append(_financials(symbol, quarter_ends, rng))
+        tables["corporate_actions"].append(_corporate_actions(symbol, quarter_ends, prices, rng))
+    engine = create_engine(db_url)
+    for table, frames in tables.items():
+        pd.concat(frames, ignore_index=True).to_sql(table, engine, if_exists="replace", index=False)
+    engine.dispose()
+    print(f"Seeded {db_url} with {len(SYMBOLS)} symbols and {len(dates)} trading days")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed a local SQLite database for offline runs of the MCP server")
+    parser.add_argument("--db", type=str, default="stocks.db", help="SQLite file to create")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the synthetic data")
+    args = parser.parse_args()
+    seed_database(f"sqlite:///{args.db}", seed=args.seed)